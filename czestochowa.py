@@ -1,258 +1,35 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
 import requests
-import time
+import sys
 import json
 import csv
-from urllib.parse import urlparse
 from pathlib import Path
 from typing import Dict, List, Optional
+from odpn_core import SiteWrapBase
+from odpn_trace import DOMYSLNY_KATALOG_SLADOW
 
-class SiteWrap:
-    def __init__(self, host: str, rozdzial_szkola: int = 0, options: tuple = ()):
-        self.host = host
-        self.szkola_rozdzial = rozdzial_szkola
-        
-        # Nowoczesna konfiguracja Chrome z CDP
-        chrome_options = Options()
-        chrome_options.add_experimental_option('detach', True)
-        chrome_options.add_argument('--enable-logging')
-        chrome_options.add_argument('--log-level=0')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        
-        # Włączenie logowania performance dla przechwytywania requestów
-        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
-        
-        # Dodanie dodatkowych opcji
-        for option in options:
-            chrome_options.add_argument(f"--{option}")
-        
-        # Użycie Selenium Manager (automatycznie zarządza sterownikami)
-        service = Service()
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
-        
-        # Włączenie Network domain w CDP
-        self.driver.execute_cdp_cmd("Network.enable", {})
-        self.driver.execute_cdp_cmd("Page.enable", {})
-        
-        # Przechowywanie przechwyconych requestów
-        self.captured_requests = []
-        self.cookies = {}
-        
-        # Inicjalizacja połączenia
-        self._initialize_connection()
-        self.wait_time = 20
-
-    def _initialize_connection(self):
-        """Inicjalizacja połączenia z retry logic"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                self.driver.get(f"https://{self.host}")
-                WebDriverWait(self.driver, 10).until(
-                    lambda driver: driver.execute_script("return document.readyState") == "complete"
-                )
-                self.host = urlparse(self.driver.current_url).netloc.split(':')[0]
-                print(f"Połączono z: {self.host}")
-                break
-            except Exception as e:
-                print(f'Próba {attempt + 1}/{max_retries} nieudana: {e}')
-                if attempt == max_retries - 1:
-                    raise
-                time.sleep(2)
-
-    def capture_response(self, file_name: str = "zrzut"):
-        """Przechwytywanie odpowiedzi używając performance logs zamiast selenium-wire"""
-        try:
-            # Pobranie logów performance z Chrome
-            logs = self.driver.get_log("performance")
-            captured_data = []
-
-            REQUIRED_FIELDS = {'szkid', 'rok', 'miesiac', 'rozdzial', 'IdDokumentu', 'wydrukId'}
-            
-            for log_entry in logs:
-                try:
-                    message = log_entry.get('message')
-                    if not message:
-                        continue
-                    
-                    # Parsowanie wiadomości JSON
-                    log_data = json.loads(message)
-                    log_message = log_data.get('message', {})
-                    
-                    # Sprawdzenie czy to żądanie POST do GridGetData
-                    if (log_message.get('method') == 'Network.requestWillBeSent' and 
-                        'GridGetData' in log_message.get('params', {}).get('request', {}).get('url', '')):
-                        
-                        request_data = log_message['params']['request']
-                        
-                        # Sprawdzenie czy to żądanie POST z danymi
-                        if (request_data.get('method') == 'POST' and 
-                            request_data.get('postData')):
-                            
-                            try:
-                                # Parsowanie danych POST
-                                post_data = json.loads(request_data['postData'])
-
-                                continueSearch = False
-                                
-                                for field in REQUIRED_FIELDS:
-                                    if post_data['data'].get(field) is None:
-                                        continueSearch = True
-                                        break
-
-                                if continueSearch == True:
-                                    continue
-                                
-                                if 'data' in post_data:
-                                    self._extract_ids(post_data['data'])
-                                    self._extract_field_names(post_data['data'].get('v_store_fields', []))
-                                    
-                                    captured_data.append({
-                                        'url': request_data['url'],
-                                        'method': request_data['method'],
-                                        'headers': request_data.get('headers', {}),
-                                        'postData': post_data,
-                                        'timestamp': log_entry.get('timestamp')
-                                    })
-                                    
-                                    print("Przechwycono dane:")
-                                    print(f"Pola: {self.fields_name}")
-                                    print(f"IDs: szkid={self.ID_szkid}, rok={self.ID_rok}, "
-                                          f"miesiac={self.ID_miesiac}, rozdzial={self.ID_rozdzial}, "
-                                          f"dokument={self.ID_Dokumentu}, wydruk={self.IDWydruk}")
-                                    break
-                                    
-                            except json.JSONDecodeError as e:
-                                print(f"Błąd parsowania JSON postData: {e}")
-                                continue
-                                
-                except (json.JSONDecodeError, KeyError) as e:
-                    continue
-            
-            # Zapis do pliku JSON
-            output_file = Path(f"{file_name}.json")
-            with output_file.open("w", encoding='utf-8') as f:
-                json.dump(captured_data, f, indent=2, ensure_ascii=False)
-                
-            print(f"Zapisano {len(captured_data)} przechwyconych żądań do {output_file}")
-            
-        except Exception as e:
-            print(f"Błąd podczas przechwytywania: {e}")
-
-    def _extract_ids(self, data: dict):
-        """Wyodrębnij ID z danych"""
-        self.ID_szkid = data.get('szkid')
-        self.ID_rok = data.get('rok')
-        self.ID_miesiac = data.get('miesiac')
-        self.ID_rozdzial = data.get('rozdzial')
-        self.ID_Dokumentu = data.get('IdDokumentu')
-        self.IDWydruk = data.get('wydrukId')
-
-    def _extract_field_names(self, v_store_fields: list):
-        """Wyodrębnij nazwy pól"""
-        self.fields_name = [
-            field['name'] for field in v_store_fields 
-            if field.get('allowBlank') is False
-        ]
-
-    def login(self, loginwd: str = "", passwd: str = ""):
-        """Login do systemu"""
-        try:
-            # Oczekiwanie na pole loginu
-            lname = WebDriverWait(self.driver, self.wait_time).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "input[name=Login]"))
-            )
-            
-            if loginwd:
-                lname.clear()
-                lname.send_keys(loginwd)
-            
-            # Znalezienie pola hasła
-            lpass = self.driver.find_element(By.ID, "Haslo")
-            if passwd:
-                lpass.clear()
-                lpass.send_keys(passwd)
-            
-            # Automatyczne logowanie jeśli podano dane
-            if loginwd and passwd:
-                login_button = self.driver.find_element(By.ID, "ButtonLogowanie")
-                login_button.click()
-                
-                # Oczekiwanie na załadowanie menu
-                WebDriverWait(self.driver, self.wait_time).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "#ext-gen43"))
-                )
-                print("Zalogowano pomyślnie")
-            else:
-                # Oczekiwanie na ręczne logowanie
-                print("Oczekiwanie na ręczne logowanie...")
-                WebDriverWait(self.driver, float('inf')).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "#ext-gen43"))
-                )
-                print("Zalogowano ręcznie")
-                
-        except Exception as e:
-            print(f"Błąd podczas logowania: {e}")
-            raise
-
-    def get_headers(self):
-        """Pobranie cookies z przeglądarki zamiast z selenium-wire"""
-        try:
-            # Pobranie cookies bezpośrednio z przeglądarki
-            browser_cookies = self.driver.get_cookies()
-            self.cookies = {cookie['name']: cookie['value'] for cookie in browser_cookies}
-            
-            # Dodatkowo, możemy pobrać cookies z performance logs
-            logs = self.driver.get_log("performance")
-            for log_entry in logs:
-                try:
-                    message = json.loads(log_entry.get('message', '{}'))
-                    log_message = message.get('message', {})
-                    
-                    if log_message.get('method') == 'Network.requestWillBeSent':
-                        headers = log_message.get('params', {}).get('request', {}).get('headers', {})
-                        cookie_header = headers.get('Cookie')
-                        
-                        if cookie_header:
-                            # Parsowanie cookie header
-                            for cookie_pair in cookie_header.split('; '):
-                                if '=' in cookie_pair:
-                                    key, value = cookie_pair.split('=', 1)
-                                    self.cookies[key] = value
-                            break
-                            
-                except (json.JSONDecodeError, KeyError):
-                    continue
-            
-            print(f"Pobrano {len(self.cookies)} cookies")
-            
-        except Exception as e:
-            print(f"Błąd podczas pobierania headers: {e}")
+class SiteWrap(SiteWrapBase):
+    SCHEMAT = 'czestochowa'
 
     def select_bills(self, rozdzial = None):
         """Nawigacja do formularza rozliczenia"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
         try:
             # Kliknięcie głównego menu
-            menu_exe = WebDriverWait(self.driver, self.wait_time).until(
+            menu_exe = self._wait(self.wait_time).until(
                 EC.element_to_be_clickable((By.XPATH, "//em[contains(@class, 'x-unselectable')]//button[contains(text(), 'Rozliczenie dotacji')]"))
             )
             menu_exe.click()            
 
-            bazowy_title = WebDriverWait(self.driver, self.wait_time).until(
+            bazowy_title = self._wait(self.wait_time).until(
                 EC.element_to_be_clickable((By.XPATH, f"//div[contains(@class, 'x-grid-group-title') and normalize-space(text()='{rozdzial}')]"))
             )
             # Scroll + kliknięcie na title (nie na body!)
             self.driver.execute_script("arguments[0].scrollIntoView(true);", bazowy_title)
-            time.sleep(0.5)
+            self._sleep(0.5)
             print("Czekam na miesiące", rozdzial) 
             # Czekaj na rozwinięcie (pojawi się x-grid-group-body)
-            rozdzial_element = WebDriverWait(self.driver, self.wait_time).until(
+            rozdzial_element = self._wait(self.wait_time).until(
                 EC.presence_of_element_located((By.XPATH, f"//div[contains(@class, 'x-grid-group-body') and ancestor::div[contains(@class, 'x-grid-group') and .//div[contains(text(), '{rozdzial}')]]]"))
             )
             #pencil_icon = rozdzial_element.find_element(By.CLASS_NAME, "pencil")
@@ -280,6 +57,7 @@ class SiteWrap:
             #add_button.click()
             
             print("Nawigacja do formularza zakończona pomyślnie")
+            self._bills_selected = True
             
         except Exception as e:
             print(f"Błąd podczas nawigacji: {e}")
@@ -287,6 +65,8 @@ class SiteWrap:
 
     def switch_to_month_and_documents(self, miesiac_num: str = "", rozdzial = None):
         """Przełączenie na konkretny miesiąc i zakładkę Dokumenty"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
         try:
             miesiac_tekst = "Rok"#self.miesiace_map.get(miesiac_num, f"{miesiac_num} ??")
             print(f"Przełączam na miesiąc: {miesiac_tekst} ({miesiac_num})")
@@ -310,23 +90,23 @@ class SiteWrap:
                 )
 
             
-            month_row = WebDriverWait(self.driver, self.wait_time).until(
+            month_row = self._wait(self.wait_time).until(
                 EC.element_to_be_clickable((
                     By.XPATH, month_xpath))
             )
             
             self.driver.execute_script("arguments[0].scrollIntoView({block:'center'});", month_row)
-            time.sleep(0.3)
+            self._sleep(0.3)
             month_row.click()
             # Oczekiwanie na zaznaczenie
-            WebDriverWait(self.driver, self.wait_time).until(
+            self._wait(self.wait_time).until(
                 EC.presence_of_element_located((
                     By.XPATH, 
                     f"//div[contains(@class, 'x-grid3-row-selected')]//div[normalize-space(text())='{miesiac_tekst}']"
                 ))
             )
             # Kliknięcie zakładki Dokumenty
-            document_tab = WebDriverWait(self.driver, self.wait_time).until(
+            document_tab = self._wait(self.wait_time).until(
                 EC.element_to_be_clickable((By.XPATH, "//li[.//span[contains(@class, 'x-tab-strip-text') and normalize-space(text())='Wydatki']]"))
             )
             document_tab.click()
@@ -337,15 +117,19 @@ class SiteWrap:
             print(f"Błąd przełączania na miesiąc {miesiac_tekst}: {e}")
             raise
 
+    def _navigate_year(self, rozdzial = None):
+        """Nawigacja po UI do zestawienia rocznego i przechwycenie kontekstu formularza"""
+        if not self._bills_selected:
+            self.select_bills(rozdzial)
+        self.switch_to_month_and_documents("Rok", rozdzial)
+        self.capture_response(f"capture")
+
     def parse_file(self, fname: Optional[str] = None, rozdzial = None, encoding: str = "utf-8"):
         """Parsowanie pliku CSV z wydatkami"""
         url = f'https://{self.host}/ODPN/Szkoly/RozliczenieDotacji/Kontrolki/Taby/Dokument/Dokument.asmx/SubmitForm'
         file_name = fname or f"wydatki_{self.ID_rozdzial}.csv"
         
-        numery_pol = {
-            '1.': (1, -1), '2.': (2, -2), '3.1.': (4, -3),
-            '3.2.': (5, -4), '3.3.': (6, -5), '3.4.': (7, -6), '3.5.': (8, -7)
-        }
+        numery_pol = self._numery_pol()
         
         niepowodzenia = []
         file_path = Path(file_name)
@@ -354,102 +138,55 @@ class SiteWrap:
             raise FileNotFoundError(f"Plik {file_name} nie istnieje")
         
         print(f"Przetwarzanie pliku: {file_path}")
-        self.switch_to_month_and_documents("Rok", rozdzial)
-        self.capture_response(f"capture")
-        with file_path.open('r', encoding=encoding) as plik_dane:
-            csv_reader = csv.reader(plik_dane, delimiter=';')
-            
-            for row_num, dane in enumerate(csv_reader, 1):
-                try:
-                    if len(dane) < 8:
-                        niepowodzenia.append((row_num, "Za mało kolumn w wierszu"))
+        if not self._preflight(file_path, encoding):
+            return
+        self._open_journal(file_path)
+        # Kontekst formularza z cache albo przełączenie na "Rok" + capture
+        navigate = lambda: self._navigate_year(rozdzial)
+        self._ensure_context(rozdzial, "Rok", navigate)
+        
+        def wiersze(tylko = None):
+            """Leniwe przygotowanie danych POST - wiersze z błędami trafiają do niepowodzeń"""
+            with file_path.open('r', encoding=encoding) as plik_dane:
+                csv_reader = csv.reader(plik_dane, delimiter=';')
+                
+                for row_num, dane in enumerate(csv_reader, 1):
+                    if tylko is not None and row_num not in tylko:
                         continue
-                    
-                    # Przetwarzanie danych z wiersza
-                    dane_post = self._process_row_data(dane, numery_pol, row_num)
-                    if dane_post is None:
-                        niepowodzenia.append((row_num, f"Nieznany rodzaj wydatku: {dane[1]}"))
+                    try:
+                        if len(dane) < 8:
+                            niepowodzenia.append((row_num, "Za mało kolumn w wierszu"))
+                            continue
+                        
+                        nr_pozycji = numery_pol.get(dane[1].strip())
+                        if nr_pozycji is None:
+                            niepowodzenia.append((row_num, f"Nieznany rodzaj wydatku: {dane[1]}"))
+                            continue
+                        
+                        # Przetwarzanie danych z wiersza
+                        dane_post = self._process_row_data(dane, nr_pozycji, row_num)
+                    except Exception as e:
+                        print(f"✗ Błąd: {e}")
+                        niepowodzenia.append((row_num, f"Błąd przetwarzania: {str(e)}"))
                         continue
                     
-                    # Wysłanie żądania
-                    print(f"Wysyłam żądanie dla wiersza {row_num}... ", end='')
-                    success = self._send_request(url, dane_post)
-                    
-                    if success:
-                        print("✓ Sukces")
-                    else:
-                        print("✗ Błąd")
-                        niepowodzenia.append((row_num, "Błąd wysyłania żądania"))
-                    
-                    time.sleep(1)  # Rate limiting
-                    
-                except Exception as e:
-                    print(f"✗ Błąd: {e}")
-                    niepowodzenia.append((row_num, f"Błąd przetwarzania: {str(e)}"))
+                    yield row_num, dane_post
+        
+        # Wysłanie żądań (sekwencyjnie lub równolegle - patrz in_flight)
+        niepowodzenia.extend(self._submit_with_context(url, wiersze, rozdzial, "Rok", navigate))
         
+        self._finish_sync()
         self._report_errors(niepowodzenia)
+        self._close_journal()
         self._finalize_form()
 
-    def _process_row_data(self, dane: List[str], numery_pol: Dict, row_num: int) -> Optional[Dict]:
-        """Przetworzenie danych z wiersza CSV"""
-        try:
-            poz_z_tabeli = dane[1].strip()
-            
-            if poz_z_tabeli not in numery_pol:
-                return None
-            
-            nr_pozycji = numery_pol[poz_z_tabeli]
-            
-            # Walidacja i konwersja danych
-            pelna_kwota = self._parse_amount(dane[3])
-            kwota_dotacji = self._parse_amount(dane[7])
-            kwota_orzeczenia = self._parse_amount(dane[8])
-            kwota_orzeczenia_rozliczona = self._parse_amount(dane[9])
-            
-            dane_post = {
-                "Id": str(nr_pozycji[1]),
-                "ID_szkid": self.ID_szkid,
-                "ID_rok": self.ID_rok,
-                "ID_miesiac": self.ID_miesiac,
-                "ID_rozdzial": self.ID_rozdzial,
-                "NumerPola": str(nr_pozycji[0]),
-                "ID_Dokumentu": self.ID_Dokumentu,
-                "ID_Wydruk": self.IDWydruk,
-            }
-            
-            # Dodanie danych do pól według kolejności
-            if len(self.fields_name) >= 7:
-                dane_post[self.fields_name[0]] = dane[2].strip()  # rodzaj_i_nr_dowodu
-                dane_post[self.fields_name[1]] = pelna_kwota       # pelna_kwota_zobowiazania
-                dane_post[self.fields_name[2]] = f"{dane[4].strip()}T00:00:00"  # data_wystawienia
-                dane_post[self.fields_name[3]] = dane[5].strip()   # przedmiot_zakupu
-                dane_post[self.fields_name[4]] = f"{dane[6].strip()}T00:00:00"  # data_platnosci
-                dane_post[self.fields_name[5]] = kwota_dotacji     # kwota_z_dotacji
-                dane_post[self.fields_name[6]] = kwota_orzeczenia  # kwota_orzeczenia
-                dane_post[self.fields_name[7]] = kwota_orzeczenia_rozliczona  # NOWE pole
-                print(dane_post)
-            return dane_post
-            
-        except (IndexError, ValueError) as e:
-            raise ValueError(f"Błąd przetwarzania danych w wierszu {row_num}: {e}")
-
-    def _parse_amount(self, amount_str: str) -> float:
-        """Bezpieczne parsowanie kwot"""
-        cleaned = amount_str.replace(',', '.').replace(' ', '').strip()
-        return round(float(cleaned), 2)
-
     def _send_request(self, url: str, data: Dict) -> bool:
         """Wysłanie żądania POST"""
         try:
-            response = requests.post(
-                url=url,
+            response = self.http.post(
+                url,
                 json={"data": data},
-                cookies=self.cookies,
-                timeout=30,
-                headers={
-                    'Content-Type': 'application/json',
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
+                headers={'Content-Type': 'application/json'}
             )
             response.raise_for_status()
             return True
@@ -460,15 +197,20 @@ class SiteWrap:
 
     def _report_errors(self, niepowodzenia: List):
         """Raportowanie błędów"""
+        self.metrics.inc('odpn_wiersze_bledne_total', len(niepowodzenia))
         if niepowodzenia:
             print(f"\nLista błędów ({len(niepowodzenia)}):")
-            for row_num, error in niepowodzenia:
+            for row_num, error in sorted(niepowodzenia, key=lambda n: n[0]):
                 print(f"Wiersz {row_num}: {error}")
         else:
             print("\nWszystkie wiersze przetworzone pomyślnie!")
 
     def _finalize_form(self):
         """Finalizacja formularza"""
+        if self._driver is None:
+            return
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
         try:
             # Ukrycie maski
             mask_elements = self.driver.find_elements(By.CLASS_NAME, "ext-el-mask")
@@ -476,7 +218,7 @@ class SiteWrap:
                 self.driver.execute_script("arguments[0].style.display = 'none';", mask)
             
             # Kliknięcie linku powrotu
-            return_element = WebDriverWait(self.driver, self.wait_time).until(
+            return_element = self._wait(self.wait_time).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, "#ext-gen61"))
             )
             
@@ -488,16 +230,6 @@ class SiteWrap:
         except Exception as e:
             print(f"Błąd podczas finalizacji: {e}")
 
-    def __enter__(self):
-        """Context manager entry"""
-        return self
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        """Context manager exit"""
-        if hasattr(self, 'driver'):
-            self.driver.quit()
-            print("Przeglądarka zamknięta")
-
 # Użycie
 if __name__ == "__main__":
     config = None
@@ -508,10 +240,18 @@ if __name__ == "__main__":
     except:
         print('Nie otworzono wskazanego pliku')
     print(config)
-    with SiteWrap(config.get('strona') or "") as site:
+    # --resume: pominięcie wierszy potwierdzonych w dzienniku wysyłki
+    # --sync: wysyłka tylko wierszy, których nie ma na serwerze (--sync-usun: także kasowanie nadmiarowych)
+    # --bez-walidacji: wysyłka bez wstępnego sprawdzenia całego pliku
+    # --slad: ślad każdego wiersza (dane POST, żądanie, odpowiedź) w ~/.odpn/slady
+    with SiteWrap(config.get('strona') or "", in_flight=config.get('rownolegle', 1),
+                  rate_limit=config.get('limiter'), szkid=config.get('szkid'), rok=config.get('rok'),
+                  resume='--resume' in sys.argv,
+                  sync='--sync' in sys.argv, sync_delete='--sync-usun' in sys.argv,
+                  validate='--bez-walidacji' not in sys.argv,
+                  trace_dir=DOMYSLNY_KATALOG_SLADOW if '--slad' in sys.argv else None) as site:
         site.login(config.get('login') if config else "", config.get('haslo') if config else "")  # ręczne logowanie
         site.get_headers()
-        site.select_bills(config.get('rozdzial'))
         site.parse_file(config.get('plik') if config else "czestochowa.csv", config.get('rozdzial'))  #sztywna nazwa pliku do parsowania
     
     # Przykład użycia z context managerem
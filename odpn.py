@@ -1,12 +1,14 @@
-from seleniumwire import webdriver
+from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-import requests
 import time
+import json
 from urllib.parse import urlparse
+from odpn_http import HttpPool
+from odpn_cdp import NetworkListener, post_json, PERF_LOGGING_PREFS
 
 class SiteWrap:
     def __init__(self, host, rozdzialSzkola=0, options = ()):
@@ -16,6 +18,8 @@ class SiteWrap:
         chrome_options.add_experimental_option('detach',True)
         chrome_options.add_argument('--enable-logging')
         chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})     
+        # Tylko zdarzenia Network w logu performance (bez proxy seleniumwire)
+        chrome_options.add_experimental_option('perfLoggingPrefs', PERF_LOGGING_PREFS)
 
         for i in options:
             chrome_options.add_argument("--" + i)
@@ -26,9 +30,12 @@ class SiteWrap:
         #chrome_options.add_argument("--no-sandbox")
         #self.driver = webdriver.Chrome(options=chrome_options)
         self.driver = webdriver.Chrome(options=chrome_options)
-        self.driver.execute_cdp_cmd("Network.enable", {})
+        # Żądania do usług .asmx ODPN z CDP - reszta ruchu (strony, skrypty, obrazy) nie jest przechowywana
+        self.network = NetworkListener(self.driver, url_filters=('.asmx',))
+        self.network.start()
 
         self.responses = []
+        self.http = HttpPool()
 
         while True:
             try:
@@ -47,34 +54,30 @@ class SiteWrap:
         self.waitTime = 20
 
     def capture_response(self, file_name="zrzut"):
-        logs = self.driver.get_log("performance")
-        f = open(f"{file_name}.txt", "w")
-        for l in logs:
-            for k in l.keys():
-                #print(k)
-                if k=='message':
-                    if l[k].find(f'https://{self.host}/ODPN/Szkoly/RozliczenieDotacji/Kontrolki/Taby/Dokument/Dokument.asmx/GridGetData') == -1 or l[k].find('Network.requestWillBeSent') == -1:
-                        continue
-                    d = eval(l[k].replace('false','False').replace('true','True'))
-                    d = eval(d['message']['params']['request']['postData'])
-                    #print(d['data'])
-                    self.ID_szkid = d['data']['szkid']
-                    self.ID_rok = d['data']['rok']
-                    self.ID_miesiac = d['data']['miesiac']
-                    self.ID_rozdzial = d['data']['rozdzial']
-                    self.ID_Dokumentu = d['data']['IdDokumentu']
-                    self.IDWydruk = d['data']['wydrukId']
-                    self.fieldsName = []
-                    for row in d['data']['v_store_fields']:
-                        if 'allowBlank' in row.keys():
-                            if row['allowBlank']==False:
-                                self.fieldsName.append(row['name'])
-                    print(self.fieldsName)
-                    print(self.ID_szkid,self.ID_rok,
-                          self.ID_miesiac,self.ID_rozdzial,self.ID_Dokumentu,self.IDWydruk)
-                    break
-                    f.write(f"{self.d['data']}\n")
-        f.close()
+        def kontekst(event):
+            d = post_json(event)
+            return isinstance(d, dict) and isinstance(d.get('data'), dict)
+
+        event = self.network.wait_for('Dokument.asmx/GridGetData', predicate=kontekst, timeout=self.waitTime)
+        if event is None:
+            print('Nie przechwycono żądania GridGetData')
+            return
+        d = post_json(event)
+        self.ID_szkid = d['data']['szkid']
+        self.ID_rok = d['data']['rok']
+        self.ID_miesiac = d['data']['miesiac']
+        self.ID_rozdzial = d['data']['rozdzial']
+        self.ID_Dokumentu = d['data']['IdDokumentu']
+        self.IDWydruk = d['data']['wydrukId']
+        self.fieldsName = []
+        for row in d['data']['v_store_fields']:
+            if row.get('allowBlank') == False:
+                self.fieldsName.append(row['name'])
+        print(self.fieldsName)
+        print(self.ID_szkid,self.ID_rok,
+              self.ID_miesiac,self.ID_rozdzial,self.ID_Dokumentu,self.IDWydruk)
+        with open(f"{file_name}.txt", "w", encoding='utf-8') as f:
+            f.write(json.dumps(d['data'], ensure_ascii=False) + "\n")
 
     def login(self, loginwd="", passwd=""):
         try:
@@ -92,19 +95,14 @@ class SiteWrap:
             pass
 
     def getHeaders(self):
-        #for h in self.driver.requests:
-        #    print(h.headers['cookie'])
-        self.cookies = dict()
-        for c in self.driver.requests[-1].headers['cookie'].split('; '):
-            tmp=c.split('=')
-            self.cookies[tmp[0]]=''
-            index=1
-            while(True):
-                self.cookies[tmp[0]] +=tmp[index]
-                index+=1
-                if index == len(tmp):
-                    break
-                self.cookies[tmp[0]] +='='                
+        # Ciasteczka z przeglądarki + nagłówek Cookie ostatniego żądania .asmx (zamiast driver.requests)
+        self.cookies = {c['name']: c['value'] for c in self.driver.get_cookies()}
+        self.network.poll()
+        for c in (self.network.cookie_header or '').split('; '):
+            if '=' in c:
+                key, value = c.split('=', 1)
+                self.cookies[key] = value
+        self.http.set_cookies(self.cookies)
         #print(self.cookies)
 
     def selectBills(self):
@@ -179,7 +177,7 @@ class SiteWrap:
 
             print("wysyłam żądanie... ", end='')
             print({"data": dane_post}, self.cookies)
-            r = requests.post(url=url, json={"data": dane_post}, cookies=self.cookies)
+            r = self.http.post(url, json={"data": dane_post})
 
         print("Lista błędów:")
         for blad in niepowodzenia:
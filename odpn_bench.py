@@ -0,0 +1,312 @@
+"""Benchmark end-to-end wysyłki (wariant Bełchatów) na lokalnym serwerze odpn_stub
+
+    python odpn_bench.py uruchom --wiersze 100,10000,100000 --opoznienie 0.01 --wyjscie przed.json
+    python odpn_bench.py uruchom --przegladarka ...     # także nawigacja, capture_response i clear_all_documents
+    python odpn_bench.py porownaj przed.json po.json
+
+Bez --przegladarka kontekst formularza pochodzi z cache (jeden miesiąc) i listy miesięcy (reszta),
+więc mierzona jest ścieżka HTTP; fazy wymagające Chrome są wtedy wykazane jako pominięte.
+Wynik (JSON): wiersze/s, p50/p95/p99 czasu żądań per endpoint i czas każdej fazy przepływu.
+Domyślny limiter tempa (max 10 SubmitForm/s) dominuje w czasie dużych plików - do pomiaru samego
+klienta i serwera: --limiter '{"rate": 1000, "max_rate": 100000, "burst": 100}'.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from odpn_context import ContextCache
+from odpn_http import HttpPool
+from odpn_schema import SCHEMATY
+from odpn_stub import LISTA, StubServer
+
+# Fazy przepływu w kolejności wywołań (metody SiteWrap mierzone w każdym przebiegu)
+FAZY = ('__init__', '_initialize_connection', 'login', 'get_headers', 'select_bills',
+        'switch_to_month_and_documents', 'capture_response', 'parse_file', 'clear_all_documents',
+        '_finalize_form')
+
+# Fazy, które bez przeglądarki nie są wykonywane
+FAZY_PRZEGLADARKI = {'select_bills', 'switch_to_month_and_documents', 'capture_response',
+                     'clear_all_documents'}
+
+SZKOLA = 1001
+ROK = 2025
+ROZDZIAL = '80120'
+
+
+def percentyle(wartosci: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max w milisekundach (najbliższa pozycja)"""
+    if not wartosci:
+        return {}
+    posortowane = sorted(wartosci)
+    n = len(posortowane)
+
+    def p(q: float) -> float:
+        return round(posortowane[min(n - 1, max(0, int(q * n + 0.5) - 1))] * 1000, 3)
+
+    return {'p50_ms': p(0.50), 'p95_ms': p(0.95), 'p99_ms': p(0.99),
+            'max_ms': round(posortowane[-1] * 1000, 3)}
+
+
+def synthetic_csv(path: Path, wiersze: int, tabela: str = 'oswiata') -> Path:
+    """Plik w formacie Bełchatowa: wiersze rozłożone po 12 miesiącach (pogrupowane), kategorie po kolei z tabeli"""
+    kategorie = list(SCHEMATY['belchatow']['numery_pol'][tabela])
+    with Path(path).open('w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        for i in range(wiersze):
+            miesiac = i * 12 // wiersze + 1
+            writer.writerow([
+                kategorie[i % len(kategorie)], '', f"{ROK}-{miesiac:02d}-10", f"FV/{i + 1}/{ROK}",
+                f"{ROK}-{miesiac:02d}-20", f"{100 + i % 900},{i % 100:02d}", f"{50 + i % 400},00", "", "",
+                f"{miesiac}/{ROK}",
+            ])
+    return Path(path)
+
+
+class PhaseTimer:
+    """Czas faz (metod) z podziałem na czas łączny i własny - fazy zagnieżdżone nie są liczone podwójnie"""
+
+    def __init__(self):
+        self.fazy = {}
+        self._stos = []
+
+    @contextlib.contextmanager
+    def faza(self, nazwa: str):
+        self._stos.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            czas = time.perf_counter() - start
+            dzieci = self._stos.pop()
+            if self._stos:
+                self._stos[-1] += czas
+            wpis = self.fazy.setdefault(nazwa, {'wywolania': 0, 'czas_s': 0.0, 'wlasny_s': 0.0})
+            wpis['wywolania'] += 1
+            wpis['czas_s'] += czas
+            wpis['wlasny_s'] += czas - dzieci
+
+    def wrap(self, obj, nazwa: str):
+        """Podmiana metody obiektu na mierzoną (atrybut instancji)"""
+        metoda = getattr(obj, nazwa, None)
+        if metoda is None:
+            return
+
+        def mierzona(*args, **kwargs):
+            with self.faza(nazwa):
+                return metoda(*args, **kwargs)
+        setattr(obj, nazwa, mierzona)
+
+    def wynik(self) -> Dict:
+        return {nazwa: {'wywolania': w['wywolania'], 'czas_s': round(w['czas_s'], 4),
+                        'wlasny_s': round(w['wlasny_s'], 4)}
+                for nazwa, w in self.fazy.items()}
+
+
+class RequestRecorder:
+    """Czas i status każdego żądania HTTP, per endpoint - bez oczekiwania na limiter tempa"""
+
+    def __init__(self):
+        self.czasy = {}
+        self.statusy = {}
+
+    def wrap(self, http: HttpPool):
+        request = http.session.request
+
+        def mierzone(method: str, url: str, **kwargs):
+            endpoint = HttpPool.endpoint(urlparse(url).path) or '/'
+            start = time.perf_counter()
+            status = 'wyjatek'
+            try:
+                response = request(method, url, **kwargs)
+                status = str(response.status_code)
+                return response
+            finally:
+                # list.append i dict.setdefault są atomowe - wywołania z wielu wątków (in_flight)
+                self.czasy.setdefault(endpoint, []).append(time.perf_counter() - start)
+                statusy = self.statusy.setdefault(endpoint, {})
+                statusy[status] = statusy.get(status, 0) + 1
+        http.session.request = mierzone
+
+    def wynik(self) -> Dict:
+        return {endpoint: dict(percentyle(czasy), n=len(czasy), statusy=self.statusy.get(endpoint, {}))
+                for endpoint, czasy in self.czasy.items()}
+
+
+def seed_contexts(cache_file: Path, host: str, server: StubServer):
+    """Kontekst jednego miesiąca i żądanie listy miesięcy w cache - jak po wcześniejszym przebiegu z przeglądarką"""
+    state = server.state
+    cache = ContextCache(cache_file)
+    doc = state.find_document(SZKOLA, ROZDZIAL, 1)
+    cache.put(ContextCache.key(host, SZKOLA, ROK, ROZDZIAL, '01'), state.grid_request(doc))
+    cache.put(ContextCache.key(host, SZKOLA, ROK, '*', 'lista'), {
+        'url': f"https://{host}{LISTA}", 'postData': json.dumps({'data': {}}),
+        'contentType': 'application/json; charset=UTF-8',
+    })
+
+
+def run_flow(server: StubServer, wiersze: int, katalog: Path, in_flight: int = 1,
+             rate_limit: Optional[Dict] = None, przegladarka: bool = False, wyjscie=None,
+             slad: Optional[Path] = None) -> Dict:
+    """Jeden przebieg całego przepływu dla pliku o podanej liczbie wierszy"""
+    import belchatow
+
+    csv_path = synthetic_csv(katalog / f"bench_{wiersze}.csv", wiersze)
+    cache_file = katalog / f"konteksty_{wiersze}.json"
+    if not przegladarka:
+        seed_contexts(cache_file, server.host, server)
+    server.state.reset()
+
+    timer = PhaseTimer()
+    recorder = RequestRecorder()
+    options = ('ignore-certificate-errors', 'headless=new') if przegladarka else ()
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stos:
+        if wyjscie is None:
+            wyjscie = stos.enter_context(open(os.devnull, 'w', encoding='utf-8'))
+        stos.enter_context(contextlib.redirect_stdout(wyjscie))
+        with timer.faza('__init__'):
+            site = belchatow.SiteWrap(server.host, options=options, in_flight=in_flight, rate_limit=rate_limit,
+                                      session_dir=None, context_file=cache_file, metrics_dir=None, trace_dir=slad,
+                                      szkid=SZKOLA, rok=ROK, verify=str(server.cert))
+        recorder.wrap(site.http)
+        for nazwa in FAZY[1:]:
+            timer.wrap(site, nazwa)
+        with site:
+            site.login(server.state.login, server.state.haslo)
+            site.get_headers()
+            if przegladarka:
+                site.select_bills(ROZDZIAL, SZKOLA)
+            site.parse_file(str(csv_path), SZKOLA, ROZDZIAL)
+            if przegladarka:
+                site.clear_all_documents(ROZDZIAL)
+    czas = time.perf_counter() - start
+
+    fazy = timer.wynik()
+    fazy = {nazwa: fazy[nazwa] for nazwa in FAZY if nazwa in fazy}
+    zadania = recorder.wynik()
+    wyslane = zadania.get('SubmitForm', {}).get('statusy', {}).get('200', 0)
+    wysylka = fazy.get('parse_file', {}).get('czas_s') or 0
+    return {
+        'wiersze': wiersze,
+        'czas_s': round(czas, 4),
+        'wiersze_s': round(wiersze / czas, 2) if czas else None,
+        'wysylka_wiersze_s': round(wiersze / wysylka, 2) if wysylka else None,
+        'wyslane': wyslane,
+        'na_serwerze': server.state.snapshot()['wiersze'],
+        'fazy': fazy,
+        'zadania': zadania,
+        'limiter': site.http.limiter.stats(),
+        'metryki': site.metrics.snapshot(),
+        'pominiete': [] if przegladarka else sorted(FAZY_PRZEGLADARKI),
+    }
+
+
+def _wersja() -> Optional[str]:
+    try:
+        wynik = subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                               cwd=Path(__file__).parent, timeout=10)
+        return wynik.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def uruchom(args) -> int:
+    rozmiary = [int(n) for n in args.wiersze.split(',')]
+    limiter = json.loads(args.limiter) if args.limiter else None
+    raport = {
+        'wersja': _wersja(),
+        'python': platform.python_version(),
+        'wariant': 'belchatow',
+        'przegladarka': args.przegladarka,
+        'slad': bool(args.slad),
+        'rownolegle': args.rownolegle,
+        'limiter': limiter,
+        'stub': {'opoznienie': args.opoznienie, 'rozrzut': args.rozrzut, 'pojemnosc': args.pojemnosc},
+        'przebiegi': [],
+    }
+    with tempfile.TemporaryDirectory(prefix='odpn_bench_') as katalog, \
+            StubServer(opoznienie=args.opoznienie, rozrzut=args.rozrzut, pojemnosc=args.pojemnosc,
+                       szkoly=(SZKOLA,), rok=ROK, rozdzialy=(ROZDZIAL,)) as server:
+        wyjscie = sys.stderr if args.verbose else None
+        for wiersze in rozmiary:
+            przebieg = run_flow(server, wiersze, Path(katalog), args.rownolegle, limiter, args.przegladarka, wyjscie,
+                                args.slad and Path(args.slad))
+            raport['przebiegi'].append(przebieg)
+            submit = przebieg['zadania'].get('SubmitForm', {})
+            print(f"{wiersze:>7} wierszy: {przebieg['czas_s']:.2f} s, {przebieg['wiersze_s']} wierszy/s, "
+                  f"SubmitForm p50/p95/p99 {submit.get('p50_ms')}/{submit.get('p95_ms')}/{submit.get('p99_ms')} ms",
+                  file=sys.stderr)
+
+    tekst = json.dumps(raport, indent=2, ensure_ascii=False)
+    if args.wyjscie:
+        Path(args.wyjscie).write_text(tekst + '\n', encoding='utf-8')
+    else:
+        print(tekst)
+    return 0
+
+
+def _zmiana(stara, nowa) -> str:
+    if not stara or nowa is None:
+        return 'n/d'
+    return f"{(nowa - stara) / stara * 100:+.1f}%"
+
+
+def porownaj(args) -> int:
+    """Zestawienie dwóch raportów: wiersze/s, percentyle SubmitForm i czas własny faz"""
+    stary = json.loads(Path(args.stary).read_text(encoding='utf-8'))
+    nowy = json.loads(Path(args.nowy).read_text(encoding='utf-8'))
+    print(f"{stary.get('wersja')} -> {nowy.get('wersja')}")
+    poprzednie = {p['wiersze']: p for p in stary['przebiegi']}
+    for przebieg in nowy['przebiegi']:
+        bazowy = poprzednie.get(przebieg['wiersze'])
+        if bazowy is None:
+            continue
+        print(f"\n{przebieg['wiersze']} wierszy: {bazowy['wiersze_s']} -> {przebieg['wiersze_s']} wierszy/s "
+              f"({_zmiana(bazowy['wiersze_s'], przebieg['wiersze_s'])})")
+        a, b = bazowy['zadania'].get('SubmitForm', {}), przebieg['zadania'].get('SubmitForm', {})
+        for klucz in ('p50_ms', 'p95_ms', 'p99_ms'):
+            print(f"  SubmitForm {klucz}: {a.get(klucz)} -> {b.get(klucz)} ({_zmiana(a.get(klucz), b.get(klucz))})")
+        for nazwa, faza in przebieg['fazy'].items():
+            poprzednia = bazowy['fazy'].get(nazwa, {}).get('wlasny_s')
+            print(f"  {nazwa}: {poprzednia} -> {faza['wlasny_s']} s ({_zmiana(poprzednia, faza['wlasny_s'])})")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    polecenia = parser.add_subparsers(dest='polecenie', required=True)
+
+    p = polecenia.add_parser('uruchom')
+    p.add_argument('--wiersze', default='100,10000,100000', help="rozmiary plików, po przecinku")
+    p.add_argument('--opoznienie', type=float, default=0.0, help="czas obsługi żądania API przez stub [s]")
+    p.add_argument('--rozrzut', type=float, default=0.0)
+    p.add_argument('--pojemnosc', type=int, default=16)
+    p.add_argument('--rownolegle', type=int, default=1, help="in_flight - żądania SubmitForm w locie")
+    p.add_argument('--limiter', help="parametry AdaptiveRateLimiter jako JSON (domyślnie jak w produkcji)")
+    p.add_argument('--przegladarka', action='store_true', help="pełny przepływ z Chrome (headless)")
+    p.add_argument('--slad', help="katalog plików śladu (pomiar narzutu trace_dir)")
+    p.add_argument('--wyjscie', help="plik JSON z wynikiem (domyślnie stdout)")
+    p.add_argument('-v', '--verbose', action='store_true', help="komunikaty przepływu na stderr")
+    p.set_defaults(funkcja=uruchom)
+
+    p = polecenia.add_parser('porownaj')
+    p.add_argument('stary')
+    p.add_argument('nowy')
+    p.set_defaults(funkcja=porownaj)
+
+    args = parser.parse_args(argv)
+    return args.funkcja(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
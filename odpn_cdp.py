@@ -0,0 +1,135 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+
+# Zdarzenia CDP potrzebne do przechwycenia kontekstu - reszta logu performance jest pomijana bez dekodowania
+METODY = ('Network.requestWillBeSent', 'Network.loadingFinished')
+
+# Tylko domena Network w logu performance (bez Page i tracingu)
+PERF_LOGGING_PREFS = {'enableNetwork': True, 'enablePage': False}
+
+# Limity buforów treści odpowiedzi w Chrome (bajty) - potrzebne tylko do Network.getResponseBody
+NETWORK_BUFFERS = {'maxTotalBufferSize': 10 * 1024 * 1024, 'maxResourceBufferSize': 2 * 1024 * 1024}
+
+
+def post_json(event: Dict) -> Optional[Dict]:
+    """Zdekodowane postData żądania (wynik zapamiętany w zdarzeniu)"""
+    if 'json' not in event:
+        try:
+            event['json'] = json.loads(event.get('postData') or 'null')
+        except json.JSONDecodeError:
+            event['json'] = None
+    return event['json']
+
+
+class NetworkListener:
+    """Przyrostowy odbiór zdarzeń Network z performance logs Chrome
+
+    Każdy wpis logu jest czytany raz; wstępny filtr po nazwie metody i fragmencie URL działa
+    na surowym tekście, więc json.loads dotyczy tylko pasujących zdarzeń. Pasujące żądania
+    trafiają do indeksu requestId -> żądanie z numerem kolejnym (seq).
+    """
+
+    def __init__(self, driver, url_filters: Iterable[str] = ('RozliczenieDotacji',), max_requests: int = 500):
+        self.driver = driver
+        self.url_filters = tuple(url_filters)
+        self.max_requests = max_requests
+        self.requests = OrderedDict()
+        self.cookie_header = None
+        self.active = False
+        self._seq = 0
+        # Statystyki: wpisy logu / wpisy zdekodowane
+        self.entries = 0
+        self.decoded = 0
+
+    def start(self):
+        """Włączenie przechwytywania (domena Network z ograniczonym buforem)"""
+        if not self.active:
+            self.driver.execute_cdp_cmd("Network.enable", NETWORK_BUFFERS)
+            self.active = True
+
+    def stop(self):
+        """Wyłączenie przechwytywania po uzyskaniu kontekstu - Chrome i chromedriver przestają gromadzić zdarzenia"""
+        if not self.active:
+            return
+        self.poll()
+        self.driver.execute_cdp_cmd("Network.disable", {})
+        self.active = False
+        self.requests.clear()
+
+    def _wanted(self, raw: str) -> bool:
+        if '"Network.requestWillBeSent"' in raw:
+            return any(f in raw for f in self.url_filters)
+        return '"Network.loadingFinished"' in raw and bool(self.requests)
+
+    def poll(self) -> int:
+        """Pobranie nowych wpisów logu, zwraca liczbę nowych żądań w indeksie"""
+        new = 0
+        for log_entry in self.driver.get_log("performance"):
+            self.entries += 1
+            raw = log_entry.get('message') or ''
+            if not self._wanted(raw):
+                continue
+            try:
+                entry = json.loads(raw)
+            except json.JSONDecodeError:
+                continue
+            message = entry.get('message', {})
+            self.decoded += 1
+            params = message.get('params', {})
+            request_id = params.get('requestId')
+
+            if message.get('method') == 'Network.requestWillBeSent':
+                request = params.get('request', {})
+                if not any(f in request.get('url', '') for f in self.url_filters):
+                    continue
+                self._seq += 1
+                self.requests[request_id] = {
+                    'seq': self._seq,
+                    'requestId': request_id,
+                    'url': request.get('url', ''),
+                    'method': request.get('method'),
+                    'headers': request.get('headers', {}),
+                    'postData': request.get('postData'),
+                    'timestamp': log_entry.get('timestamp'),
+                    # Identyfikator karty (target DevTools), z której wyszło żądanie
+                    'webview': entry.get('webview'),
+                    'finished': False,
+                }
+                self.cookie_header = request.get('headers', {}).get('Cookie') or self.cookie_header
+                new += 1
+                while len(self.requests) > self.max_requests:
+                    self.requests.popitem(last=False)
+            elif request_id in self.requests:
+                self.requests[request_id]['finished'] = True
+        return new
+
+    @property
+    def mark(self) -> int:
+        """Numer ostatniego żądania w indeksie - punkt odniesienia dla wait_for"""
+        return self._seq
+
+    def find(self, endpoint: str, after: int = 0,
+             predicate: Optional[Callable[[Dict], bool]] = None) -> Optional[Dict]:
+        """Pierwsze żądanie do endpointu o numerze większym niż after"""
+        for event in self.requests.values():
+            if event['seq'] <= after or endpoint not in event['url']:
+                continue
+            if predicate is None or predicate(event):
+                return event
+        return None
+
+    def wait_for(self, endpoint: str, after: int = 0, predicate: Optional[Callable[[Dict], bool]] = None,
+                 timeout: float = 20, finished: bool = False, interval: float = 0.2) -> Optional[Dict]:
+        """Oczekiwanie na następne żądanie do endpointu (opcjonalnie aż do końca odpowiedzi)"""
+        self.start()
+        deadline = time.monotonic() + timeout
+        while True:
+            self.poll()
+            event = self.find(endpoint, after, predicate)
+            if event is not None and (event['finished'] or not finished):
+                return event
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(interval)
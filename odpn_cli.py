@@ -0,0 +1,151 @@
+"""Polecenia bez przeglądarki i bez sieci - start w milisekundach (nie importuje Selenium ani requests)
+
+    python odpn_cli.py walidacja plik.csv --schemat belchatow --tabela oswiata
+    python odpn_cli.py dry-run plik.csv --schemat odpn2 --host czestochowa.odpn.pl --wyjscie dane.jsonl
+    python odpn_cli.py dziennik plik.csv
+"""
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from odpn_context import ContextCache, DOMYSLNY_PLIK
+from odpn_journal import read_entries
+from odpn_schema import SCHEMATY, category_index, compile_schema
+from odpn_validate import validate_file
+
+# Pola żądania GridGetData -> pola ID w danych POST (jak SiteWrapBase._payload_ids)
+POLA_ID = {
+    'ID_szkid': 'szkid', 'ID_rok': 'rok', 'ID_miesiac': 'miesiac',
+    'ID_rozdzial': 'rozdzial', 'ID_Dokumentu': 'IdDokumentu', 'ID_Wydruk': 'wydrukId',
+}
+
+
+def _tabela(schemat: str, tabela: Optional[str]) -> str:
+    tabele = SCHEMATY[schemat]['numery_pol']
+    if tabela is None:
+        return 'domyslne' if 'domyslne' in tabele else next(iter(tabele))
+    if tabela not in tabele:
+        raise SystemExit(f"Schemat {schemat} nie ma tabeli '{tabela}' (dostępne: {', '.join(tabele)})")
+    return tabela
+
+
+def _report(problemy: List[Tuple[int, str]]) -> int:
+    for row_num, opis in problemy:
+        print(f"Wiersz {row_num}: {opis}")
+    print(f"{len(problemy)} błędów" if problemy else "Plik poprawny", file=sys.stderr)
+    return 1 if problemy else 0
+
+
+def _position(schemat: str, tabela: str) -> Callable[[List[str]], Tuple[int, int]]:
+    """Wiersz CSV -> (NumerPola, Id) tak jak w parse_file wariantu"""
+    kolumna, dopasowanie = SCHEMATY[schemat]['kategoria']
+    numery_pol = SCHEMATY[schemat]['numery_pol'][tabela]
+    if dopasowanie == 'indeks':
+        indeks = category_index(schemat, tabela)
+        return lambda dane: numery_pol[indeks.match(dane[kolumna])[0]]
+    return lambda dane: numery_pol[dane[kolumna].strip()]
+
+
+def _context(host: Optional[str], context_file: Path) -> Optional[Dict]:
+    cache = ContextCache(context_file)
+    return cache.find(f"{host}|" if host else "")
+
+
+def walidacja(args) -> int:
+    tabela = _tabela(args.schemat, args.tabela)
+    return _report(validate_file(args.plik, args.schemat, tabela, args.kodowanie))
+
+
+def dry_run(args) -> int:
+    """Dane POST, które zostałyby wysłane - pola formularza z cache kontekstów (albo zastępcze pole_N)"""
+    tabela = _tabela(args.schemat, args.tabela)
+    problemy = validate_file(args.plik, args.schemat, tabela, args.kodowanie)
+    if problemy:
+        return _report(problemy)
+
+    schema = SCHEMATY[args.schemat]
+    kontekst = _context(args.host, args.konteksty)
+    if kontekst is not None:
+        fields_name = [f['name'] for f in kontekst.get('v_store_fields', []) if f.get('allowBlank') is False]
+        ids = {pole: kontekst.get(klucz) for pole, klucz in POLA_ID.items()}
+    else:
+        print("Brak kontekstu w cache - pola zastępcze, ID dokumentu puste", file=sys.stderr)
+        fields_name = [f"pole_{i}" for i in range(len(schema['pola']))]
+        ids = {pole: None for pole in POLA_ID}
+    transform = compile_schema(schema, fields_name)
+    pozycja = _position(args.schemat, tabela)
+
+    wyjscie = Path(args.wyjscie).open('w', encoding='utf-8') if args.wyjscie else sys.stdout
+    licznik = 0
+    bledy = []
+    try:
+        with Path(args.plik).open('r', encoding=args.kodowanie) as plik:
+            for row_num, dane in enumerate(csv.reader(plik, delimiter=';'), 1):
+                try:
+                    dane_post = transform(dane, pozycja(dane), ids)
+                except Exception as e:
+                    bledy.append((row_num, f"Błąd przetwarzania: {e!r}"))
+                    continue
+                wyjscie.write(json.dumps({'wiersz': row_num, 'dane': dane_post}, ensure_ascii=False) + '\n')
+                licznik += 1
+    finally:
+        if wyjscie is not sys.stdout:
+            wyjscie.close()
+    print(f"{licznik} wierszy do wysłania", file=sys.stderr)
+    # Błędy na stderr - stdout może być wyjściem z danymi POST
+    for row_num, opis in bledy:
+        print(f"Wiersz {row_num}: {opis}", file=sys.stderr)
+    if bledy:
+        print(f"{len(bledy)} błędów", file=sys.stderr)
+        return 1
+    return 0
+
+
+def dziennik(args) -> int:
+    """Podsumowanie dziennika wysyłki: potwierdzone wiersze i wiersze, których ostatnia próba się nie udała"""
+    path = Path(args.plik)
+    if not path.name.endswith('.dziennik.jsonl'):
+        path = path.with_name(f"{path.name}.dziennik.jsonl")
+    wpisy = 0
+    ostatnie = {}
+    for entry in read_entries(path):
+        wpisy += 1
+        ostatnie[entry.get('row')] = entry
+    if not wpisy:
+        print(f"Brak dziennika: {path}")
+        return 1
+    bledy = sorted((row, e) for row, e in ostatnie.items() if not e.get('ok'))
+    print(f"{path}: {wpisy} wpisów, {len(ostatnie) - len(bledy)} wierszy potwierdzonych, {len(bledy)} z błędem")
+    for row, entry in bledy:
+        print(f"  Wiersz {row}: {entry.get('error') or entry.get('status')}")
+    return 1 if bledy else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    polecenia = parser.add_subparsers(dest='polecenie', required=True)
+
+    for nazwa, funkcja in (('walidacja', walidacja), ('dry-run', dry_run)):
+        p = polecenia.add_parser(nazwa)
+        p.add_argument('plik')
+        p.add_argument('--schemat', required=True, choices=sorted(SCHEMATY))
+        p.add_argument('--tabela')
+        p.add_argument('--kodowanie', default='utf-8')
+        p.set_defaults(funkcja=funkcja)
+    polecenia.choices['dry-run'].add_argument('--host')
+    polecenia.choices['dry-run'].add_argument('--konteksty', type=Path, default=DOMYSLNY_PLIK)
+    polecenia.choices['dry-run'].add_argument('--wyjscie')
+
+    p = polecenia.add_parser('dziennik')
+    p.add_argument('plik', help="plik CSV albo plik .dziennik.jsonl")
+    p.set_defaults(funkcja=dziennik)
+
+    args = parser.parse_args(argv)
+    return args.funkcja(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+# Domyślny plik indeksu kontekstów formularza
+DOMYSLNY_PLIK = Path.home() / ".odpn" / "konteksty.json"
+
+
+class ContextCache:
+    """Indeks danych GridGetData (ID_* i v_store_fields) per (host, szkoła, rok, rozdział, miesiąc)"""
+
+    def __init__(self, path: Path = DOMYSLNY_PLIK):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._index = None
+
+    @staticmethod
+    def key(host: str, szkid, rok, rozdzial, miesiac) -> str:
+        return "|".join(str(part) for part in (host, szkid, rok, rozdzial, miesiac))
+
+    @staticmethod
+    def account_key(host: str, account: str) -> str:
+        """Klucz szkoły i roku poznanych dla konta (login nie trafia do pliku wprost)"""
+        konto = hashlib.sha1((account or "reczne").encode('utf-8')).hexdigest()[:12]
+        return f"{host}|konto|{konto}"
+
+    def _load(self) -> Dict:
+        if self._index is None:
+            try:
+                with self.path.open('r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._index = {}
+        return self._index
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._load().get(key)
+            return entry['data'] if entry else None
+
+    def find(self, prefix: str) -> Optional[Dict]:
+        """Dowolny wpis o kluczu zaczynającym się od prefix (np. szablon rozdziału)"""
+        with self._lock:
+            for key, entry in self._load().items():
+                if key.startswith(prefix):
+                    return entry['data']
+        return None
+
+    def put(self, key: str, data: Dict):
+        with self._lock:
+            self._load()[key] = {'data': data, 'saved': time.time()}
+            self._save()
+
+    def drop(self, key: str):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
@@ -0,0 +1,979 @@
+# Selenium jest importowane dopiero przy starcie przeglądarki - ścieżki HTTP, walidacja i dziennik działają bez niego
+import functools
+import requests
+import time
+import json
+from collections import deque
+from urllib.parse import urlparse
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from odpn_http import HttpPool
+from odpn_login import http_login, session_valid
+from odpn_ratelimit import AdaptiveRateLimiter
+from odpn_submit import SubmitEngine, BLAD_WYSYLANIA
+from odpn_session import SessionCache, DOMYSLNY_KATALOG
+from odpn_context import ContextCache, DOMYSLNY_PLIK
+from odpn_resolver import ContextResolver, find_list_request
+from odpn_journal import SubmitJournal
+from odpn_sync import SyncIndex, server_rows
+from odpn_spill import SpilledList
+from odpn_cdp import NetworkListener, post_json, PERF_LOGGING_PREFS
+from odpn_schema import SCHEMATY, CategoryIndex, category_index, compile_schema
+from odpn_validate import validate_file
+from odpn_metrics import DOMYSLNY_KATALOG_METRYK, RunMetrics, TimedWait
+from odpn_trace import Tracer
+
+# Pola żądania GridGetData, bez których kontekst formularza jest niepełny
+REQUIRED_FIELDS = {'szkid', 'rok', 'miesiac', 'rozdzial', 'IdDokumentu', 'wydrukId'}
+
+# Fazy przebiegu mierzone w odpn_faza_sekundy_total (metody, których wariant nie ma, są pomijane)
+FAZY = ('login', 'select_bills', 'switch_to_month_and_documents', 'capture_response', 'parse_file',
+        'clear_all_documents')
+
+
+class SiteWrapBase:
+    """Wspólna część SiteWrap: sesja HTTP, logowanie i przeglądarka uruchamiana dopiero gdy jest potrzebna"""
+
+    # Nazwa schematu wiersza CSV z odpn_schema.SCHEMATY (ustawiana w wariantach)
+    SCHEMAT: Optional[str] = None
+
+    def __init__(self, host: str, rozdzial_szkola: int = 0, options: tuple = (),
+                 pool_size: int = 10, timeouts: Optional[Dict[str, float]] = None,
+                 in_flight: int = 1, rate_limit: Optional[Dict] = None,
+                 session_dir: Optional[Path] = DOMYSLNY_KATALOG,
+                 szkid=None, rok=None, context_file: Optional[Path] = DOMYSLNY_PLIK,
+                 capture_buffer: int = 500, tabs: int = 1, journal: bool = True, resume: bool = False,
+                 sync: bool = False, sync_delete: bool = False, streaming: bool = False,
+                 validate: bool = True, verify=None,
+                 metrics_dir: Optional[Path] = DOMYSLNY_KATALOG_METRYK, trace_dir: Optional[Path] = None):
+        self.host = host
+        self.szkola_rozdzial = rozdzial_szkola
+        self.options = options
+
+        # Przechowywanie przechwyconych requestów
+        self.captured_requests = []
+        self.cookies = {}
+        # Metryki przebiegu (zapisywane przy zamknięciu do metrics_dir jako JSON i plik Prometheusa)
+        self.metrics = RunMetrics()
+        self.metrics_dir = metrics_dir
+        # Ślad przebiegu w trace_dir (OTLP-JSON): wiersz CSV -> dane POST -> żądanie HTTP -> odpowiedź
+        self.tracer = (Tracer.in_directory(trace_dir, host, **{'odpn.host': host, 'odpn.wariant': self.SCHEMAT})
+                       if trace_dir else None)
+        # Wspólna pula połączeń keep-alive dla wszystkich żądań HTTP
+        # Adaptacyjny limiter tempa SubmitForm/GridDeleteRow (zamiast stałego time.sleep(1))
+        self.http = HttpPool(pool_size=max(pool_size, in_flight), timeouts=timeouts,
+                             limiter=AdaptiveRateLimiter(**(rate_limit or {})), verify=verify,
+                             metrics=self.metrics, tracer=self.tracer)
+        # Liczba żądań SubmitForm wysyłanych jednocześnie (1 = sekwencyjnie)
+        self.in_flight = in_flight
+
+        # Zapisane sesje per host/konto (None = zawsze logowanie od zera)
+        self.session_cache = SessionCache(session_dir) if session_dir else None
+        self._browser_storage = {}
+        # Cache kontekstów formularza - pozwala pominąć nawigację po UI i capture_response
+        self.context_cache = ContextCache(context_file) if context_file else None
+        self.context_data = None
+        self.context_from_cache = False
+        # Skompilowane schematy wiersza per zestaw pól formularza
+        self._transformers = {}
+        self.szkid = szkid
+        self.rok = rok
+        # Konto bieżącej sesji - szkoła i rok poznane w poprzednich przebiegach są zapisane per konto
+        self._account = ""
+        # Kontekst wszystkich miesięcy rozdziału jednym żądaniem listy (zamiast klikania po gridzie)
+        self.resolver = ContextResolver(self.http)
+        self.list_request = None
+        # Konteksty miesięcy z listy per rozdział - trafiają do cache dopiero po sprawdzeniu przez GridGetData
+        self._resolved: Dict[str, Dict[int, Dict]] = {}
+
+        self.wait_time = 20
+        self._driver = None
+        # Zdarzenia Network z przeglądarki (tworzone razem z nią) i numer ostatnio użytego żądania
+        self.network = None
+        self._network_mark = 0
+        # Maksymalna liczba przechowywanych żądań Network
+        self.capture_buffer = capture_buffer
+        # Liczba kart przeglądarki nawigujących do miesięcy jednocześnie (1 = jedna karta, sekwencyjnie)
+        self.tabs = tabs
+        # Dziennik wysyłki obok pliku CSV; resume = pominięcie wierszy potwierdzonych w dzienniku
+        self.use_journal = journal
+        self.resume = resume
+        self.journal = None
+        # Synchronizacja: wysyłka tylko wierszy, których nie ma na serwerze (opcjonalnie kasowanie nadmiarowych)
+        self.sync = sync or sync_delete
+        self.sync_delete = sync_delete
+        # Indeks serwera i kontekst per (rozdział, miesiąc) - wspólny dla wszystkich fragmentów miesiąca
+        self._sync_indexes: Dict[Tuple, Tuple[Optional[SyncIndex], Optional[Dict]]] = {}
+        # Miesiące z wierszami CSV odrzuconymi przed porównaniem z serwerem (None = miesiąc nieznany, czyli wszystkie)
+        self._sync_incomplete = set()
+        # Tryb strumieniowy dla dużych plików: miesiące w plikach tymczasowych, niepowodzenia na dysku
+        self.streaming = streaming
+        # Walidacja całego pliku przed wysyłką - plik z błędami nie trafia do SubmitForm
+        self.validate = validate
+        self._connected = False
+        # Nawigacja do Rozliczenia dotacji jest wykonywana dopiero przy braku kontekstu w cache
+        self._bills_selected = False
+        for faza in FAZY:
+            self._time_phase(faza)
+
+    def _time_phase(self, nazwa: str):
+        """Podmiana metody fazy na mierzoną (atrybut instancji) - czas łączny, z fazami zagnieżdżonymi"""
+        metoda = getattr(self, nazwa, None)
+        if metoda is None:
+            return
+
+        @functools.wraps(metoda)
+        def mierzona(*args, **kwargs):
+            self.metrics.inc('odpn_faza_wywolania_total', faza=nazwa)
+            with self.metrics.timer('odpn_faza_sekundy_total', faza=nazwa):
+                return metoda(*args, **kwargs)
+        setattr(self, nazwa, mierzona)
+
+    @property
+    def driver(self):
+        """Przeglądarka - uruchamiana przy pierwszym użyciu"""
+        if self._driver is None:
+            self._start_browser()
+        return self._driver
+
+    def _start_browser(self):
+        """Uruchomienie Chrome z CDP i przeniesienie do niego ciasteczek sesji HTTP"""
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        start = time.perf_counter()
+
+        chrome_options = Options()
+        chrome_options.add_experimental_option('detach', True)
+        chrome_options.add_argument('--enable-logging')
+        chrome_options.add_argument('--log-level=0')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+
+        # Włączenie logowania performance dla przechwytywania requestów - tylko zdarzenia Network
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        chrome_options.add_experimental_option('perfLoggingPrefs', PERF_LOGGING_PREFS)
+
+        for option in self.options:
+            chrome_options.add_argument(f"--{option}")
+
+        # Użycie Selenium Manager (automatycznie zarządza sterownikami)
+        service = Service()
+        self._driver = webdriver.Chrome(service=service, options=chrome_options)
+
+        # Włączenie Network domain w CDP (Page nie jest potrzebne do przechwytywania)
+        self.network = NetworkListener(self._driver, max_requests=self.capture_buffer)
+        self.network.start()
+
+        self._open_home_page()
+        self._push_session_to_browser()
+        self.metrics.inc('odpn_start_przegladarki_sekundy_total', time.perf_counter() - start)
+
+    def _wait(self, timeout: float, driver=None) -> TimedWait:
+        """WebDriverWait z pomiarem czasu - oczekiwanie bez limitu (ręczne logowanie, wybór) liczone osobno"""
+        from selenium.webdriver.support.wait import WebDriverWait
+        rodzaj = 'uzytkownik' if timeout == float('inf') else 'webdriverwait'
+        return TimedWait(WebDriverWait(driver or self.driver, timeout), self.metrics, rodzaj)
+
+    def _sleep(self, seconds: float):
+        """Stała pauza (np. na animację Ext) - czas trafia do metryk"""
+        time.sleep(seconds)
+        self.metrics.inc('odpn_pauzy_sekundy_total', seconds)
+
+    def _wait_network(self, *args, **kwargs) -> Optional[Dict]:
+        """NetworkListener.wait_for z pomiarem czasu oczekiwania"""
+        with self.metrics.timer('odpn_oczekiwanie_sekundy_total', rodzaj='cdp'):
+            return self.network.wait_for(*args, **kwargs)
+
+    def _push_session_to_browser(self):
+        """Sesja zalogowana przez HTTP (lub przywrócona z dysku) - przeglądarka przejmuje ciasteczka i storage"""
+        if not len(self.http.session.cookies):
+            return
+        for cookie in self.http.session.cookies:
+            self._driver.add_cookie({'name': cookie.name, 'value': cookie.value, 'path': cookie.path or '/'})
+        for area in ('localStorage', 'sessionStorage'):
+            for key, value in self._browser_storage.get(area, {}).items():
+                self._driver.execute_script(f"window.{area}.setItem(arguments[0], arguments[1]);", key, value)
+        self._open_home_page()
+
+    def _pull_session_from_browser(self):
+        """Ciasteczka (z domeną i terminem ważności) oraz storage z przeglądarki"""
+        self.http.session.cookies.clear()
+        for cookie in self._driver.get_cookies():
+            self.http.session.cookies.set(
+                cookie['name'], cookie['value'],
+                domain=cookie.get('domain', ''), path=cookie.get('path', '/'), expires=cookie.get('expiry')
+            )
+        self._browser_storage = self._driver.execute_script(
+            "return {localStorage: Object.assign({}, window.localStorage),"
+            " sessionStorage: Object.assign({}, window.sessionStorage)};"
+        )
+
+    def _open_home_page(self):
+        """Załadowanie strony startowej w przeglądarce z retry logic"""
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                self._driver.get(f"https://{self.host}")
+                self._wait(10, self._driver).until(
+                    lambda driver: driver.execute_script("return document.readyState") == "complete"
+                )
+                print(f"Przeglądarka połączona z: {self.host}")
+                break
+            except Exception as e:
+                print(f'Próba {attempt + 1}/{max_retries} nieudana: {e}')
+                if attempt == max_retries - 1:
+                    raise
+                self.metrics.inc('odpn_ponowienia_total', rodzaj='strona')
+                self._sleep(2)
+
+    def _initialize_connection(self):
+        """Inicjalizacja połączenia z retry logic (samo HTTP, bez przeglądarki)"""
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                response = self.http.get(f"https://{self.host}")
+                response.raise_for_status()
+                # Ustalenie docelowego hosta po przekierowaniach (niestandardowy port zostaje, np. serwer odpn_stub)
+                adres = urlparse(response.url)
+                self.host = adres.netloc if adres.port not in (None, 443) else adres.hostname
+                self._connected = True
+                print(f"Połączono z: {self.host}")
+                break
+            except requests.RequestException as e:
+                print(f'Próba {attempt + 1}/{max_retries} nieudana: {e}')
+                if attempt == max_retries - 1:
+                    raise
+                self.metrics.inc('odpn_ponowienia_total', rodzaj='polaczenie')
+                self._sleep(2)
+
+    def login(self, loginwd: str = "", passwd: str = ""):
+        """Login do systemu - zapisana sesja, potem samo HTTP, przeglądarka tylko w razie potrzeby"""
+        if not self._connected:
+            self._initialize_connection()
+        self._account = loginwd
+
+        if self._restore_session(loginwd):
+            return
+
+        if loginwd and passwd:
+            try:
+                if http_login(self.http, f"https://{self.host}", loginwd, passwd):
+                    print("Zalogowano pomyślnie (HTTP)")
+                    self._save_session(loginwd)
+                    return
+                print("Logowanie HTTP nieudane - przechodzę do przeglądarki")
+            except requests.RequestException as e:
+                print(f"Błąd logowania HTTP: {e} - przechodzę do przeglądarki")
+            self.http.session.cookies.clear()
+
+        self._browser_login(loginwd, passwd)
+        self._save_session(loginwd)
+
+    def _restore_session(self, account: str) -> bool:
+        """Przywrócenie zapisanej sesji, jeśli serwer nadal ją akceptuje"""
+        if self.session_cache is None:
+            return False
+        data = self.session_cache.load(self.host, account)
+        if not data:
+            return False
+
+        SessionCache.restore_cookies(self.http.session.cookies, data)
+        try:
+            valid = session_valid(self.http, f"https://{self.host}")
+        except requests.RequestException:
+            valid = False
+        if not valid:
+            print("Zapisana sesja wygasła - loguję ponownie")
+            self.http.session.cookies.clear()
+            self.session_cache.drop(self.host, account)
+            return False
+
+        self._browser_storage = data.get('storage', {})
+        if self._driver is not None:
+            self._push_session_to_browser()
+        print("Przywrócono zapisaną sesję - pomijam logowanie")
+        return True
+
+    def _save_session(self, account: str):
+        if self.session_cache is None:
+            return
+        try:
+            if self._driver is not None:
+                self._pull_session_from_browser()
+            self.session_cache.save(self.host, account, self.http.session.cookies, self._browser_storage)
+        except Exception as e:
+            print(f"Nie zapisano sesji: {e}")
+
+    def _browser_login(self, loginwd: str = "", passwd: str = ""):
+        """Logowanie przez formularz w przeglądarce (również ręczne)"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        try:
+            # Oczekiwanie na pole loginu
+            lname = self._wait(self.wait_time).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, "input[name=Login]"))
+            )
+
+            if loginwd:
+                lname.clear()
+                lname.send_keys(loginwd)
+
+            # Znalezienie pola hasła
+            lpass = self.driver.find_element(By.ID, "Haslo")
+            if passwd:
+                lpass.clear()
+                lpass.send_keys(passwd)
+
+            # Automatyczne logowanie jeśli podano dane
+            if loginwd and passwd:
+                login_button = self.driver.find_element(By.ID, "ButtonLogowanie")
+                login_button.click()
+
+                # Oczekiwanie na załadowanie menu
+                self._wait(self.wait_time).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "#ext-gen43"))
+                )
+                print("Zalogowano pomyślnie")
+            else:
+                # Oczekiwanie na ręczne logowanie
+                print("Oczekiwanie na ręczne logowanie...")
+                self._wait(float('inf')).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "#ext-gen43"))
+                )
+                print("Zalogowano ręcznie")
+
+        except Exception as e:
+            print(f"Błąd podczas logowania: {e}")
+            raise
+
+    def capture_response(self, file_name: str = "zrzut"):
+        """Przechwycenie kontekstu z następnego żądania GridGetData (strumień zdarzeń CDP zamiast skanu całego logu)"""
+        try:
+            def pelny_kontekst(event):
+                post_data = post_json(event)
+                return (event.get('method') == 'POST' and isinstance(post_data, dict)
+                        and isinstance(post_data.get('data'), dict)
+                        and all(post_data['data'].get(field) is not None for field in REQUIRED_FIELDS))
+
+            if self.network is None:
+                self._start_browser()
+            event = self._wait_network('GridGetData', after=self._network_mark,
+                                       predicate=pelny_kontekst, timeout=self.wait_time)
+            captured_data = []
+            if event is not None:
+                self._network_mark = event['seq']
+                post_data = post_json(event)
+                self._apply_context(post_data['data'])
+                captured_data.append({
+                    'url': event['url'],
+                    'method': event['method'],
+                    'headers': event['headers'],
+                    'postData': post_data,
+                    'timestamp': event['timestamp']
+                })
+                print("Przechwycono dane:")
+                print(f"Pola: {self.fields_name}")
+                print(f"IDs: szkid={self.ID_szkid}, rok={self.ID_rok}, "
+                      f"miesiac={self.ID_miesiac}, rozdzial={self.ID_rozdzial}, "
+                      f"dokument={self.ID_Dokumentu}, wydruk={self.IDWydruk}")
+            # Żądanie listy miesięcy (select_bills) - kolejne miesiące bez klikania po gridzie
+            self._learn_list_request()
+
+            output_file = Path(f"{file_name}.json")
+            with output_file.open("w", encoding='utf-8') as f:
+                json.dump(captured_data, f, indent=2, ensure_ascii=False)
+
+            print(f"Zapisano {len(captured_data)} przechwyconych żądań do {output_file}")
+
+        except Exception as e:
+            print(f"Błąd podczas przechwytywania: {e}")
+
+    # Wiersze gridów Ext (bez wierszy grupujących) - kolumna -> tekst komórki, w jednym wywołaniu execute_script
+    GRID_ROWS_SCRIPT = """
+        var wiersze = [];
+        document.querySelectorAll('div.x-grid3-row:not(.x-grid3-row-checker)').forEach(function (row) {
+            var komorki = {};
+            row.querySelectorAll('td[class*="x-grid3-td-"]').forEach(function (td) {
+                var kolumna = td.className.match(/x-grid3-td-(\\S+)/);
+                var inner = td.querySelector('div.x-grid3-cell-inner');
+                if (kolumna && inner) {
+                    komorki[kolumna[1]] = inner.textContent.trim();
+                }
+            });
+            wiersze.push(komorki);
+        });
+        return wiersze;
+    """
+
+    def _grid_rows(self) -> List[Dict[str, str]]:
+        """Wszystkie wiersze gridów (także kolumny ukryte) jednym poleceniem WebDriver"""
+        return self.driver.execute_script(self.GRID_ROWS_SCRIPT) or []
+
+    def _grid_document_ids(self, column: str = '2') -> List[int]:
+        """ID dokumentów z ukrytej kolumny x-grid3-td-{column} (bez duplikatów, w kolejności wierszy)"""
+        row_ids, widziane = [], set()
+        for komorki in self._grid_rows():
+            row_id = komorki.get(column, '')
+            if row_id.isdigit() and int(row_id) not in widziane:  # np. "28677"
+                widziane.add(int(row_id))
+                row_ids.append(int(row_id))
+        return row_ids
+
+    def _wait_for_grid(self, timeout: Optional[float] = None) -> bool:
+        """Oczekiwanie na odpowiedź ostatnio przechwyconego żądania GridGetData (zamiast stałego sleep)"""
+        if self.network is None:
+            return False
+        event = self._wait_network('GridGetData', after=self._network_mark - 1, finished=True,
+                                   timeout=timeout or self.wait_time)
+        return event is not None
+
+    def _extract_ids(self, data: dict):
+        """Wyodrębnij ID z danych"""
+        self.ID_szkid = data.get('szkid')
+        self.ID_rok = data.get('rok')
+        self.ID_miesiac = data.get('miesiac')
+        self.ID_rozdzial = data.get('rozdzial')
+        self.ID_Dokumentu = data.get('IdDokumentu')
+        self.IDWydruk = data.get('wydrukId')
+
+    def _extract_field_names(self, v_store_fields: list):
+        """Wyodrębnij nazwy pól"""
+        self.fields_name = [
+            field['name'] for field in v_store_fields
+            if field.get('allowBlank') is False
+        ]
+
+    def _apply_context(self, data: dict, from_cache: bool = False):
+        """Ustawienie kontekstu formularza z danych żądania GridGetData"""
+        self._extract_ids(data)
+        self._extract_field_names(data.get('v_store_fields', []))
+        self.context_data = data
+        self.context_from_cache = from_cache
+
+    def _schema(self) -> Dict:
+        return SCHEMATY[self.SCHEMAT]
+
+    def _numery_pol(self, tabela: str = 'domyslne') -> Dict[str, Tuple[int, int]]:
+        """Tabela pozycji formularza (klucz -> (NumerPola, Id)) ze schematu wariantu"""
+        return self._schema()['numery_pol'][tabela]
+
+    def _category_index(self, tabela: str = 'domyslne') -> CategoryIndex:
+        """Indeks etykiet tabeli pozycji (budowany raz na tabelę)"""
+        indeks = category_index(self.SCHEMAT, tabela)
+        for pierwszy, drugi in indeks.collisions:
+            print(f"⚠ Nieodróżnialne pozycje w tabeli {tabela}: '{pierwszy}' i '{drugi}'")
+        return indeks
+
+    def _payload_ids(self) -> Dict:
+        return {
+            "ID_szkid": self.ID_szkid,
+            "ID_rok": self.ID_rok,
+            "ID_miesiac": self.ID_miesiac,
+            "ID_rozdzial": self.ID_rozdzial,
+            "ID_Dokumentu": self.ID_Dokumentu,
+            "ID_Wydruk": self.IDWydruk,
+        }
+
+    def _process_row_data(self, dane: List[str], nr_pozycji: Tuple[int, int], row_num: int) -> Dict:
+        """Przetworzenie danych z wiersza CSV według schematu (kompilowanego raz na zestaw pól formularza)"""
+        klucz = tuple(self.fields_name)
+        transform = self._transformers.get(klucz)
+        if transform is None:
+            transform = self._transformers[klucz] = compile_schema(self._schema(), self.fields_name)
+        try:
+            return transform(dane, nr_pozycji, self._payload_ids())
+        except (IndexError, ValueError) as e:
+            raise ValueError(f"Błąd przetwarzania danych w wierszu {row_num}: {e}")
+
+    def _context_key(self, rozdzial, miesiac) -> Optional[str]:
+        """Klucz kontekstu - szkoła i rok z konfiguracji, z przechwycenia albo zapamiętane dla konta"""
+        szkid = self.szkid if self.szkid is not None else getattr(self, 'ID_szkid', None)
+        rok = self.rok if self.rok is not None else getattr(self, 'ID_rok', None)
+        if (szkid is None or rok is None) and self.context_cache is not None:
+            zapisane = self.context_cache.get(ContextCache.account_key(self.host, self._account)) or {}
+            if szkid is None:
+                szkid = zapisane.get('szkid')
+            # Rok zapamiętany tylko na bieżący rok kalendarzowy - inny rok trzeba podać w konfiguracji
+            if rok is None and str(zapisane.get('rok')) == str(time.localtime().tm_year):
+                rok = zapisane.get('rok')
+        if szkid is None or rok is None:
+            return None
+        return ContextCache.key(self.host, szkid, rok, rozdzial, miesiac)
+
+    def _load_context(self, rozdzial, miesiac) -> bool:
+        """Kontekst z lokalnego indeksu - zwraca False przy braku wpisu"""
+        if self.context_cache is None:
+            return False
+        key = self._context_key(rozdzial, miesiac)
+        data = self.context_cache.get(key) if key else None
+        if data is None:
+            return False
+        self._apply_context(data, from_cache=True)
+        print(f"Kontekst z cache: {key}")
+        return True
+
+    def _store_context(self, rozdzial, miesiac):
+        """Zapis kontekstu przechwyconego przez capture_response"""
+        if self.context_data is None:
+            return
+        if self.szkid is None:
+            self.szkid = self.context_data.get('szkid')
+        if self.rok is None:
+            self.rok = self.context_data.get('rok')
+        if self.context_cache is not None:
+            konto = ContextCache.account_key(self.host, self._account)
+            poznane = {'szkid': self.szkid, 'rok': self.rok}
+            if None not in poznane.values() and self.context_cache.get(konto) != poznane:
+                self.context_cache.put(konto, poznane)
+            self.context_cache.put(self._context_key(rozdzial, miesiac), self.context_data)
+            if self.list_request is not None:
+                self.context_cache.put(self._list_key(), self.list_request)
+
+    def _invalidate_context(self, rozdzial, miesiac):
+        """Usunięcie nieaktualnego kontekstu (np. gdy serwer odrzuca wysyłane dane)"""
+        key = self._context_key(rozdzial, miesiac)
+        if self.context_cache is not None and key:
+            self.context_cache.drop(key)
+        self.context_from_cache = False
+
+    def _learn_list_request(self):
+        """Zapamiętanie żądania listy miesięcy spośród przechwyconych żądań (wywoływane z capture_response)"""
+        if self.list_request is not None or self.network is None:
+            return
+        self.list_request = find_list_request(self._driver, self.network.requests.values())
+        if self.list_request is not None:
+            print(f"Lista miesięcy: {self.list_request['url']}")
+
+    def _list_key(self) -> Optional[str]:
+        """Żądanie listy obejmuje wszystkie rozdziały szkoły w danym roku"""
+        return self._context_key("*", "lista")
+
+    def _resolve_context(self, rozdzial, miesiac) -> bool:
+        """Kontekst miesiąca samym HTTP: żądanie listy miesięcy + szablon rozdziału, sprawdzony przez GridGetData
+
+        Jedno żądanie listy daje konteksty wszystkich miesięcy rozdziału; każdy trafia do cache
+        dopiero wtedy, gdy GridGetData zwróci dla niego dane tego dokumentu.
+        """
+        try:
+            numer = int(miesiac)
+        except (TypeError, ValueError):
+            return False
+        if self.context_cache is None:
+            return False
+        if rozdzial not in self._resolved:
+            prefix = self._context_key(rozdzial, "")
+            list_key = self._list_key()
+            if prefix is None:
+                return False
+            template = self.context_cache.find(prefix)
+            if self.list_request is None:
+                self.list_request = self.context_cache.get(list_key)
+            if template is None or self.list_request is None:
+                return False
+
+            self._resolved[rozdzial] = {}
+            try:
+                self._resolved[rozdzial] = self.resolver.resolve(self.list_request, template)
+            except Exception as e:
+                print(f"Błąd pobierania listy miesięcy: {e}")
+                return False
+            print(f"Lista miesięcy: {len(self._resolved[rozdzial])} miesięcy rozdziału {rozdzial}")
+
+        # Każdy miesiąc sprawdzany osobno - szablon albo ID z listy mogą nie pasować do dokumentu
+        data = self._resolved[rozdzial].pop(numer, None)
+        url = f'https://{self.host}/ODPN/Szkoly/RozliczenieDotacji/Kontrolki/Taby/Dokument/Dokument.asmx/GridGetData'
+        if data is None or not self.resolver.check(url, data):
+            print(f"Lista miesięcy nie dała kontekstu dla {rozdzial}/{miesiac}")
+            return False
+
+        self.context_cache.put(self._context_key(rozdzial, f"{numer:02d}"), data)
+        print(f"Kontekst z listy miesięcy: {rozdzial}/{numer:02d}")
+        self._apply_context(data, from_cache=True)
+        return True
+
+    def _ensure_context(self, rozdzial, miesiac, navigate: Callable[[], None]):
+        """Kontekst z cache lub z listy miesięcy, a przy ich braku nawigacja po UI i capture_response"""
+        if self._load_context(rozdzial, miesiac):
+            return
+        if self._resolve_context(rozdzial, miesiac):
+            return
+        self.context_data = None
+        if self.network is not None:
+            self.network.start()
+        navigate()
+        if self.context_data is None:
+            print("Nie przechwycono kontekstu formularza")
+            return
+        self._store_context(rozdzial, miesiac)
+        # Kontekst uzyskany - przechwytywanie wyłączone do następnej nawigacji
+        if self.network is not None:
+            self.network.stop()
+
+    def _month_contexts(self, rozdzial, miesiace: Iterable[str], navigate: Callable[[str], None],
+                        prepare_tab: Optional[Callable[[], None]] = None,
+                        open_month: Optional[Callable[[str], None]] = None) -> Iterator[Tuple[str, Optional[Exception]]]:
+        """Konteksty miesięcy w kolejności gotowości - (miesiąc, błąd); kontekst jest ustawiony w chwili zwrócenia
+
+        Miesiące z cache (lub z listy miesięcy) są zwracane od razu. Brakujące, przy tabs > 1,
+        są otwierane w kilku kartach naraz, a resztę obsługuje sekwencyjne _ensure_context.
+        """
+        brakujace = []
+        for miesiac in miesiace:
+            if self._load_context(rozdzial, miesiac) or self._resolve_context(rozdzial, miesiac):
+                yield miesiac, None
+            else:
+                brakujace.append(miesiac)
+
+        if self.tabs > 1 and len(brakujace) > 1 and prepare_tab and open_month:
+            brakujace = yield from self._month_contexts_tabs(rozdzial, brakujace, prepare_tab, open_month)
+
+        for miesiac in brakujace:
+            try:
+                self._ensure_context(rozdzial, miesiac, lambda: navigate(miesiac))
+            except Exception as e:
+                yield miesiac, e
+                continue
+            yield miesiac, None
+
+    def _month_contexts_tabs(self, rozdzial, miesiace: List[str], prepare_tab: Callable[[], None],
+                             open_month: Callable[[str], None]):
+        """Pula kart w jednej zalogowanej przeglądarce - każda karta otwiera inny miesiąc
+
+        Polecenia WebDriver są wykonywane po kolei, ale ładowanie gridów w kartach i wysyłka
+        gotowych miesięcy (po stronie wywołującego) odbywają się w tym samym czasie.
+        Kontekst jest przypisywany do miesiąca po karcie (webview), z której wyszło żądanie GridGetData.
+        Zwraca miesiące, których nie udało się obsłużyć w kartach.
+        """
+        driver = self.driver
+        self.network.start()
+        if not self._bills_selected:
+            prepare_tab()
+        glowna = driver.current_window_handle
+        karty = [glowna]
+        try:
+            for _ in range(min(self.tabs, len(miesiace)) - 1):
+                driver.switch_to.new_window('tab')
+                self._open_home_page()
+                prepare_tab()
+                karty.append(driver.current_window_handle)
+        except Exception as e:
+            print(f"Błąd otwierania karty: {e}")
+        print(f"Nawigacja do {len(miesiace)} miesięcy w {len(karty)} kartach")
+
+        def webview(handle: str) -> str:
+            return handle.split('-', 1)[1] if handle.startswith('CDwindow-') else handle
+
+        kolejka = deque(miesiace)
+        zajete = {}    # webview -> (karta, miesiąc, numer żądania przed otwarciem miesiąca)
+        pozostale = []
+        try:
+            while kolejka or zajete:
+                for karta in karty:
+                    if not kolejka or webview(karta) in zajete:
+                        continue
+                    miesiac = kolejka.popleft()
+                    mark = self.network.mark
+                    try:
+                        driver.switch_to.window(karta)
+                        open_month(miesiac)
+                    except Exception as e:
+                        print(f"✗ Karta {karta}: błąd otwierania miesiąca {miesiac}: {e}")
+                        pozostale.append(miesiac)
+                        continue
+                    zajete[webview(karta)] = (karta, miesiac, mark)
+                if not zajete:
+                    continue
+
+                def gotowy(event):
+                    post_data = post_json(event)
+                    zajeta = zajete.get(event.get('webview'))
+                    return (zajeta is not None and event['seq'] > zajeta[2]
+                            and isinstance(post_data, dict) and isinstance(post_data.get('data'), dict)
+                            and all(post_data['data'].get(field) is not None for field in REQUIRED_FIELDS))
+
+                event = self._wait_network('GridGetData', after=min(z[2] for z in zajete.values()),
+                                           predicate=gotowy, timeout=self.wait_time)
+                if event is None:
+                    print(f"Brak GridGetData z kart dla miesięcy: {[z[1] for z in zajete.values()]}")
+                    pozostale.extend(z[1] for z in zajete.values())
+                    pozostale.extend(kolejka)
+                    break
+
+                karta, miesiac, _ = zajete.pop(event['webview'])
+                self._network_mark = max(self._network_mark, event['seq'])
+                self._apply_context(post_json(event)['data'])
+                self._store_context(rozdzial, miesiac)
+                print(f"Karta {karta}: kontekst miesiąca {miesiac}")
+                yield miesiac, None
+        finally:
+            for karta in karty[1:]:
+                try:
+                    driver.switch_to.window(karta)
+                    driver.close()
+                except Exception:
+                    pass
+            driver.switch_to.window(glowna)
+            self.network.stop()
+        return pozostale
+
+    def _preflight(self, file_path: Path, encoding: str = "utf-8", tabela: str = 'domyslne') -> bool:
+        """Walidacja całego pliku przed wysyłką - False (i raport wszystkich błędów), gdy plik jest niepoprawny"""
+        if not self.validate or self.SCHEMAT is None:
+            return True
+        start = time.perf_counter()
+        problemy = validate_file(file_path, self.SCHEMAT, tabela, encoding)
+        czas = time.perf_counter() - start
+        if not problemy:
+            print(f"Walidacja pliku OK ({czas:.2f} s)")
+            return True
+        print(f"\n✗ Plik {file_path}: {len(problemy)} błędów - nic nie zostało wysłane")
+        for row_num, opis in problemy:
+            print(f"  Wiersz {row_num}: {opis}")
+        print("Popraw plik albo uruchom z --bez-walidacji")
+        return False
+
+    def _open_journal(self, file_path: Path):
+        """Dziennik wysyłki dla pliku CSV (plik.csv -> plik.csv.dziennik.jsonl)"""
+        if self.tracer is not None:
+            self.tracer.root.set(**{'odpn.plik': str(file_path)})
+        if not self.use_journal:
+            return
+        file_path = Path(file_path)
+        self.journal = SubmitJournal(file_path.with_name(f"{file_path.name}.dziennik.jsonl"))
+        if self.resume:
+            print(f"Wznowienie: {len(self.journal.confirmed)} wierszy potwierdzonych w {self.journal.path}")
+
+    def _close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def _failures(self, file_path: Path):
+        """Lista niepowodzeń - w trybie strumieniowym zapisywana do plik.csv.bledy.jsonl"""
+        if not self.streaming:
+            return []
+        file_path = Path(file_path)
+        return SpilledList(file_path.with_name(f"{file_path.name}.bledy.jsonl"))
+
+    def _close_failures(self, niepowodzenia):
+        if isinstance(niepowodzenia, SpilledList):
+            niepowodzenia.close()
+            print(f"Niepowodzenia zapisane w {niepowodzenia.path}")
+
+    def _submit_rows(self, url: str, zadania: Iterable) -> List:
+        """Wysłanie przygotowanych wierszy, zwraca listę niepowodzeń"""
+        odciski = {}
+        pominiete = []
+
+        def do_wyslania():
+            for row_num, dane_post in zadania:
+                if self.journal is not None:
+                    odcisk = SubmitJournal.fingerprint(row_num, dane_post)
+                    if self.resume and self.journal.is_confirmed(odcisk):
+                        pominiete.append(row_num)
+                        self.metrics.inc('odpn_wiersze_total', wynik='pominiety')
+                        print(f"Wiersz {row_num}: pominięty (potwierdzony w dzienniku)")
+                        continue
+                    odciski[row_num] = odcisk
+                yield row_num, dane_post
+
+        def on_sent(row_num: int, success: bool, error: Optional[str]):
+            if self.tracer is not None:
+                span = self.tracer.current()
+                if success:
+                    span.ok()
+                else:
+                    span.error(error)
+            if self.journal is not None and row_num in odciski:
+                self.journal.record(row_num, odciski[row_num], success, error, self.http.last_response())
+
+        def on_result(row_num: int, success: bool, error: Optional[str]):
+            self.metrics.inc('odpn_wiersze_total', wynik='wyslany' if success else 'blad_wysylki')
+            print(f"Wiersz {row_num}: {'✓' if success else '✗'}")
+
+        def slad(row_num: int, dane_post: Dict):
+            odcisk = odciski.get(row_num) or SubmitJournal.fingerprint(row_num, dane_post)
+            return self.tracer.span('wiersz', **{'odpn.wiersz': row_num, 'odpn.odcisk': odcisk,
+                                                 'odpn.dane': dane_post})
+
+        engine = SubmitEngine(lambda dane_post: self._send_request(url, dane_post), in_flight=self.in_flight,
+                              on_sent=on_sent, span=slad if self.tracer is not None else None)
+        wyniki = engine.run(do_wyslania(), on_result)
+        if pominiete:
+            print(f"Pominięto {len(pominiete)} wierszy potwierdzonych w dzienniku")
+        print(f"Limiter {self.host}: {self.http.limiter.stats()}")
+        return [(row_num, error) for row_num, success, error in wyniki if not success]
+
+    def _delete_rows(self, url: str, posts: Dict, row_ids: List[int]) -> bool:
+        """Jedno żądanie GridDeleteRow dla listy ID dokumentów"""
+        dane_post = {
+            "data": {
+                "groupDir": "ASC",
+                "wydrukId": self.IDWydruk,
+                "IdDokumentu": self.ID_Dokumentu,
+                "szkid": self.ID_szkid,
+                "rok": self.ID_rok,
+                "miesiac": self.ID_miesiac,
+                "rozdzial": self.ID_rozdzial,
+                "v_store_filters": [],
+                "v_store_filters_autoRemoteSearch": posts.get("v_store_filters_autoRemoteSearch"),
+                "v_store_filters_addInfo": [],
+                "v_store_fields": posts.get("v_store_fields"),
+                "v_store_groupField": posts.get("v_store_groupField"),
+                "v_store_groupDir": posts.get("v_store_groupDir"),
+                "sort": posts.get("sort"),
+                "dir": posts.get("dir"),
+                "jsonData": list(row_ids)
+            }
+        }
+        headers = {
+            'Content-Type': 'application/json; charset=UTF-8',
+            'X-Requested-With': 'XMLHttpRequest'
+        }
+        try:
+            response = self.http.post(url, json=dane_post, headers=headers)
+            return response.ok
+        except Exception as e:
+            print(f"Błąd GridDeleteRow {row_ids}: {e}")
+            return False
+
+    def _server_index(self) -> Optional[SyncIndex]:
+        """Wiersze dokumentu bieżącego miesiąca/rozdziału pobrane przez GridGetData"""
+        url = f'https://{self.host}/ODPN/Szkoly/RozliczenieDotacji/Kontrolki/Taby/Dokument/Dokument.asmx/GridGetData'
+        if self.context_data is None or not self.fields_name:
+            return None
+        try:
+            response = self.http.post(url, json={"data": self.context_data},
+                                      headers={'Content-Type': 'application/json'})
+            response.raise_for_status()
+            indeks = SyncIndex(server_rows(response.json(), self.fields_name), self.fields_name)
+        except Exception as e:
+            print(f"Błąd pobierania dokumentów z serwera - wysyłam wszystkie wiersze: {e}")
+            return None
+        print(f"Na serwerze: {indeks.total} wierszy")
+        return indeks
+
+    def _delete_extra(self, indeks: SyncIndex, batch_size: int = 50):
+        """Kasowanie wierszy serwera, których nie ma w CSV"""
+        url = f"https://{self.host}/ODPN/Szkoly/RozliczenieDotacji/Kontrolki/Taby/Dokument/Dokument.asmx/GridDeleteRow"
+        row_ids = indeks.extra_ids()
+        if indeks.extra_count() > len(row_ids):
+            print(f"✗ {indeks.extra_count() - len(row_ids)} nadmiarowych wierszy bez ID - pominięte")
+        for start in range(0, len(row_ids), batch_size):
+            paczka = row_ids[start:start + batch_size]
+            wynik = self._delete_rows(url, self.context_data, paczka)
+            print(f"{'✓' if wynik else '✗'} Usunięto nadmiarowe wiersze: {paczka}")
+
+    def _sync_index(self, rozdzial, miesiac) -> Optional[SyncIndex]:
+        """Indeks wierszy serwera pobierany raz na miesiąc - kolejny fragment tego miesiąca (tryb strumieniowy,
+        nieposortowany plik) nie może uznać wierszy wysłanych przez poprzedni za nadmiarowe"""
+        klucz = (rozdzial, miesiac)
+        if klucz not in self._sync_indexes:
+            self._sync_indexes[klucz] = (self._server_index(), self.context_data)
+        return self._sync_indexes[klucz][0]
+
+    def _sync_row_failed(self, miesiac=None):
+        """Wiersz CSV odrzucony przed porównaniem z serwerem (błąd kategorii, transformacji, miesiąca)
+
+        Jego odpowiednik na serwerze nie został dopasowany, więc w tym miesiącu nic nie jest kasowane.
+        """
+        self._sync_incomplete.add(miesiac)
+
+    def _finish_sync(self):
+        """Podsumowanie synchronizacji i kasowanie nadmiarowych wierszy - po wysłaniu wszystkich fragmentów miesięcy"""
+        for (rozdzial, miesiac), (indeks, kontekst) in self._sync_indexes.items():
+            if indeks is None:
+                continue
+            print(f"Synchronizacja {rozdzial}/{miesiac}: {indeks.matched} wierszy już na serwerze, "
+                  f"nadmiarowych: {indeks.extra_count()}")
+            if not self.sync_delete:
+                continue
+            if miesiac in self._sync_incomplete or None in self._sync_incomplete:
+                print(f"✗ {rozdzial}/{miesiac}: część wierszy CSV odrzucona przed porównaniem - "
+                      f"nadmiarowe wiersze nie są kasowane")
+                continue
+            self._apply_context(kontekst, from_cache=self.context_from_cache)
+            self._delete_extra(indeks)
+        self._sync_indexes.clear()
+        self._sync_incomplete.clear()
+
+    def _submit_with_context(self, url: str, zadania: Callable[[Optional[set]], Iterable],
+                             rozdzial, miesiac, navigate: Callable[[], None]) -> List:
+        """Wysyłka wierszy; gdy serwer odrzuca dane wysłane z kontekstem z cache - odświeżenie kontekstu i ponowienie
+
+        zadania(None) zwraca wszystkie wiersze, zadania(numery) tylko wiersze o podanych numerach.
+        """
+        pierwsze = zadania(None)
+        indeks = self._sync_index(rozdzial, miesiac) if self.sync else None
+        if indeks is not None:
+            pierwsze = indeks.missing(pierwsze)
+        bledy = self._submit_rows(url, pierwsze)
+        odrzucone = {row_num for row_num, error in bledy if error == BLAD_WYSYLANIA}
+        if not (self.context_from_cache and odrzucone):
+            return bledy
+
+        print(f"Serwer odrzucił {len(odrzucone)} wierszy - odświeżam kontekst {rozdzial}/{miesiac}")
+        self.metrics.inc('odpn_ponowienia_total', len(odrzucone), rodzaj='kontekst')
+        self._invalidate_context(rozdzial, miesiac)
+        self._ensure_context(rozdzial, miesiac, navigate)
+        bledy = [b for b in bledy if b[0] not in odrzucone]
+        bledy.extend(self._submit_rows(url, zadania(odrzucone)))
+        return bledy
+
+    def get_headers(self):
+        """Pobranie cookies - z przeglądarki jeśli działa, w przeciwnym razie z sesji HTTP"""
+        try:
+            if self._driver is not None:
+                browser_cookies = self._driver.get_cookies()
+                self.cookies = {cookie['name']: cookie['value'] for cookie in browser_cookies}
+                # Dodatkowo nagłówek Cookie z ostatniego przechwyconego żądania
+                self.network.poll()
+                for cookie_pair in (self.network.cookie_header or '').split('; '):
+                    if '=' in cookie_pair:
+                        key, value = cookie_pair.split('=', 1)
+                        self.cookies[key] = value
+                self.http.set_cookies(self.cookies)
+            else:
+                self.cookies = self.http.session.cookies.get_dict()
+            print(f"Pobrano {len(self.cookies)} cookies")
+        except Exception as e:
+            print(f"Błąd podczas pobierania headers: {e}")
+
+    def __enter__(self):
+        """Context manager entry"""
+        self._initialize_connection()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit"""
+        if self._driver is not None:
+            self._driver.quit()
+            print("Przeglądarka zamknięta")
+        self._close_journal()
+        self._write_metrics()
+        self._close_trace()
+        self.http.close()
+
+    def _close_trace(self):
+        if self.tracer is None:
+            return
+        try:
+            sciezka = self.tracer.close(**{'odpn.host': self.host})
+            print(f"Ślad zapisany: {sciezka} ({self.tracer.spans} spanów)")
+        except Exception as e:
+            print(f"Błąd zapisu śladu: {e}")
+
+    def _write_metrics(self):
+        """Zapis metryk przebiegu do metrics_dir ({host}.json + {host}.prom)"""
+        limiter = self.http.limiter.stats()
+        self.metrics.set('odpn_limiter_tempo', limiter['rate'])
+        self.metrics.set('odpn_limiter_spowolnienia', limiter['backoffs'])
+        self.metrics.set('odpn_czas_przebiegu_sekundy', round(time.monotonic() - self.metrics.started, 3))
+        if self.metrics_dir is None:
+            return
+        try:
+            sciezki = self.metrics.write(self.metrics_dir, self.host, host=self.host, wariant=self.SCHEMAT or '')
+            print(f"Metryki zapisane: {', '.join(str(p) for p in sciezki)}")
+        except Exception as e:
+            print(f"Błąd zapisu metryk: {e}")
@@ -0,0 +1,151 @@
+import requests
+from requests.adapters import HTTPAdapter
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from odpn_metrics import RunMetrics
+from odpn_ratelimit import AdaptiveRateLimiter
+from odpn_trace import MAKS_TRESC, SPAN_KLIENT, Tracer
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Domyślne timeouty (w sekundach) dla endpointów ODPN - klucz to ostatni segment ścieżki URL
+DOMYSLNE_TIMEOUTY = {
+    'SubmitForm': 30,
+    'GridDeleteRow': 30,
+    'GridGetData': 30,
+    'ZmianaPlacowki_Resp.aspx': 10,
+}
+
+# Endpointy objęte limitem tempa (masowe wysyłanie / kasowanie wierszy)
+LIMITOWANE_ENDPOINTY = {'SubmitForm', 'GridDeleteRow'}
+
+
+class HttpPool:
+    """Współdzielona sesja HTTP z pulą połączeń keep-alive dla wszystkich żądań do ODPN"""
+
+    def __init__(self, pool_size: int = 10, timeouts: Optional[Dict[str, float]] = None,
+                 headers: Optional[Dict[str, str]] = None, default_timeout: float = 30,
+                 limiter: Optional[AdaptiveRateLimiter] = None, verify=None,
+                 metrics: Optional[RunMetrics] = None, tracer: Optional[Tracer] = None):
+        self.session = requests.Session()
+
+        # Jeden adapter na schemat - połączenia TCP/TLS są utrzymywane między żądaniami
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Connection': 'keep-alive',
+        })
+        if headers:
+            self.session.headers.update(headers)
+
+        self.timeouts = dict(DOMYSLNE_TIMEOUTY)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.default_timeout = default_timeout
+        self.limiter = limiter
+        # Certyfikat CA (np. serwera odpn_stub) - przekazywany w każdym żądaniu,
+        # bo session.verify przegrywa z REQUESTS_CA_BUNDLE ze środowiska
+        self.verify = verify
+        # Histogram czasu i liczniki statusów per endpoint, czas oczekiwania na limiter
+        self.metrics = metrics
+        # Span śladu dla każdego żądania (potomny spanu wiersza, jeśli wysyłany w jego ramach)
+        self.tracer = tracer
+        # Ostatnia odpowiedź w danym wątku (np. do zapisu w dzienniku wysyłki)
+        self._local = threading.local()
+
+    def set_cookies(self, cookies: Dict[str, str]):
+        """Podmiana ciasteczek sesji (np. po pobraniu ich z przeglądarki)"""
+        self.session.cookies.clear()
+        for name, value in cookies.items():
+            self.session.cookies.set(name, value)
+
+    @staticmethod
+    def endpoint(url: str) -> str:
+        """Nazwa endpointu - ostatni segment ścieżki URL"""
+        return url.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+
+    def timeout_for(self, url: str) -> float:
+        """Timeout przypisany do endpointu"""
+        return self.timeouts.get(self.endpoint(url), self.default_timeout)
+
+    def last_response(self) -> Optional[requests.Response]:
+        """Ostatnia odpowiedź otrzymana w bieżącym wątku"""
+        return getattr(self._local, 'response', None)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        self._local.response = None
+        if self.tracer is None:
+            response = self._request(method, url, **kwargs)
+        else:
+            response = self._traced(method, url, **kwargs)
+        self._local.response = response
+        return response
+
+    def _traced(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Żądanie w spanie śladu - status i początek treści odpowiedzi jako atrybuty"""
+        adres = urlparse(url)
+        with self.tracer.span(f"{method} {self.endpoint(adres.path) or '/'}", SPAN_KLIENT,
+                              **{'http.request.method': method, 'url.full': url,
+                                 'server.address': adres.hostname}) as span:
+            response = self._request(method, url, **kwargs)
+            tresc = response.content[:MAKS_TRESC].decode(response.encoding or 'utf-8', errors='replace')
+            span.set(**{'http.response.status_code': response.status_code, 'http.response.body': tresc})
+            if response.status_code >= 400:
+                span.error(f"HTTP {response.status_code}")
+            else:
+                span.ok()
+            return response
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Samo żądanie HTTP - czas i status trafiają do metryk i śladu"""
+        if self.metrics is None and self.tracer is None:
+            return self.session.request(method, url, **kwargs)
+        start = time.perf_counter()
+        status = 'blad'
+        try:
+            response = self.session.request(method, url, **kwargs)
+            status = str(response.status_code)
+            return response
+        finally:
+            czas = time.perf_counter() - start
+            if self.tracer is not None:
+                self.tracer.current().set(**{'odpn.http.czas_s': round(czas, 6)})
+            if self.metrics is not None:
+                endpoint = self.endpoint(urlparse(url).path) or '/'
+                self.metrics.observe('odpn_http_czas_sekundy', czas, endpoint=endpoint)
+                self.metrics.inc('odpn_http_zadania_total', endpoint=endpoint, status=status)
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout_for(url))
+        if self.verify is not None:
+            kwargs.setdefault('verify', self.verify)
+        if self.limiter is None or self.endpoint(url) not in LIMITOWANE_ENDPOINTY:
+            return self._send(method, url, **kwargs)
+
+        waited = self.limiter.acquire()
+        if self.metrics is not None and waited:
+            self.metrics.inc('odpn_oczekiwanie_sekundy_total', waited, rodzaj='limiter')
+        if self.tracer is not None:
+            self.tracer.current().set(**{'odpn.limiter.oczekiwanie_s': round(float(waited or 0), 6)})
+        start = time.monotonic()
+        try:
+            response = self._send(method, url, **kwargs)
+        except (requests.Timeout, requests.ConnectionError):
+            self.limiter.record(time.monotonic() - start, error=True)
+            raise
+        self.limiter.record(time.monotonic() - start, response.status_code)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+
+def read_entries(path: Path) -> Iterator[Dict]:
+    """Wpisy dziennika w kolejności zapisu (bez niedokończonego wpisu po przerwaniu zapisu)"""
+    try:
+        with Path(path).open('r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+    except OSError:
+        return
+
+
+class SubmitJournal:
+    """Dziennik wysyłki (JSON Lines, tylko dopisywanie) - wpis z odciskiem wiersza i odpowiedzią serwera, fsync po każdym wierszu"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = None
+        self.confirmed = set()
+        self._load()
+
+    @staticmethod
+    def fingerprint(row_num: int, dane_post: Dict) -> str:
+        """Odcisk wiersza - numer wiersza i dane POST (z ID dokumentu miesiąca)"""
+        tekst = json.dumps([row_num, dane_post], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(tekst.encode('utf-8')).hexdigest()
+
+    def _load(self):
+        for entry in read_entries(self.path):
+            if entry.get('ok'):
+                self.confirmed.add(entry.get('fp'))
+
+    def is_confirmed(self, fp: str) -> bool:
+        with self._lock:
+            return fp in self.confirmed
+
+    def record(self, row_num: int, fp: str, ok: bool, error: Optional[str] = None,
+               response: Optional['requests.Response'] = None):
+        entry = {'ts': time.time(), 'row': row_num, 'fp': fp, 'ok': ok}
+        if error:
+            entry['error'] = error
+        if response is not None:
+            entry['status'] = response.status_code
+            entry['response'] = response.text[:500]
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if ok:
+                self.confirmed.add(fp)
+
+    def _open(self):
+        """Otwarcie do dopisywania - niedokończony ostatni wpis (przerwany zapis) jest obcinany,
+        żeby następny wpis nie skleił się z nim w jedną nieczytelną linię"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('ab+') as f:
+            koniec = f.seek(0, os.SEEK_END)
+            pozycja = koniec
+            while pozycja > 0:
+                start = max(0, pozycja - 4096)
+                f.seek(start)
+                fragment = f.read(pozycja - start)
+                nowa_linia = fragment.rfind(b'\n')
+                if nowa_linia >= 0:
+                    pozycja = start + nowa_linia + 1
+                    break
+                pozycja = start
+            if pozycja != koniec:
+                f.truncate(pozycja)
+        self._file = self.path.open('a', encoding='utf-8')
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,95 @@
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from typing import Dict, Optional, Tuple
+
+from odpn_http import HttpPool
+
+
+class _LoginFormParser(HTMLParser):
+    """Wyszukanie formularza logowania ASP.NET (pola Login/Haslo/ButtonLogowanie)"""
+
+    def __init__(self):
+        super().__init__()
+        self.forms = []
+        self._form = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'form':
+            self._form = {'action': attrs.get('action') or '', 'inputs': []}
+            self.forms.append(self._form)
+        elif tag in ('input', 'button') and self._form is not None:
+            self._form['inputs'].append(attrs)
+
+    def handle_endtag(self, tag):
+        if tag == 'form':
+            self._form = None
+
+
+def _matches(attrs: Dict, field: str) -> bool:
+    """Pole ASP.NET może mieć prefiks kontenera w nazwie (np. ctl00$Main$Login)"""
+    name = attrs.get('name') or ''
+    return attrs.get('id') == field or name == field or name.endswith(f"${field}")
+
+
+def parse_login_form(html: str) -> Optional[Tuple[str, Dict[str, str]]]:
+    """Akcja i pola formularza logowania gotowe do wysłania (bez loginu i hasła)"""
+    parser = _LoginFormParser()
+    parser.feed(html)
+
+    for form in parser.forms:
+        if not any(_matches(i, 'Login') for i in form['inputs']):
+            continue
+
+        fields = {}
+        for attrs in form['inputs']:
+            name = attrs.get('name')
+            if not name:
+                continue
+            typ = (attrs.get('type') or 'text').lower()
+            # Przyciski wysyłane są tylko wtedy, gdy zostały "kliknięte"
+            if typ in ('submit', 'button', 'image') and not _matches(attrs, 'ButtonLogowanie'):
+                continue
+            if typ in ('checkbox', 'radio') and 'checked' not in attrs:
+                continue
+            fields[name] = attrs.get('value') or ''
+
+        if not any(_matches({'name': n}, 'ButtonLogowanie') for n in fields):
+            # Przycisk jako link __doPostBack
+            fields['__EVENTTARGET'] = 'ButtonLogowanie'
+        return form['action'], fields
+    return None
+
+
+def http_login(http: HttpPool, url: str, loginwd: str, passwd: str) -> bool:
+    """Logowanie samym HTTP - wypełnienie i wysłanie formularza ASP.NET, ciasteczka trafiają do sesji"""
+    response = http.get(url)
+    response.raise_for_status()
+
+    form = parse_login_form(response.text)
+    if form is None:
+        print("Nie znaleziono formularza logowania")
+        return False
+
+    action, fields = form
+    for name in list(fields):
+        if _matches({'name': name}, 'Login'):
+            fields[name] = loginwd
+        elif _matches({'name': name}, 'Haslo'):
+            fields[name] = passwd
+
+    response = http.post(
+        urljoin(response.url, action),
+        data=fields,
+        headers={'Content-Type': 'application/x-www-form-urlencoded'}
+    )
+    response.raise_for_status()
+
+    # Po poprawnym zalogowaniu serwer nie zwraca już formularza logowania
+    return parse_login_form(response.text) is None
+
+
+def session_valid(http: HttpPool, url: str) -> bool:
+    """Tani test sesji - zalogowany użytkownik nie dostaje formularza logowania"""
+    response = http.get(url)
+    return response.ok and parse_login_form(response.text) is None
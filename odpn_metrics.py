@@ -0,0 +1,183 @@
+import contextlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+# Domyślny katalog raportów (JSON + plik tekstowy dla node_exporter --collector.textfile.directory)
+DOMYSLNY_KATALOG_METRYK = Path.home() / ".odpn" / "metryki"
+
+# Przedziały histogramu czasu żądań HTTP (sekundy)
+PRZEDZIALY = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+OPISY = {
+    'odpn_wiersze_total': "Wiersze CSV po wysyłce (wynik: wyslany, blad_wysylki, pominiety)",
+    'odpn_wiersze_bledne_total': "Wiersze w końcowej liście błędów (przetwarzanie lub wysyłka)",
+    'odpn_ponowienia_total': "Ponowienia (polaczenie, strona, kontekst, usuwanie)",
+    'odpn_http_zadania_total': "Żądania HTTP per endpoint i status",
+    'odpn_http_czas_sekundy': "Czas żądań HTTP per endpoint (bez oczekiwania na limiter)",
+    'odpn_oczekiwanie_sekundy_total': "Czas oczekiwania (webdriverwait, uzytkownik, cdp, limiter)",
+    'odpn_pauzy_sekundy_total': "Czas stałych pauz (time.sleep)",
+    'odpn_start_przegladarki_sekundy_total': "Czas uruchamiania Chrome (do załadowania strony startowej)",
+    'odpn_faza_sekundy_total': "Czas faz przebiegu (login, select_bills, capture_response, parse_file...) z zagnieżdżonymi",
+    'odpn_faza_wywolania_total': "Wywołania faz przebiegu",
+    'odpn_limiter_tempo': "Tempo limitera SubmitForm/GridDeleteRow na koniec przebiegu (żądań/s)",
+    'odpn_limiter_spowolnienia': "Spowolnienia limitera po błędach serwera",
+    'odpn_czas_przebiegu_sekundy': "Czas przebiegu (od utworzenia SiteWrap do zamknięcia)",
+}
+
+Etykiety = Tuple[Tuple[str, str], ...]
+
+
+def _etykiety(labels: Dict) -> Etykiety:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_etykiet(etykiety: Etykiety) -> str:
+    if not etykiety:
+        return ''
+    czesci = []
+    for k, v in etykiety:
+        v = v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        czesci.append(f'{k}="{v}"')
+    return '{' + ','.join(czesci) + '}'
+
+
+def _liczba(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class TimedWait:
+    """WebDriverWait z pomiarem czasu until/until_not"""
+
+    def __init__(self, wait, metrics: 'RunMetrics', rodzaj: str = 'webdriverwait'):
+        self._wait = wait
+        self._metrics = metrics
+        self._rodzaj = rodzaj
+
+    def until(self, *args, **kwargs):
+        with self._metrics.timer('odpn_oczekiwanie_sekundy_total', rodzaj=self._rodzaj):
+            return self._wait.until(*args, **kwargs)
+
+    def until_not(self, *args, **kwargs):
+        with self._metrics.timer('odpn_oczekiwanie_sekundy_total', rodzaj=self._rodzaj):
+            return self._wait.until_not(*args, **kwargs)
+
+
+class RunMetrics:
+    """Liczniki, wartości i histogramy jednego przebiegu - bezpieczne dla wątków wysyłki"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[Etykiety, float]] = {}
+        self.gauges: Dict[str, Dict[Etykiety, float]] = {}
+        self.histograms: Dict[str, Dict[Etykiety, list]] = {}
+        self.started = time.monotonic()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        klucz = _etykiety(labels)
+        with self._lock:
+            seria = self.counters.setdefault(name, {})
+            seria[klucz] = seria.get(klucz, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges.setdefault(name, {})[_etykiety(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Obserwacja histogramu: [liczniki przedziałów..., suma, liczba]"""
+        klucz = _etykiety(labels)
+        with self._lock:
+            h = self.histograms.setdefault(name, {}).get(klucz)
+            if h is None:
+                h = self.histograms[name][klucz] = [0] * len(PRZEDZIALY) + [0.0, 0]
+            for i, granica in enumerate(PRZEDZIALY):
+                if value <= granica:
+                    h[i] += 1
+                    break
+            h[-2] += value
+            h[-1] += 1
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels):
+        """Czas bloku dodawany do licznika sekund"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.inc(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict:
+        """Stan metryk jako JSON (histogramy: przedziały skumulowane jak w Prometheusie)"""
+        with self._lock:
+            def seria(dane):
+                return [dict(etykiety=dict(k), wartosc=round(v, 6)) for k, v in dane.items()]
+
+            wynik = {
+                'czas_przebiegu_s': round(time.monotonic() - self.started, 3),
+                'liczniki': {n: seria(d) for n, d in self.counters.items()},
+                'wartosci': {n: seria(d) for n, d in self.gauges.items()},
+                'histogramy': {},
+            }
+            for name, dane in self.histograms.items():
+                wynik['histogramy'][name] = []
+                for k, h in dane.items():
+                    skumulowane, suma = {}, 0
+                    for granica, n in zip(PRZEDZIALY, h):
+                        suma += n
+                        skumulowane[_liczba(granica)] = suma
+                    skumulowane['+Inf'] = h[-1]
+                    wynik['histogramy'][name].append(
+                        dict(etykiety=dict(k), przedzialy=skumulowane, suma=round(h[-2], 6), liczba=h[-1]))
+            return wynik
+
+    def prometheus(self, **labels) -> str:
+        """Format tekstowy Prometheusa; labels (np. host, wariant) dołączane do każdej serii"""
+        wspolne = _etykiety(labels)
+        linie = []
+
+        def naglowek(name: str, typ: str):
+            if name in OPISY:
+                linie.append(f"# HELP {name} {OPISY[name]}")
+            linie.append(f"# TYPE {name} {typ}")
+
+        with self._lock:
+            for typ, zbior in (('counter', self.counters), ('gauge', self.gauges)):
+                for name, dane in sorted(zbior.items()):
+                    naglowek(name, typ)
+                    for k, v in sorted(dane.items()):
+                        linie.append(f"{name}{_format_etykiet(wspolne + k)} {_liczba(v)}")
+            for name, dane in sorted(self.histograms.items()):
+                naglowek(name, 'histogram')
+                for k, h in sorted(dane.items()):
+                    suma = 0
+                    for granica, n in zip(PRZEDZIALY, h):
+                        suma += n
+                        linie.append(f"{name}_bucket{_format_etykiet(wspolne + k + (('le', _liczba(granica)),))} {suma}")
+                    linie.append(f"{name}_bucket{_format_etykiet(wspolne + k + (('le', '+Inf'),))} {h[-1]}")
+                    linie.append(f"{name}_sum{_format_etykiet(wspolne + k)} {_liczba(round(h[-2], 6))}")
+                    linie.append(f"{name}_count{_format_etykiet(wspolne + k)} {h[-1]}")
+        return '\n'.join(linie) + '\n'
+
+    def write(self, directory: Path, name: str, **labels) -> Tuple[Path, Path]:
+        """Zapis raportu: {name}.json i {name}.prom (atomowo - kolektor nie przeczyta połowy pliku)"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        name = re.sub(r'[^\w.-]+', '_', name)
+        raport = dict(self.snapshot(), etykiety=labels)
+        sciezki = []
+        for rozszerzenie, tresc in (('json', json.dumps(raport, indent=2, ensure_ascii=False) + '\n'),
+                                    ('prom', self.prometheus(**labels))):
+            path = directory / f"{name}.{rozszerzenie}"
+            tmp = path.with_name(f".{path.name}.tmp")
+            tmp.write_text(tresc, encoding='utf-8')
+            os.replace(tmp, path)
+            sciezki.append(path)
+        return sciezki[0], sciezki[1]
+
@@ -0,0 +1,364 @@
+"""Mikrobenchmarki części CPU (bez sieci i przeglądarki) porównywane z zapisanymi wynikami bazowymi
+
+    python odpn_microbench.py                      # porównanie z odpn_microbench_baseline.json
+    python odpn_microbench.py --prog 15            # regresja > 15% = kod wyjścia 1
+    python odpn_microbench.py --zapisz             # nowe wyniki bazowe (po zamierzonej zmianie)
+    python odpn_microbench.py --tylko wiersze_belchatow,capture
+
+Mierzone: csv.reader + dopasowanie pozycji + _process_row_data (kwoty, daty) per wariant,
+dopasowanie kategorii Bełchatowa oraz przegląd logu performance (NetworkListener, 100k wpisów)
+tak jak w capture_response. Wynikiem jest minimum z kilku powtórzeń, porównywane z bazowym
+w odniesieniu do kalibracji (stała porcja pracy mierzona na przemian z benchmarkiem).
+Porównanie wymaga tych samych --wiersze i --wpisy co przy zapisie wyników bazowych.
+"""
+import argparse
+import csv
+import gc
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from odpn_cdp import NetworkListener, post_json
+from odpn_core import REQUIRED_FIELDS
+from odpn_schema import (SCHEMATY, CategoryIndex, columns_needed, category_index, data, kwota,
+                         kwota_lub_zero, miesiac_kropka, normalize_label)
+
+DOMYSLNE_BAZOWE = Path(__file__).with_name('odpn_microbench_baseline.json')
+
+# Wariant -> (moduł z SiteWrap, tabela pozycji)
+WARIANTY = {
+    'odpn2': ('odpn2', 'domyslne'),
+    'piotrkow': ('odpn_piotrkow', 'domyslne'),
+    'czestochowa': ('czestochowa', 'domyslne'),
+    'piotrkow2': ('odpn_piotrkow2', 'domyslne'),
+    'belchatow': ('belchatow', 'oswiata'),
+}
+
+ROK = 2025
+
+# Wartości kolumn według parsera pola schematu (pozostałe kolumny: tekst)
+WZORY = {
+    kwota: lambda i: f"{1 + i % 9} {i % 1000:03d},{i % 100:02d}",
+    kwota_lub_zero: lambda i: "" if i % 3 == 0 else f"{i % 500},50",
+    data: lambda i: f"{ROK}-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+}
+
+
+def synthetic_csv(schemat: str, tabela: str, wiersze: int) -> str:
+    """Treść pliku CSV zgodnego ze schematem - kategorie po kolei z tabeli, miesiące pogrupowane
+
+    Dla dopasowania 'indeks' kategoria występuje w trzech postaciach: pełna etykieta, numer pozycji, wielkie litery.
+    """
+    schema = SCHEMATY[schemat]
+    kolumny = max(schema['kolumny'], columns_needed(schema))
+    klucze = list(schema['numery_pol'][tabela])
+    kol_kategorii, dopasowanie = schema['kategoria']
+    kol_kategorii %= kolumny
+    kol_miesiaca, parser_miesiaca = schema.get('miesiac') or (None, None)
+
+    wyjscie = io.StringIO()
+    writer = csv.writer(wyjscie, delimiter=';')
+    for i in range(wiersze):
+        dane = [f"Opis {i}"] * kolumny
+        for kolumna, parser in schema['pola']:
+            if kolumna is not None and parser in WZORY:
+                dane[kolumna] = WZORY[parser](i)
+        klucz = klucze[i % len(klucze)]
+        if dopasowanie == 'indeks':
+            klucz = (klucz, klucz.split(' ', 1)[0], klucz.upper())[i // len(klucze) % 3]
+        dane[kol_kategorii] = klucz
+        if kol_miesiaca is not None:
+            miesiac = i * 12 // wiersze + 1
+            dane[kol_miesiaca] = f"{miesiac:02d}.{ROK}" if parser_miesiaca is miesiac_kropka else f"{miesiac}/{ROK}"
+        writer.writerow(dane)
+    return wyjscie.getvalue()
+
+
+def _site(schemat: str):
+    """SiteWrap wariantu z ustawionym kontekstem formularza (bez połączenia, cache i dziennika)"""
+    import importlib
+    modul, _ = WARIANTY[schemat]
+    site = importlib.import_module(modul).SiteWrap(
+        "bench.invalid", session_dir=None, context_file=None, journal=False, validate=False
+    )
+    site._apply_context({
+        'szkid': 1001, 'rok': ROK, 'miesiac': 1, 'rozdzial': '80120', 'IdDokumentu': 5001, 'wydrukId': 95001,
+        'v_store_fields': [{'name': f"_{n}", 'allowBlank': False} for n in range(3, 12)],
+    })
+    return site
+
+
+def bench_wiersze(schemat: str, wiersze: int) -> Tuple[Callable[[], object], int]:
+    """csv.reader + pozycja formularza + _process_row_data dla całego pliku"""
+    _, tabela = WARIANTY[schemat]
+    tresc = synthetic_csv(schemat, tabela, wiersze)
+    site = _site(schemat)
+    kol_kategorii, dopasowanie = SCHEMATY[schemat]['kategoria']
+    numery_pol = site._numery_pol(tabela)
+    if dopasowanie == 'indeks':
+        indeks = category_index(schemat, tabela)
+        pozycja = lambda dane: numery_pol[indeks.match(dane[kol_kategorii])[0]]
+    else:
+        pozycja = lambda dane: numery_pol[dane[kol_kategorii].strip()]
+
+    def uruchom():
+        for row_num, dane in enumerate(csv.reader(io.StringIO(tresc), delimiter=';'), 1):
+            site._process_row_data(dane, pozycja(dane), row_num)
+    return uruchom, wiersze
+
+
+def bench_kategorie(wiersze: int) -> Tuple[Callable[[], object], int]:
+    """Dopasowanie kategorii z pliku Bełchatowa - nowy indeks (budowa + wiersze z powtarzającymi się kategoriami)"""
+    tabela = WARIANTY['belchatow'][1]
+    numery_pol = SCHEMATY['belchatow']['numery_pol'][tabela]
+    kategorie = [dane[0] for dane in csv.reader(io.StringIO(synthetic_csv('belchatow', tabela, wiersze)),
+                                                delimiter=';')]
+
+    def uruchom():
+        indeks = CategoryIndex(numery_pol)
+        for kategoria in kategorie:
+            indeks.match(kategoria)
+    return uruchom, wiersze
+
+
+def bench_kategorie_bez_cache(wiersze: int) -> Tuple[Callable[[], object], int]:
+    """Koszt samego dopasowania (normalizacja + próby) - każda etykieta inna, więc pamięć wyników nie pomaga"""
+    tabela = WARIANTY['belchatow'][1]
+    indeks = category_index('belchatow', tabela)
+    klucze = list(SCHEMATY['belchatow']['numery_pol'][tabela])
+    formy = (lambda k, i: f"{k}{' ' * (i % 3)}", lambda k, i: f"{k.split(' ', 1)[0]}",
+             lambda k, i: k.split(' ', 2)[-1][:25 + i % 10].upper())
+    kategorie = [formy[i % 3](klucze[i % len(klucze)], i) for i in range(wiersze)]
+
+    def uruchom():
+        for kategoria in kategorie:
+            indeks._match(normalize_label(kategoria))
+    return uruchom, wiersze
+
+
+class LogReplay:
+    """Źródło logu performance dla NetworkListener: zapisane wpisy zwracane przy pierwszym get_log"""
+
+    def __init__(self, entries: List[Dict]):
+        self._entries = entries
+
+    def get_log(self, _typ: str) -> List[Dict]:
+        entries, self._entries = self._entries, []
+        return entries
+
+    def execute_cdp_cmd(self, _cmd: str, _params: Dict) -> Dict:
+        return {}
+
+
+def synthetic_perf_log(wpisy: int) -> List[Dict]:
+    """Log jak z Chrome w trakcie nawigacji: głównie zasoby statyczne i dataReceived, kilka żądań ODPN na końcu"""
+    host = "https://bench.invalid"
+    entries = []
+
+    def wpis(metoda: str, params: Dict, ts: int):
+        entries.append({'level': 'INFO', 'timestamp': ts, 'message': json.dumps(
+            {'message': {'method': metoda, 'params': params}, 'webview': 'A1B2C3'})})
+
+    for i in range(wpisy - 2):
+        rodzaj = i % 5
+        request_id = f"1000.{i // 5}"
+        if rodzaj == 0:
+            wpis('Network.requestWillBeSent', {'requestId': request_id, 'request': {
+                'url': f"{host}/ext/resources/images/default/grid/row-{i}.gif", 'method': 'GET',
+                'headers': {'Referer': host}}}, i)
+        elif rodzaj == 1:
+            wpis('Network.responseReceived', {'requestId': request_id, 'response': {
+                'url': f"{host}/ext/resources/images/default/grid/row-{i}.gif", 'status': 200,
+                'headers': {'Content-Type': 'image/gif'}, 'mimeType': 'image/gif'}}, i)
+        elif rodzaj in (2, 3):
+            wpis('Network.dataReceived', {'requestId': request_id, 'dataLength': 4096, 'encodedDataLength': 4096}, i)
+        else:
+            wpis('Network.loadingFinished', {'requestId': request_id, 'encodedDataLength': 8192}, i)
+
+    kontekst = {'data': {'groupDir': 'ASC', 'wydrukId': 95001, 'IdDokumentu': 5001, 'szkid': 1001, 'rok': ROK,
+                         'miesiac': 1, 'rozdzial': '80120', 'sort': 'Id', 'dir': 'ASC',
+                         'v_store_fields': [{'name': f"_{n}", 'allowBlank': False} for n in range(3, 12)]}}
+    wpis('Network.requestWillBeSent', {'requestId': '2000.1', 'request': {
+        'url': f"{host}/ODPN/Szkoly/RozliczenieDotacji/Kontrolki/Taby/Dokument/Dokument.asmx/GridGetData",
+        'method': 'POST', 'headers': {'Cookie': 'ASP.NET_SessionId=abc'},
+        'postData': json.dumps(kontekst)}}, wpisy)
+    wpis('Network.loadingFinished', {'requestId': '2000.1', 'encodedDataLength': 512}, wpisy + 1)
+    return entries
+
+
+def bench_capture(wpisy: int) -> Tuple[Callable[[], object], int]:
+    """NetworkListener.poll + wyszukanie GridGetData z pełnym kontekstem (jak capture_response)"""
+    log = synthetic_perf_log(wpisy)
+
+    def pelny_kontekst(event):
+        post_data = post_json(event)
+        return (event.get('method') == 'POST' and isinstance(post_data, dict)
+                and isinstance(post_data.get('data'), dict)
+                and all(post_data['data'].get(field) is not None for field in REQUIRED_FIELDS))
+
+    def uruchom():
+        listener = NetworkListener(LogReplay(log))
+        listener.poll()
+        if listener.find('GridGetData', predicate=pelny_kontekst) is None:
+            raise RuntimeError("Nie znaleziono GridGetData w syntetycznym logu")
+    return uruchom, wpisy
+
+
+def benchmarks(wiersze: int, wpisy: int) -> Dict[str, Callable[[], Tuple[Callable[[], object], int]]]:
+    """Nazwa -> przygotowanie (zwraca funkcję mierzoną i liczbę elementów); przygotowanie nie jest mierzone"""
+    wynik = {f"wiersze_{schemat}": (lambda s=schemat: bench_wiersze(s, wiersze)) for schemat in WARIANTY}
+    wynik['kategorie_belchatow'] = lambda: bench_kategorie(wiersze)
+    wynik['kategorie_belchatow_bez_cache'] = lambda: bench_kategorie_bez_cache(wiersze)
+    wynik['capture'] = lambda: bench_capture(wpisy)
+    return wynik
+
+
+def calibration():
+    """Stała porcja pracy w czystym Pythonie (napisy, float, słowniki) - miara bieżącej szybkości maszyny"""
+    for i in range(20000):
+        wiersz = {'kwota': round(float(f"{i},50".replace(',', '.')), 2), 'opis': f"Opis {i}".strip()}
+        wiersz.update(numer=str(i))
+
+
+def _loops(funkcja: Callable[[], object], min_probka: float) -> int:
+    """Liczba wywołań na próbkę (jak timeit.autorange) - pierwsze wywołanie jest zarazem rozgrzewką"""
+    start = time.perf_counter()
+    funkcja()
+    pierwsze = time.perf_counter() - start
+    return int(min_probka / pierwsze) + 1 if pierwsze < min_probka else 1
+
+
+def _sample(funkcja: Callable[[], object], petle: int) -> float:
+    start = time.perf_counter()
+    for _ in range(petle):
+        funkcja()
+    return (time.perf_counter() - start) / petle
+
+
+def measure(funkcja: Callable[[], object], powtorzenia: int, min_probka: float = 0.05) -> Dict[str, float]:
+    """Czas jednego wykonania (minimum i mediana) oraz mediana stosunku do kalibracji
+
+    Próbki benchmarku i kalibracji są wykonywane na przemian, więc zmiana szybkości maszyny
+    (taktowanie, obciążenie) w trakcie pomiaru dotyczy obu tak samo. GC jest wyłączony na czas
+    pomiaru - śmieci po poprzednich benchmarkach nie trafiają do wyniku.
+    """
+    gc.collect()
+    gc_wlaczony = gc.isenabled()
+    gc.disable()
+    try:
+        petle = _loops(funkcja, min_probka)
+        petle_kalibracji = _loops(calibration, min_probka)
+        czasy, stosunki = [], []
+        for _ in range(powtorzenia):
+            kalibracja = _sample(calibration, petle_kalibracji)
+            czas = _sample(funkcja, petle)
+            czasy.append(czas)
+            stosunki.append(czas / kalibracja)
+    finally:
+        if gc_wlaczony:
+            gc.enable()
+    return {'min_s': min(czasy), 'mediana_s': statistics.median(czasy), 'wzgledny': statistics.median(stosunki)}
+
+
+def run(nazwy: List[str], wiersze: int, wpisy: int, powtorzenia: int) -> Dict[str, Dict]:
+    """Wyniki benchmarków; 'wzgledny' = czas / czas kalibracji (mediana z par próbek)"""
+    wyniki = {}
+    dostepne = benchmarks(wiersze, wpisy)
+    for nazwa in nazwy:
+        funkcja, n = dostepne[nazwa]()
+        pomiar = measure(funkcja, powtorzenia)
+        wyniki[nazwa] = {'n': n, 'min_s': round(pomiar['min_s'], 6), 'mediana_s': round(pomiar['mediana_s'], 6),
+                         'ns_na_element': round(pomiar['min_s'] / n * 1e9, 1),
+                         'wzgledny': round(pomiar['wzgledny'], 4)}
+    return wyniki
+
+
+def compare(wyniki: Dict[str, Dict], bazowe: Dict[str, Dict], prog: float) -> List[str]:
+    """Benchmarki wolniejsze od bazowych o więcej niż prog %
+
+    Porównywany jest czas względem kalibracji - zmiana szybkości maszyny (taktowanie, obciążenie)
+    przesuwa oba pomiary tak samo i nie jest zgłaszana jako regresja.
+    """
+    regresje = []
+    for nazwa, wynik in wyniki.items():
+        bazowy = bazowe.get(nazwa)
+        if bazowy is None or 'wzgledny' not in bazowy:
+            print(f"  {nazwa}: {wynik['ns_na_element']} ns/element (brak wyniku bazowego)")
+            continue
+        zmiana = (wynik['wzgledny'] - bazowy['wzgledny']) / bazowy['wzgledny'] * 100
+        znak = '✗' if zmiana > prog else '✓'
+        print(f"  {znak} {nazwa}: {bazowy['ns_na_element']} -> {wynik['ns_na_element']} ns/element, "
+              f"względem kalibracji {zmiana:+.1f}%")
+        if zmiana > prog:
+            regresje.append(nazwa)
+    return regresje
+
+
+def mismatched(wyniki: Dict[str, Dict], bazowe: Dict[str, Dict]) -> List[str]:
+    """Benchmarki mierzone na innej liczbie elementów niż bazowe - czas względny nie jest wtedy porównywalny
+
+    Koszt części benchmarków nie rośnie liniowo z n (budowa indeksu, pamięć wyników dopasowań),
+    więc wynik nie jest przeliczany na element, tylko porównanie jest odrzucane.
+    """
+    return [f"{nazwa} (bazowe n={bazowe[nazwa].get('n')}, teraz n={wynik['n']})"
+            for nazwa, wynik in wyniki.items() if nazwa in bazowe and bazowe[nazwa].get('n') != wynik['n']]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tylko', help="nazwy benchmarków, po przecinku")
+    parser.add_argument('--wiersze', type=int, default=10000, help="wiersze CSV na benchmark")
+    parser.add_argument('--wpisy', type=int, default=100000, help="wpisy syntetycznego logu performance")
+    parser.add_argument('--powtorzenia', type=int, default=5)
+    parser.add_argument('--prog', type=float, default=20.0, help="dopuszczalne spowolnienie [%%]")
+    parser.add_argument('--bazowe', type=Path, default=DOMYSLNE_BAZOWE)
+    parser.add_argument('--zapisz', action='store_true', help="zapis wyników jako nowych bazowych")
+    args = parser.parse_args(argv)
+
+    dostepne = list(benchmarks(args.wiersze, args.wpisy))
+    nazwy = args.tylko.split(',') if args.tylko else dostepne
+    nieznane = [n for n in nazwy if n not in dostepne]
+    if nieznane:
+        raise SystemExit(f"Nieznane benchmarki: {', '.join(nieznane)} (dostępne: {', '.join(dostepne)})")
+
+    wyniki = run(nazwy, args.wiersze, args.wpisy, args.powtorzenia)
+    srodowisko = {'python': platform.python_version(), 'maszyna': platform.machine(), 'system': platform.system()}
+
+    if args.zapisz:
+        bazowe = {}
+        if args.bazowe.exists():
+            bazowe = json.loads(args.bazowe.read_text(encoding='utf-8')).get('wyniki', {})
+        bazowe.update(wyniki)
+        args.bazowe.write_text(json.dumps({'srodowisko': srodowisko, 'wyniki': bazowe}, indent=2,
+                                          ensure_ascii=False) + '\n', encoding='utf-8')
+        for nazwa, wynik in wyniki.items():
+            print(f"  {nazwa}: {wynik['ns_na_element']} ns/element")
+        print(f"Zapisano wyniki bazowe: {args.bazowe}")
+        return 0
+
+    if not args.bazowe.exists():
+        print(json.dumps(wyniki, indent=2, ensure_ascii=False))
+        print(f"Brak wyników bazowych ({args.bazowe}) - uruchom z --zapisz", file=sys.stderr)
+        return 0
+    zapisane = json.loads(args.bazowe.read_text(encoding='utf-8'))
+    inne_n = mismatched(wyniki, zapisane.get('wyniki', {}))
+    if inne_n:
+        parser.error(f"inna liczba elementów niż w wynikach bazowych: {', '.join(inne_n)} - "
+                     f"uruchom z --wiersze/--wpisy jak przy --zapisz albo zapisz nowe wyniki bazowe")
+    if zapisane.get('srodowisko') != srodowisko:
+        print(f"⚠ Wyniki bazowe z innego środowiska: {zapisane.get('srodowisko')} (teraz: {srodowisko})")
+    regresje = compare(wyniki, zapisane.get('wyniki', {}), args.prog)
+    if regresje:
+        print(f"Regresja > {args.prog:g}%: {', '.join(regresje)}")
+        return 1
+    print("Bez regresji")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
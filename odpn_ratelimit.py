@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+class AdaptiveRateLimiter:
+    """Token bucket z regulacją AIMD - tempo rośnie przy szybkich odpowiedziach, spada przy 5xx/429/timeout"""
+
+    def __init__(self, rate: float = 1.0, min_rate: float = 0.2, max_rate: float = 10.0,
+                 burst: float = 1.0, increase: float = 0.5, decrease: float = 0.5,
+                 target_latency: float = 1.0, window: int = 500):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase          # przyrost addytywny (żądań/s) po szybkiej odpowiedzi
+        self.decrease = decrease          # mnożnik po błędzie serwera / timeoucie
+        self.target_latency = target_latency
+
+        self._tokens = burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+
+        self.requests = 0
+        self.backoffs = 0
+        self.waited = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self) -> float:
+        """Pobranie tokenu (blokuje do czasu jego dostępności), zwraca czas oczekiwania"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.waited += waited
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def record(self, latency: float, status: Optional[int] = None, error: bool = False):
+        """Aktualizacja tempa na podstawie wyniku żądania"""
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(latency)
+            if error or status == 429 or (status is not None and status >= 500):
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._tokens = min(self._tokens, 0)
+                self.backoffs += 1
+            elif latency <= self.target_latency:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            else:
+                # Serwer zwalnia - lekkie przyhamowanie zanim zacznie zwracać błędy
+                self.rate = max(self.min_rate, self.rate * 0.9)
+
+    def stats(self) -> Dict:
+        """Aktualne tempo i statystyki opóźnień (w sekundach)"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'rate': round(self.rate, 3),
+                'requests': self.requests,
+                'backoffs': self.backoffs,
+                'waited': round(self.waited, 3),
+            }
+        if latencies:
+            stats.update({
+                'latency_avg': round(sum(latencies) / len(latencies), 3),
+                'latency_p50': round(latencies[len(latencies) // 2], 3),
+                'latency_p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+                'latency_max': round(latencies[-1], 3),
+            })
+        return stats
@@ -0,0 +1,138 @@
+import json
+from typing import Dict, Iterable, List, Optional
+
+from odpn_http import HttpPool
+
+# Pola identyfikujące dokument miesiąca - reszta danych GridGetData (v_store_fields itd.) jest wspólna dla rozdziału
+POLA_DOKUMENTU = ('miesiac', 'rozdzial', 'IdDokumentu', 'wydrukId')
+
+# Pola porównywane z odpowiedzią GridGetData - rekord z inną wartością to dane cudzego dokumentu
+POLA_KONTROLI = ('IdDokumentu', 'miesiac', 'rozdzial', 'szkid', 'rok')
+
+# Endpointy formularza dokumentu - nie są listą miesięcy
+POMIJANE = ('GridGetData', 'SubmitForm', 'GridDeleteRow')
+
+
+def decode_body(body):
+    """Odpowiedź ASP.NET bywa opakowana w {"d": ...}, a "d" bywa napisem z JSON-em"""
+    if isinstance(body, str):
+        try:
+            body = json.loads(body)
+        except json.JSONDecodeError:
+            return None
+    if isinstance(body, dict) and 'd' in body:
+        return decode_body(body['d'])
+    return body
+
+
+def month_records(body) -> List[Dict]:
+    """Rekordy dokumentów miesięcy (słowniki z miesiac i IdDokumentu) w dowolnym miejscu odpowiedzi"""
+    found = []
+    stack = [decode_body(body)]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if node.get('miesiac') is not None and node.get('IdDokumentu') is not None:
+                found.append(node)
+                continue
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return found
+
+
+def grid_matches(body, data: Dict) -> bool:
+    """Odpowiedź GridGetData dotyczy dokumentu z data: jest listą wierszy, bez success=false
+    i bez rekordów z innym dokumentem/miesiącem/rozdziałem"""
+    odpowiedz = decode_body(body)
+    if isinstance(odpowiedz, dict):
+        if odpowiedz.get('success') is False:
+            return False
+        if not any(isinstance(value, list) for value in odpowiedz.values()):
+            return False
+    elif not isinstance(odpowiedz, list):
+        return False
+    oczekiwane = {pole: str(data[pole]) for pole in POLA_KONTROLI if data.get(pole) is not None}
+    stack = [odpowiedz]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            for pole, wartosc in oczekiwane.items():
+                if node.get(pole) is not None and str(node[pole]) != wartosc:
+                    return False
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return True
+
+
+def find_list_request(driver, requests: Iterable[Dict]) -> Optional[Dict]:
+    """Wyszukanie wśród przechwyconych żądań tego, które zasila grid Rozliczenia dotacji
+
+    Kandydatami są zakończone POST-y do RozliczenieDotacji (poza endpointami formularza dokumentu);
+    o wyborze decyduje treść odpowiedzi - musi zawierać rekordy miesięcy.
+    """
+    for event in list(requests):
+        url = event.get('url', '')
+        if (event.get('method') != 'POST' or not event.get('finished')
+                or 'RozliczenieDotacji' not in url or any(p in url for p in POMIJANE)):
+            continue
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': event['requestId']})
+        except Exception:
+            continue
+        if month_records(body.get('body')):
+            return {
+                'url': url,
+                'postData': event.get('postData'),
+                'contentType': event.get('headers', {}).get('Content-Type'),
+            }
+    return None
+
+
+class ContextResolver:
+    """Kontekst formularza dla wszystkich miesięcy rozdziału samym HTTP - bez klikania po gridzie Ext"""
+
+    def __init__(self, http: HttpPool):
+        self.http = http
+
+    def fetch(self, list_request: Dict) -> List[Dict]:
+        """Ponowienie żądania listy miesięcy, zwraca rekordy dokumentów"""
+        headers = {'Content-Type': list_request.get('contentType') or 'application/json'}
+        response = self.http.post(list_request['url'], data=list_request.get('postData') or '', headers=headers)
+        response.raise_for_status()
+        try:
+            return month_records(response.json())
+        except ValueError:
+            return month_records(response.text)
+
+    def resolve(self, list_request: Dict, template: Dict) -> Dict[int, Dict]:
+        """Dane GridGetData per miesiąc - szablon rozdziału z podmienionymi ID dokumentu"""
+        contexts = {}
+        for record in self.fetch(list_request):
+            if template.get('rozdzial') is not None and record.get('rozdzial') not in (None, template['rozdzial']):
+                continue
+            try:
+                miesiac = int(record['miesiac'])
+            except (TypeError, ValueError):
+                continue
+            data = dict(template)
+            data.update({pole: record[pole] for pole in POLA_DOKUMENTU if record.get(pole) is not None})
+            contexts[miesiac] = data
+        return contexts
+
+    def check(self, url: str, data: Dict) -> bool:
+        """Bezpośrednie wywołanie GridGetData - sam status 200 nie wystarcza, treść musi dotyczyć tego dokumentu"""
+        try:
+            response = self.http.post(url, json={"data": data},
+                                      headers={'Content-Type': 'application/json'})
+        except Exception as e:
+            print(f"Błąd GridGetData: {e}")
+            return False
+        if not response.ok:
+            return False
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+        return grid_matches(body, data)
@@ -0,0 +1,245 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Schematy wierszy CSV per wariant (miasto/rozdział):
+#   pola        - kolejne pola formularza (fields_name[i]) jako (kolumna CSV, parser); kolumna None = wartość stała
+#   wymagane    - minimalna liczba pól formularza, przy której pola są wypełniane
+#   numery_pol  - tabele pozycji: klucz -> (NumerPola, Id)
+#   kolumny     - minimalna liczba kolumn wiersza CSV
+#   kategoria   - (kolumna, dopasowanie): 'dokladne' = klucz tabeli, 'indeks' = CategoryIndex
+#   miesiac     - (kolumna, parser kodu miesiąca "MM") dla plików z wieloma miesiącami
+# Schemat jest kompilowany raz (compile_schema) do funkcji wiersz -> dane POST.
+
+
+def tekst(value: str) -> str:
+    return value.strip()
+
+
+def kwota(value: str) -> float:
+    """Bezpieczne parsowanie kwot"""
+    cleaned = value.replace(',', '.').replace(' ', '').strip()
+    return round(float(cleaned), 2)
+
+
+def kwota_lub_zero(value: str) -> float:
+    return kwota(value) if value != "" else 0.0
+
+
+def data(value: str) -> str:
+    return f"{value.strip()}T00:00:00"
+
+
+_MIESIAC_KROPKA = re.compile(r'\d{2}\.\d{4}').match
+
+
+def miesiac_kropka(value: str) -> str:
+    """Kod miesiąca z 06.2025"""
+    value = value.strip()
+    if not _MIESIAC_KROPKA(value):
+        raise ValueError(f"Nieprawidłowy format miesiąca: {value}")
+    return value[:2]
+
+
+def miesiac_ukosnik(value: str) -> str:
+    """Kod miesiąca z 6/2025"""
+    return value.strip().split('/')[0].zfill(2)
+
+
+def stala(wartosc) -> Callable[[Optional[str]], object]:
+    return lambda _: wartosc
+
+
+def slownik(mapping: Dict[str, object], domyslna) -> Callable[[str], object]:
+    return lambda value: mapping.get(value.strip().lower(), domyslna)
+
+
+# Mapowanie TYP dokumentu (piotrkow2)
+TYP_DOKUMENTU = {
+    'faktura': 0,
+    'rachunek': 1,
+    'lista płac': 2,
+    'umowa': 3,
+    'dokument wewnętrzny': 4,
+    'dokument wewnętrzny (pk)': 4,
+    'wyciąg bankowy': 5,
+    'nota księgowa': 6,
+    'deklaracja zus': 7,
+    'deklaracja pit': 8,
+}
+
+# rodzaj_i_nr_dowodu, pelna_kwota_zobowiazania, data_wystawienia, przedmiot_zakupu, data_platnosci,
+# kwota_z_dotacji, kwota_orzeczenia (+ kwota_orzeczenia_rozliczona)
+_POLA_WYDATKU = [(2, tekst), (3, kwota), (4, data), (5, tekst), (6, data), (7, kwota), (8, kwota)]
+
+_POZYCJE_3X = {
+    '1.': (1, -1), '2.': (2, -2), '3.1.': (4, -3),
+    '3.2.': (5, -4), '3.3.': (6, -5), '3.4.': (7, -6), '3.5.': (8, -7)
+}
+
+_POZYCJE_PIOTRKOW = {
+    '1.': (2, -1), '2.': (22, -2), '3.': (23, -3),
+    '4.': (24, -4), '5.': (25, -5), '6.': (26, -6), '7.': (27, -7)
+}
+
+SCHEMATY = {
+    'odpn2': {
+        'pola': _POLA_WYDATKU + [(9, kwota)],
+        'wymagane': 7,
+        'numery_pol': {'domyslne': _POZYCJE_3X},
+        'kolumny': 8,
+        'kategoria': (1, 'dokladne'),
+    },
+    'czestochowa': {
+        'pola': _POLA_WYDATKU + [(9, kwota)],
+        'wymagane': 7,
+        'numery_pol': {'domyslne': _POZYCJE_3X},
+        'kolumny': 8,
+        'kategoria': (1, 'dokladne'),
+    },
+    'piotrkow': {
+        'pola': _POLA_WYDATKU,
+        'wymagane': 7,
+        'numery_pol': {'domyslne': _POZYCJE_PIOTRKOW},
+        'kolumny': 8,
+        'kategoria': (1, 'dokladne'),
+    },
+    'piotrkow2': {
+        # typ dokumentu, numer, data wystawienia, kwota brutto, rodzaj/nr dowodu zapłaty, data zapłaty, kwota, grupa
+        'pola': [(2, slownik(TYP_DOKUMENTU, 0)), (3, tekst), (4, data), (5, kwota),
+                 (6, tekst), (7, data), (8, kwota), (9, tekst)],
+        'wymagane': 0,
+        'numery_pol': {
+            'domyslne': _POZYCJE_PIOTRKOW,
+            '272': {'1.': (2, -1), '2.': (12, -2), '3.': (13, -3)},
+        },
+        # Kategoria zawsze w ostatniej kolumnie (nawet gdy dojdą UWAGI)
+        'kolumny': 10,
+        'kategoria': (-1, 'dokladne'),
+        'miesiac': (1, miesiac_kropka),
+    },
+    'belchatow': {
+        # rodzaj wydatku, data wystawienia, referencja, data zapłaty, forma zapłaty, koszt całkowity,
+        # dotacja, dotacja (niepełnosprawni), kształcenie specjalne
+        'pola': [(3, tekst), (2, data), (3, tekst), (4, data), (None, stala("przelew")), (5, kwota),
+                 (6, kwota_lub_zero), (7, kwota_lub_zero), (None, stala(0.0))],
+        'wymagane': 8,
+        'numery_pol': {
+            'egzaminy': {
+                '1. Wydatki na wynagrodzenia osoby fizycznej prowadzącej podmiot dotowany za pełnienie funkcji dyrektora  - podanie kwot w poszczególnych miesiącach': (17000, -1),
+                '2. Wydatki na wynagrodzenia kadry pedagogicznej ': (17001, -2),
+                '3. Wydatki na wynagrodzenia administracji i obsługi': (17002, -3),
+                '4. Wydatki na pochodne od wynagrodzeń ': (17003, -4),
+                '5. Wydatki na zakup pomocy naukowych i dydaktycznych': (17004, -5),
+                '6. Wydatki na zakup artykułów administracyjno-biurowych': (17005, -6),
+                '7. Wydatki na wynajem pomieszczeń': (17006, -7),
+                '8. Wydatki na zakup wyposażenia': (14, -8),
+                '9. Wydatki na zakup usług': (17007, -9),
+                '10. Opłaty za media (energia elektryczna, gaz, wod-kan., energia cieplna, itp.)': (17008, -10),
+                '11. Pozostałe wydatki -wymienić jakie': (15, -11),
+                '12.Zakup środków trwałych oraz wartości niematerialnych i prawnych, których mowa w art. 35 ust 1 pkt 2 ustawy o finansowaniu zadań oświatowych, a niewymienionych w zestawieniu powyżej': (238, -12),
+            },
+            'oswiata': {
+                '1. Wydatki na wynagrodzenia osoby fizycznej prowadzącej podmiot dotowany za pełnienie funkcji dyrektora  - podanie kwot w poszczególnych miesiącach': (13, -1),
+                '2. Wydatki na wynagrodzenia kadry pedagogicznej ': (17000, -2),
+                '3. Wydatki na wynagrodzenia administracji i obsługi': (17001, -3),
+                '4. Wydatki na pochodne od wynagrodzeń ': (17002, -4),
+                '5. Wydatki na zakup pomocy naukowych i dydaktycznych': (17003, -5),
+                '6. Wydatki na zakup artykułów administracyjno-biurowych': (17004, -6),
+                '7. Wydatki na wynajem pomieszczeń': (17005, -7),
+                '8. Wydatki na zakup wyposażenia': (17006, -8),
+                '9. Wydatki na zakup usług': (14, -9),
+                '10. Opłaty za media (energia elektryczna, gaz, wod-kan., energia cieplna, itp.)': (17007, -10),
+                '11. Pozostałe wydatki -wymienić jakie': (17008, -11),
+                '12.Zakup środków trwałych oraz wartości niematerialnych i prawnych, których mowa w art. 35 ust 1 pkt 2 ustawy o finansowaniu zadań oświatowych, a niewymienionych w zestawieniu powyżej': (15, -12),
+            },
+        },
+        'kolumny': 10,
+        'kategoria': (0, 'indeks'),
+        'miesiac': (9, miesiac_ukosnik),
+    },
+}
+
+
+def columns_needed(schema: Dict) -> int:
+    """Minimalna liczba kolumn CSV wymagana przez schemat"""
+    return max((kolumna for kolumna, _ in schema['pola'] if kolumna is not None), default=-1) + 1
+
+
+def compile_schema(schema: Dict, fields_name: List[str]) -> Callable[[List[str], Tuple, Dict], Dict]:
+    """Funkcja wiersz CSV -> dane POST dla danego zestawu pól formularza (przypisania wyliczone raz)"""
+    if len(fields_name) < schema.get('wymagane', 0):
+        przypisania = ()
+    else:
+        przypisania = tuple(
+            (fields_name[i], kolumna, parser)
+            for i, (kolumna, parser) in enumerate(schema['pola'])
+            if i < len(fields_name)
+        )
+
+    def transform(dane: List[str], nr_pozycji: Tuple, ids: Dict) -> Dict:
+        dane_post = {"Id": str(nr_pozycji[1])}
+        dane_post.update(ids)
+        dane_post["NumerPola"] = str(nr_pozycji[0])
+        for pole, kolumna, parser in przypisania:
+            dane_post[pole] = parser(dane[kolumna] if kolumna is not None else None)
+        return dane_post
+
+    return transform
+
+
+def normalize_label(text: str) -> str:
+    """Postać etykiety do porównań: casefold, bez polskich znaków, pojedyncze spacje, spacja po numerze pozycji"""
+    text = unicodedata.normalize('NFKD', text.casefold().replace('ł', 'l'))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'^(\d+)\.\s*', r'\1. ', ' '.join(text.split())).strip()
+    return text
+
+
+class CategoryIndex:
+    """Indeks etykiet tabeli numery_pol budowany raz - dopasowanie kategorii z CSV do klucza tabeli
+
+    Kolejność prób: identyczna etykieta, numer pozycji ("9" / "9."), fragment etykiety.
+    Wynik to lista pasujących kluczy: pusta = nieznana kategoria, więcej niż jeden = niejednoznaczna.
+    """
+
+    def __init__(self, numery_pol: Dict[str, Tuple[int, int]]):
+        self.exact = {}
+        self.numbers = {}
+        self.labels = []
+        # Klucze tabeli, które po normalizacji są nie do odróżnienia
+        self.collisions = []
+        for key in numery_pol:
+            norm = normalize_label(key)
+            if norm in self.exact:
+                self.collisions.append((self.exact[norm], key))
+                continue
+            self.exact[norm] = key
+            self.labels.append((norm, key))
+            m = re.match(r'(\d+)\.', norm)
+            if m:
+                self.numbers.setdefault(m.group(1), key)
+        self._cache = {}
+
+    def match(self, kategoria: str) -> List[str]:
+        wynik = self._cache.get(kategoria)
+        if wynik is None:
+            wynik = self._cache[kategoria] = self._match(normalize_label(kategoria))
+        return wynik
+
+    def _match(self, needle: str) -> List[str]:
+        if not needle:
+            return []
+        if needle in self.exact:
+            return [self.exact[needle]]
+        m = re.fullmatch(r'(\d+)\.?', needle)
+        if m:
+            key = self.numbers.get(m.group(1))
+            return [key] if key is not None else []
+        return [key for norm, key in self.labels if needle in norm]
+
+
+@lru_cache(maxsize=None)
+def category_index(schemat: str, tabela: str) -> CategoryIndex:
+    return CategoryIndex(SCHEMATY[schemat]['numery_pol'][tabela])
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+
+# Domyślny katalog zapisanych sesji (ciasteczka + storage przeglądarki)
+DOMYSLNY_KATALOG = Path.home() / ".odpn" / "sesje"
+
+
+class SessionCache:
+    """Zapis zalogowanej sesji na dysku - osobny plik dla każdej pary host/konto"""
+
+    def __init__(self, directory: Path = DOMYSLNY_KATALOG):
+        self.directory = Path(directory)
+
+    def _path(self, host: str, account: str) -> Path:
+        # Login nie trafia do nazwy pliku wprost
+        konto = hashlib.sha1((account or "reczne").encode('utf-8')).hexdigest()[:12]
+        return self.directory / f"{host}_{konto}.json"
+
+    def load(self, host: str, account: str) -> Optional[Dict]:
+        path = self._path(host, account)
+        try:
+            with path.open('r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def save(self, host: str, account: str, cookies: requests.cookies.RequestsCookieJar,
+             storage: Optional[Dict] = None):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data = {
+            'host': host,
+            'saved': time.time(),
+            'cookies': [
+                {'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path, 'expires': c.expires}
+                for c in cookies
+            ],
+            'storage': storage or {},
+        }
+        path = self._path(host, account)
+        tmp = path.with_suffix('.tmp')
+        # Plik z ciasteczkami od początku dostępny tylko dla właściciela
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        # Pozostałość po innych uprawnieniach (O_CREAT nie zmienia trybu istniejącego pliku)
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, path)
+
+    def drop(self, host: str, account: str):
+        try:
+            self._path(host, account).unlink()
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def restore_cookies(cookies: requests.cookies.RequestsCookieJar, data: Dict) -> int:
+        """Wczytanie zapisanych ciasteczek do sesji HTTP (pomija przeterminowane)"""
+        now = time.time()
+        count = 0
+        for c in data.get('cookies', []):
+            if c.get('expires') and c['expires'] < now:
+                continue
+            cookies.set(c['name'], c['value'], domain=c.get('domain') or '', path=c.get('path') or '/',
+                        expires=c.get('expires'))
+            count += 1
+        return count
@@ -0,0 +1,143 @@
+import json
+import queue
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+
+class SpilledList:
+    """Lista niepowodzeń zapisywana na bieżąco do pliku JSON Lines - w pamięci tylko licznik"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._count = 0
+        self._file = self.path.open('w', encoding='utf-8')
+
+    def append(self, item):
+        line = json.dumps(list(item), ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._count += 1
+
+    def extend(self, items: Iterable):
+        for item in items:
+            self.append(item)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    def __iter__(self) -> Iterator[Tuple]:
+        with self._lock:
+            self._file.flush()
+        with self.path.open('r', encoding='utf-8') as f:
+            for line in f:
+                yield tuple(json.loads(line))
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class SpillChunk:
+    """Fragment pliku miesiąca (zakres bajtów) - wiersze czytane z dysku przy każdej iteracji"""
+
+    def __init__(self, path: Path, start: int, end: int):
+        self.path = path
+        self.start = start
+        self.end = end
+
+    def __iter__(self):
+        with self.path.open('r', encoding='utf-8') as f:
+            f.seek(self.start)
+            while f.tell() < self.end:
+                line = f.readline()
+                if not line:
+                    break
+                yield json.loads(line)
+
+
+class MonthSpill:
+    """Podział strumienia wierszy na pliki per miesiąc, wykonywany w osobnym wątku
+
+    Miesiąc jest gotowy do wysyłki, gdy kończy się ciąg jego wierszy w pliku wejściowym
+    (plik pogrupowany po miesiącach = każdy miesiąc raz). Wiersze miesiąca, który pojawi się
+    ponownie, trafiają do kolejnego fragmentu tego samego miesiąca.
+    """
+
+    def __init__(self, directory: Optional[Path] = None):
+        self.directory = Path(tempfile.mkdtemp(prefix='odpn_miesiace_', dir=directory))
+        self._files = {}
+        self._consumed = {}
+        self._queue = queue.Queue()
+
+    def _path(self, miesiac) -> Path:
+        return self.directory / f"{miesiac}.jsonl"
+
+    def _emit(self, miesiac):
+        plik = self._files[miesiac]
+        plik.flush()
+        self._queue.put((miesiac, plik.tell()))
+
+    def _reader(self, rows: Iterable[Tuple[str, Tuple]]):
+        poprzedni = None
+        try:
+            for miesiac, record in rows:
+                if poprzedni is not None and miesiac != poprzedni:
+                    self._emit(poprzedni)
+                plik = self._files.get(miesiac)
+                if plik is None:
+                    plik = self._files[miesiac] = self._path(miesiac).open('w', encoding='utf-8')
+                plik.write(json.dumps(record, ensure_ascii=False) + '\n')
+                poprzedni = miesiac
+            if poprzedni is not None:
+                self._emit(poprzedni)
+        except Exception as e:
+            self._queue.put(e)
+        finally:
+            self._queue.put(None)
+
+    def chunks(self, rows: Iterable[Tuple[str, Tuple]]) -> Iterator[Tuple[str, SpillChunk]]:
+        """(miesiąc, wiersze) w miarę czytania pliku - pierwszy miesiąc jest gotowy, zanim wczytany zostanie cały plik"""
+        watek = threading.Thread(target=self._reader, args=(rows,), daemon=True)
+        watek.start()
+        koniec = False
+        while not koniec:
+            gotowe = {}
+            item = self._queue.get()
+            # Zdarzenia, które czekają już w kolejce, są łączone (mniej fragmentów dla niepogrupowanego pliku)
+            while True:
+                if item is None:
+                    koniec = True
+                elif isinstance(item, Exception):
+                    watek.join()
+                    raise item
+                else:
+                    gotowe[item[0]] = item[1]
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            for miesiac, end in gotowe.items():
+                start = self._consumed.get(miesiac, 0)
+                if end > start:
+                    self._consumed[miesiac] = end
+                    yield miesiac, SpillChunk(self._path(miesiac), start, end)
+        watek.join()
+
+    def close(self):
+        for plik in self._files.values():
+            plik.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
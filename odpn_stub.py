@@ -0,0 +1,540 @@
+"""Lokalny zastępnik serwera ODPN do uruchomień offline i benchmarków (tylko biblioteka standardowa)
+
+    python odpn_stub.py --port 8443 --opoznienie 0.05 --pojemnosc 8 --rozdzialy 80120,Egzaminy
+
+Obsługuje to, czego używają skrypty: stronę logowania ASP.NET, ZmianaPlacowki_Resp.aspx,
+Dokument.asmx/GridGetData, SubmitForm i GridDeleteRow, listę miesięcy oraz uproszczoną stronę
+w stylu Ext (#ext-gen43, x-grid3-row, zakładki Wydatki/Dokumenty, .add, #ext-gen61).
+Skrypty łączą się przez https://{host}, więc serwer działa na TLS z certyfikatem self-signed
+(openssl) - SiteWrap dostaje go jako verify, Chrome opcję ignore-certificate-errors.
+"""
+import argparse
+import json
+import random
+import re
+import secrets
+import shutil
+import ssl
+import subprocess
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+DOKUMENT = '/ODPN/Szkoly/RozliczenieDotacji/Kontrolki/Taby/Dokument/Dokument.asmx/'
+LISTA = '/ODPN/Szkoly/RozliczenieDotacji/RozliczenieDotacji.asmx/PobierzMiesiace'
+ZMIANA_PLACOWKI = '/Common/ZmianaPlacowki/ZmianaPlacowki_Resp.aspx'
+COOKIE = 'ASP.NET_SessionId'
+
+# Wiersze listy miesięcy: 0 = zestawienie roczne ("Rok"), 1-12 = miesiące
+MIESIACE = ['Rok', 'Styczeń', 'Luty', 'Marzec', 'Kwiecień', 'Maj', 'Czerwiec', 'Lipiec',
+            'Sierpień', 'Wrzesień', 'Październik', 'Listopad', 'Grudzień']
+
+try:
+    from zoneinfo import ZoneInfo
+    STREFA = ZoneInfo("Europe/Warsaw")
+except Exception:  # brak bazy stref - czas lokalny systemu
+    STREFA = None
+
+DOMYSLNY_KATALOG_CERT = Path.home() / ".odpn" / "stub"
+
+
+def generate_cert(directory: Path = DOMYSLNY_KATALOG_CERT) -> Tuple[Path, Path]:
+    """Certyfikat self-signed dla 127.0.0.1/localhost (tworzony raz, przez openssl)"""
+    directory = Path(directory)
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    if cert.exists() and key.exists():
+        return cert, key
+    if shutil.which('openssl') is None:
+        raise RuntimeError("Brak openssl - podaj gotowy certyfikat (--cert/--key)")
+    directory.mkdir(parents=True, exist_ok=True)
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '365',
+         '-keyout', str(key), '-out', str(cert), '-subj', '/CN=localhost',
+         '-addext', 'subjectAltName=IP:127.0.0.1,DNS:localhost'],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+class StubState:
+    """Dane serwera: sesje, placówki, dokumenty miesięcy i ich wiersze (wszystko w pamięci)"""
+
+    def __init__(self, szkoly: List[int], rok: int, rozdzialy: List[str], pola: int,
+                 login: str, haslo: str):
+        self.rok = rok
+        self.rozdzialy = list(rozdzialy)
+        self.login = login
+        self.haslo = haslo
+        # Pola formularza wymagane przez ODPN (allowBlank=false) i pola techniczne
+        self.fields = ([{'name': f"_{n}", 'allowBlank': False} for n in range(3, 3 + pola)]
+                       + [{'name': 'Id', 'allowBlank': True}, {'name': 'NumerPola', 'allowBlank': True}])
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, Optional[int]] = {}
+        self.documents: Dict[int, Dict] = {}
+        self.rows: Dict[int, Dict[int, Dict]] = {}
+        self._next_row = 28000
+        numer = 5000
+        for szkid in szkoly:
+            for rozdzial in self.rozdzialy:
+                for miesiac in range(len(MIESIACE)):
+                    numer += 1
+                    self.documents[numer] = {'szkid': szkid, 'rok': rok, 'miesiac': miesiac,
+                                             'rozdzial': rozdzial, 'IdDokumentu': numer,
+                                             'wydrukId': 90000 + numer}
+                    self.rows[numer] = {}
+        self.default_school = szkoly[0]
+        self.stats = {'zadania': {}, 'odrzucone': 0}
+
+    def count(self, endpoint: str):
+        with self.lock:
+            self.stats['zadania'][endpoint] = self.stats['zadania'].get(endpoint, 0) + 1
+
+    def new_session(self) -> str:
+        token = secrets.token_hex(12)
+        with self.lock:
+            self.sessions[token] = self.default_school
+        return token
+
+    def document(self, session: str, id_dokumentu) -> Optional[Dict]:
+        """Dokument należący do bieżącej placówki sesji (inaczej None - jak odrzucenie przez ODPN)"""
+        try:
+            doc = self.documents.get(int(id_dokumentu))
+        except (TypeError, ValueError):
+            return None
+        if doc is None or doc['szkid'] != self.sessions.get(session):
+            return None
+        return doc
+
+    def month_list(self, session: str) -> List[Dict]:
+        szkid = self.sessions.get(session)
+        return [dict(doc, nazwa=MIESIACE[doc['miesiac']])
+                for doc in self.documents.values() if doc['szkid'] == szkid]
+
+    def find_document(self, szkid: int, rozdzial: str, miesiac: int) -> Optional[Dict]:
+        for doc in self.documents.values():
+            if doc['szkid'] == szkid and doc['rozdzial'] == rozdzial and doc['miesiac'] == miesiac:
+                return doc
+        return None
+
+    def grid_request(self, doc: Dict) -> Dict:
+        """Dane żądania GridGetData, które wysyła strona po otwarciu dokumentu (kontekst formularza)"""
+        return {'groupDir': 'ASC', 'wydrukId': doc['wydrukId'], 'IdDokumentu': doc['IdDokumentu'],
+                'szkid': doc['szkid'], 'rok': doc['rok'], 'miesiac': doc['miesiac'], 'rozdzial': doc['rozdzial'],
+                'v_store_filters': [], 'v_store_filters_autoRemoteSearch': False, 'v_store_filters_addInfo': [],
+                'v_store_fields': self.fields, 'v_store_groupField': None, 'v_store_groupDir': 'ASC',
+                'sort': 'Id', 'dir': 'ASC'}
+
+    def add_row(self, doc: Dict, data: Dict) -> int:
+        with self.lock:
+            self._next_row += 1
+            row_id = self._next_row
+            row = {k: v for k, v in data.items() if not k.startswith('ID_')}
+            row['Id'] = row_id
+            self.rows[doc['IdDokumentu']][row_id] = row
+        return row_id
+
+    def delete_rows(self, doc: Dict, row_ids: List) -> bool:
+        """Wszystkie albo nic - nieistniejący wiersz odrzuca całą paczkę"""
+        with self.lock:
+            wiersze = self.rows[doc['IdDokumentu']]
+            try:
+                ids = [int(row_id) for row_id in row_ids]
+            except (TypeError, ValueError):
+                return False
+            if not ids or any(row_id not in wiersze for row_id in ids):
+                return False
+            for row_id in ids:
+                del wiersze[row_id]
+        return True
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return dict(self.stats, zadania=dict(self.stats['zadania']),
+                        wiersze=sum(len(r) for r in self.rows.values()), sesje=len(self.sessions))
+
+    def reset(self):
+        with self.lock:
+            for wiersze in self.rows.values():
+                wiersze.clear()
+            self.stats = {'zadania': {}, 'odrzucone': 0}
+
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>ODPN - logowanie</title></head><body>
+<form method="post" action="" id="form1">
+<input type="hidden" name="__VIEWSTATE" value="{viewstate}">
+<input type="hidden" name="__EVENTVALIDATION" value="{viewstate}">
+<input type="text" name="Login" id="Login">
+<input type="password" name="Haslo" id="Haslo">
+<input type="submit" name="ButtonLogowanie" id="ButtonLogowanie" value="Zaloguj">
+</form>{blad}
+</body></html>"""
+
+APP_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>ODPN</title>
+<style>
+.x-grid3-row-selected {{ background: #dfe8f6; }}
+.x-window {{ border: 1px solid #99bbe8; padding: 8px; }}
+.ext-el-mask {{ position: fixed; inset: 0; background: rgba(0,0,0,.1); }}
+</style></head><body>
+<div id="ext-gen43" class="x-toolbar">
+  <em class="x-unselectable"><button type="button" id="menu-rozliczenie">Rozliczenie dotacji</button></em>
+</div>
+<div id="wiadomosc" class="x-window" style="{wiadomosc}">
+  <span class="ext-mb-text">Masz nowe wiadomości</span>
+  <button type="button" onclick="this.parentNode.style.display='none'">OK</button>
+</div>
+<div id="rozliczenie" style="display:none">
+  <div class="x-grid3-scroller" id="lista"></div>
+  <ul class="x-tab-strip" id="zakladki">
+    <li id="ext-comp-1048__dokumentId_14"><span class="x-tab-strip-text">Wydatki</span></li>
+    <li id="ext-comp-1049__dokumentId_15"><span class="x-tab-strip-text">Dokumenty</span></li>
+  </ul>
+  <div id="dokument" style="display:none">
+    <button type="button" class="add">Dodaj</button>
+    <div class="x-grid3-scroller" id="dokumenty"></div>
+  </div>
+</div>
+<div id="ext-gen61"><a class="vlibrary-topLink" href="/">Powrót</a></div>
+<div class="ext-el-mask" style="display:none"></div>
+<script>
+var POLA = {pola};
+var MIESIACE = {miesiace};
+var lista = [], wybrany = null;
+
+function post(url, body, cb) {{
+  var x = new XMLHttpRequest();
+  x.open('POST', url);
+  x.setRequestHeader('Content-Type', 'application/json; charset=UTF-8');
+  x.onload = function () {{ cb(x.status, x.status == 200 ? JSON.parse(x.responseText).d : null); }};
+  x.send(JSON.stringify(body));
+}}
+function esc(t) {{
+  return String(t).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/"/g, '&quot;');
+}}
+function wiersz(komorki, attrs) {{
+  var td = '';
+  for (var k in komorki) {{
+    td += '<td class="x-grid3-col x-grid3-td-' + k + '"><div class="x-grid3-cell-inner x-grid3-col-' + k + '">'
+      + komorki[k] + '</div></td>';
+  }}
+  return '<div class="x-grid3-row" ' + (attrs || '') + '><table><tr>' + td + '</tr></table></div>';
+}}
+document.getElementById('menu-rozliczenie').onclick = function () {{
+  document.getElementById('rozliczenie').style.display = '';
+  post('{lista_url}', {{data: {{}}}}, function (status, d) {{
+    lista = d ? d.data : [];
+    var grupy = {{}}, kolejnosc = [];
+    lista.forEach(function (rec, i) {{
+      if (!(rec.rozdzial in grupy)) {{ grupy[rec.rozdzial] = ''; kolejnosc.push(rec.rozdzial); }}
+      var kom = {{1: esc(rec.nazwa)}};
+      if (rec.miesiac == 0) kom.edycja = '<span class="pencil">&#9998;</span>';
+      grupy[rec.rozdzial] += wiersz(kom, 'data-i="' + i + '"');
+    }});
+    document.getElementById('lista').innerHTML = kolejnosc.map(function (r) {{
+      var id = 'ext-gen90-gp-Rozdzial-' + esc(r);
+      return '<div class="x-grid-group" id="' + id + '"><div class="x-grid-group-hd"><div class="x-grid-group-title">'
+        + esc(r) + '</div></div><div class="x-grid-group-body" id="' + id + '-bd">' + grupy[r] + '</div></div>';
+    }}).join('');
+  }});
+}};
+document.getElementById('lista').onclick = function (e) {{
+  var row = e.target.closest('.x-grid3-row');
+  if (!row) return;
+  document.querySelectorAll('#lista .x-grid3-row-selected').forEach(function (r) {{
+    r.classList.remove('x-grid3-row-selected');
+  }});
+  row.classList.add('x-grid3-row-selected');
+  wybrany = lista[+row.getAttribute('data-i')];
+}};
+document.getElementById('zakladki').onclick = function (e) {{
+  if (!e.target.closest('li')) return;
+  var rec = wybrany || lista[0];
+  if (!rec) return;
+  document.getElementById('dokument').style.display = '';
+  var data = {{groupDir: 'ASC', wydrukId: rec.wydrukId, IdDokumentu: rec.IdDokumentu, szkid: rec.szkid,
+    rok: rec.rok, miesiac: rec.miesiac, rozdzial: rec.rozdzial, v_store_filters: [],
+    v_store_filters_autoRemoteSearch: false, v_store_filters_addInfo: [], v_store_fields: POLA,
+    v_store_groupField: null, v_store_groupDir: 'ASC', sort: 'Id', dir: 'ASC'}};
+  post('{dokument_url}GridGetData', {{data: data}}, function (status, d) {{
+    var rows = d ? d.data : [];
+    document.getElementById('dokumenty').innerHTML = rows.map(function (r) {{
+      var kom = {{2: r.Id}};
+      POLA.forEach(function (p) {{ if (p.name in r) kom[p.name] = esc(r[p.name]); }});
+      return wiersz(kom);
+    }}).join('');
+  }});
+}};
+</script>
+</body></html>"""
+
+
+def _asp_date(value):
+    """Data jak w JSON-ie ASP.NET: północ czasu polskiego jako /Date(ms UTC)/"""
+    if isinstance(value, str) and re.fullmatch(r'\d{4}-\d{2}-\d{2}T00:00:00', value):
+        return f"/Date({int(datetime.fromisoformat(value).replace(tzinfo=STREFA).timestamp() * 1000)})/"
+    return value
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Nagłówki i treść idą osobnymi zapisami - bez TCP_NODELAY każda odpowiedź czeka ~40 ms (Nagle + opóźniony ACK)
+    disable_nagle_algorithm = True
+    server_version = 'Microsoft-IIS/10.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # --- odpowiedzi ---
+
+    def _send(self, status: int, body: str, content_type: str = 'text/html; charset=utf-8',
+              headers: Optional[Dict[str, str]] = None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, status: int, payload):
+        self._send(status, json.dumps(payload, ensure_ascii=False), 'application/json; charset=utf-8')
+
+    def _error(self, message: str, status: int = 500):
+        self._json(status, {'Message': message, 'ExceptionType': 'System.InvalidOperationException'})
+
+    # --- sesja ---
+
+    def _session(self) -> Optional[str]:
+        for part in (self.headers.get('Cookie') or '').split(';'):
+            name, _, value = part.strip().partition('=')
+            if name == COOKIE and value in self.server.state.sessions:
+                return value
+        return None
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    # --- strony ---
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/__stan':
+            return self._json(200, self.server.state.snapshot())
+        if self._session() is None:
+            return self._login_page()
+        return self._app_page()
+
+    def _login_page(self, blad: str = ''):
+        self._send(200, LOGIN_PAGE.format(viewstate=secrets.token_hex(8), blad=blad))
+
+    def _app_page(self):
+        state = self.server.state
+        self._send(200, APP_PAGE.format(
+            pola=json.dumps(state.fields), miesiace=json.dumps(MIESIACE, ensure_ascii=False),
+            lista_url=LISTA, dokument_url=DOKUMENT,
+            wiadomosc='' if self.server.message else 'display:none'
+        ))
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path == '/__reset':
+            self._body()
+            self.server.state.reset()
+            return self._json(200, {'ok': True})
+        if not (path.startswith('/ODPN/') or path == ZMIANA_PLACOWKI):
+            return self._login_post()
+        self._api(path)
+
+    def _login_post(self):
+        state = self.server.state
+        fields = parse_qs(self._body().decode('utf-8'))
+        login = (fields.get('Login') or [''])[0]
+        haslo = (fields.get('Haslo') or [''])[0]
+        if login != state.login or haslo != state.haslo:
+            return self._login_page('<span class="blad">Nieprawidłowy login lub hasło</span>')
+        token = state.new_session()
+        self._send(302, '', headers={'Location': '/', 'Set-Cookie': f"{COOKIE}={token}; path=/; HttpOnly"})
+
+    # --- API (.asmx / .aspx) z opóźnieniem i limitem równoległych żądań ---
+
+    def _api(self, path: str):
+        body = self._body()
+        state = self.server.state
+        endpoint = path.rsplit('/', 1)[-1]
+        state.count(endpoint)
+        if not self.server.capacity.acquire(blocking=False):
+            with state.lock:
+                state.stats['odrzucone'] += 1
+            return self._send(503, 'Server Too Busy', 'text/plain', {'Retry-After': '1'})
+        try:
+            self.server.delay()
+            session = self._session()
+            if session is None:
+                return self._error('Sesja wygasła', 401)
+            if path == ZMIANA_PLACOWKI:
+                return self._change_school(session, body)
+            try:
+                data = json.loads(body or b'{}').get('data') or {}
+            except (ValueError, AttributeError):
+                return self._error('Nieprawidłowy JSON')
+            if path == LISTA:
+                return self._json(200, {'d': {'success': True, 'data': state.month_list(session)}})
+            if path.startswith(DOKUMENT):
+                handler = {'GridGetData': self._grid_get_data, 'SubmitForm': self._submit_form,
+                           'GridDeleteRow': self._grid_delete_row}.get(endpoint)
+                if handler is not None:
+                    return handler(session, data)
+            self._error(f'Nieznana metoda: {endpoint}', 404)
+        finally:
+            self.server.capacity.release()
+
+    def _change_school(self, session: str, body: bytes):
+        state = self.server.state
+        fields = parse_qs(body.decode('utf-8'))
+        try:
+            szkid = int((fields.get('szk_id') or [''])[0])
+        except ValueError:
+            return self._send(400, 'Brak szk_id', 'text/plain')
+        if not any(doc['szkid'] == szkid for doc in state.documents.values()):
+            return self._send(400, 'Nieznana placówka', 'text/plain')
+        with state.lock:
+            state.sessions[session] = szkid
+        self._send(200, 'OK', 'text/plain')
+
+    def _grid_get_data(self, session: str, data: Dict):
+        state = self.server.state
+        doc = state.document(session, data.get('IdDokumentu'))
+        if doc is None:
+            return self._error('Dokument nie istnieje')
+        with state.lock:
+            rows = [{k: _asp_date(v) for k, v in row.items()} for row in state.rows[doc['IdDokumentu']].values()]
+        self._json(200, {'d': {'success': True, 'total': len(rows), 'data': rows}})
+
+    def _submit_form(self, session: str, data: Dict):
+        state = self.server.state
+        doc = state.document(session, data.get('ID_Dokumentu'))
+        if doc is None:
+            return self._error('Dokument nie istnieje')
+        if data.get('NumerPola') in (None, ''):
+            return self._error('Brak NumerPola')
+        row_id = state.add_row(doc, data)
+        self._json(200, {'d': {'success': True, 'Id': row_id}})
+
+    def _grid_delete_row(self, session: str, data: Dict):
+        state = self.server.state
+        doc = state.document(session, data.get('IdDokumentu'))
+        if doc is None:
+            return self._error('Dokument nie istnieje')
+        if not state.delete_rows(doc, data.get('jsonData') or []):
+            return self._error('Nie można usunąć wierszy')
+        self._json(200, {'d': {'success': True}})
+
+
+class StubServer(ThreadingHTTPServer):
+    """Serwer zastępczy ODPN (TLS) - także jako context manager w osobnym wątku dla benchmarków
+
+    opoznienie/rozrzut - czas obsługi żądania API w sekundach (rozrzut: +/- równomiernie),
+    pojemnosc - maksymalna liczba żądań API obsługiwanych naraz; nadmiarowe dostają 503.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, port: int = 0, opoznienie: float = 0.0, rozrzut: float = 0.0, pojemnosc: int = 16,
+                 szkoly: Tuple[int, ...] = (1001,), rok: int = 2025, rozdzialy: Tuple[str, ...] = ('80120',),
+                 pola: int = 9, login: str = 'test', haslo: str = 'test', wiadomosc: bool = False,
+                 cert: Optional[Path] = None, key: Optional[Path] = None, verbose: bool = False):
+        super().__init__(('127.0.0.1', port), StubHandler)
+        if cert is None or key is None:
+            cert, key = generate_cert()
+        self.cert = Path(cert)
+        self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        self.ssl_context.load_cert_chain(str(cert), str(key))
+        self.state = StubState(list(szkoly), rok, list(rozdzialy), pola, login, haslo)
+        self.opoznienie = opoznienie
+        self.rozrzut = rozrzut
+        self.capacity = threading.BoundedSemaphore(pojemnosc)
+        self.message = wiadomosc
+        self.verbose = verbose
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        """Wartość host dla SiteWrap (adres z portem)"""
+        return f"127.0.0.1:{self.server_address[1]}"
+
+    def delay(self):
+        opoznienie = self.opoznienie
+        if self.rozrzut:
+            opoznienie += random.uniform(-self.rozrzut, self.rozrzut)
+        if opoznienie > 0:
+            time.sleep(opoznienie)
+
+    def finish_request(self, request, client_address):
+        # Uzgadnianie TLS w wątku obsługi żądania, nie w pętli accept
+        try:
+            tls = self.ssl_context.wrap_socket(request, server_side=True)
+        except (ssl.SSLError, OSError):
+            return
+        try:
+            self.RequestHandlerClass(tls, client_address, self)
+        finally:
+            tls.close()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--opoznienie', type=float, default=0.0, help="czas obsługi żądania API [s]")
+    parser.add_argument('--rozrzut', type=float, default=0.0, help="losowy rozrzut opóźnienia [s]")
+    parser.add_argument('--pojemnosc', type=int, default=16, help="żądania API obsługiwane naraz (reszta: 503)")
+    parser.add_argument('--szkoly', default='1001', help="ID placówek, po przecinku")
+    parser.add_argument('--rok', type=int, default=2025)
+    parser.add_argument('--rozdzialy', default='80120', help="rozdziały, po przecinku (np. 80120,Egzaminy)")
+    parser.add_argument('--pola', type=int, default=9, help="liczba wymaganych pól formularza")
+    parser.add_argument('--login', default='test')
+    parser.add_argument('--haslo', default='test')
+    parser.add_argument('--wiadomosc', action='store_true', help="okno 'Masz nowe wiadomości' po zalogowaniu")
+    parser.add_argument('--cert', type=Path)
+    parser.add_argument('--key', type=Path)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    server = StubServer(
+        port=args.port, opoznienie=args.opoznienie, rozrzut=args.rozrzut, pojemnosc=args.pojemnosc,
+        szkoly=tuple(int(s) for s in args.szkoly.split(',')), rok=args.rok,
+        rozdzialy=tuple(r.strip() for r in args.rozdzialy.split(',')), pola=args.pola,
+        login=args.login, haslo=args.haslo, wiadomosc=args.wiadomosc,
+        cert=args.cert, key=args.key, verbose=args.verbose
+    )
+    print(f"ODPN stub: https://{server.host} (login {args.login}/{args.haslo})")
+    print(f"Certyfikat: {server.cert} - SiteWrap(..., verify='{server.cert}', options=('ignore-certificate-errors',))")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
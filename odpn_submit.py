@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import contextlib
+import time
+from typing import Callable, ContextManager, Dict, Iterable, List, Optional, Tuple
+
+# (numer wiersza, czy wysłano, opis błędu)
+Wynik = Tuple[int, bool, Optional[str]]
+
+# Serwer nie przyjął danych (w odróżnieniu od wyjątku przy przetwarzaniu wiersza)
+BLAD_WYSYLANIA = "Błąd wysyłania żądania"
+
+
+class SubmitEngine:
+    """Wysyłka wierszy CSV - sekwencyjnie lub z ograniczonym oknem żądań w locie"""
+
+    def __init__(self, send: Callable[[Dict], bool], in_flight: int = 1, delay: float = 0.0,
+                 on_sent: Optional[Callable[[int, bool, Optional[str]], None]] = None,
+                 span: Optional[Callable[[int, Dict], ContextManager]] = None):
+        self.send = send
+        self.in_flight = max(1, in_flight)
+        self.delay = delay
+        # Wywoływane w wątku wysyłającym zaraz po odpowiedzi (np. zapis w dzienniku)
+        self.on_sent = on_sent
+        # Kontekst wokół wysyłki jednego wiersza razem z on_sent (np. span śladu)
+        self.span = span
+
+    def _send_one(self, row_num: int, dane_post: Dict) -> Wynik:
+        try:
+            with self.span(row_num, dane_post) if self.span else contextlib.nullcontext():
+                try:
+                    success = self.send(dane_post)
+                    wynik = row_num, success, None if success else BLAD_WYSYLANIA
+                except Exception as e:
+                    wynik = row_num, False, f"Błąd przetwarzania: {e}"
+                if self.on_sent:
+                    self.on_sent(*wynik)
+            return wynik
+        finally:
+            if self.delay:
+                time.sleep(self.delay)  # Stała przerwa - tempo zwykle reguluje limiter w HttpPool
+
+    def run(self, zadania: Iterable[Tuple[int, Dict]],
+            on_result: Optional[Callable[[int, bool, Optional[str]], None]] = None) -> List[Wynik]:
+        """Wysłanie wszystkich zadań, wyniki zwracane w kolejności wierszy z pliku"""
+        if self.in_flight == 1:
+            wyniki = []
+            for row_num, dane_post in zadania:
+                wynik = self._send_one(row_num, dane_post)
+                if on_result:
+                    on_result(*wynik)
+                wyniki.append(wynik)
+            return wyniki
+
+        wyniki = {}
+        kolejnosc = []
+        with ThreadPoolExecutor(max_workers=self.in_flight) as executor:
+            w_locie = set()
+            for row_num, dane_post in zadania:
+                # Okno pełne - czekamy aż zwolni się miejsce
+                if len(w_locie) >= self.in_flight:
+                    gotowe, w_locie = wait(w_locie, return_when=FIRST_COMPLETED)
+                    self._collect(gotowe, wyniki, on_result)
+                kolejnosc.append(row_num)
+                w_locie.add(executor.submit(self._send_one, row_num, dane_post))
+            gotowe, _ = wait(w_locie)
+            self._collect(gotowe, wyniki, on_result)
+
+        return [wyniki[row_num] for row_num in kolejnosc]
+
+    def _collect(self, futures, wyniki: Dict, on_result):
+        for future in futures:
+            wynik = future.result()
+            wyniki[wynik[0]] = wynik
+            if on_result:
+                on_result(*wynik)
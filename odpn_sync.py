@@ -0,0 +1,129 @@
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from odpn_resolver import decode_body
+
+try:
+    from zoneinfo import ZoneInfo
+    # ASP.NET zapisuje datę lokalną (północ w Polsce) jako milisekundy UTC - w UTC wychodzi dzień wcześniej
+    STREFA = ZoneInfo("Europe/Warsaw")
+except Exception:  # brak bazy stref (np. Windows bez pakietu tzdata) - strefa systemu
+    STREFA = None
+
+# Pola z identyfikatorem wiersza dokumentu po stronie serwera (pierwsze znalezione)
+POLA_ID = ('Id', 'ID', 'id')
+
+# Pozycja formularza (kategoria) - pole opcjonalne w v_store_fields, ale ta sama kwota w innej pozycji to inny wiersz
+POLA_POZYCJI = ('NumerPola',)
+
+
+def _norm(value) -> str:
+    """Wartość pola w postaci porównywalnej między CSV a serwerem (kwoty, daty ISO i /Date(ms)/, tekst)"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, (int, float)):
+        return f"{float(value):.2f}"
+    text = str(value).strip()
+    m = re.match(r'/Date\((-?\d+)([+-]\d{2})?(\d{2})?', text)
+    if m:
+        return _asp_date(int(m.group(1)), m.group(2), m.group(3)).strftime('%Y-%m-%d')
+    if re.match(r'\d{4}-\d{2}-\d{2}', text):
+        return text[:10]
+    try:
+        return f"{float(text.replace(',', '.').replace(' ', '')):.2f}"
+    except ValueError:
+        return ' '.join(text.lower().split())
+
+
+def _asp_date(ms: int, godziny: Optional[str] = None, minuty: Optional[str] = None) -> datetime:
+    """/Date(ms)/ i /Date(ms+hhmm)/ - chwila UTC przeliczona na czas lokalny serwera"""
+    if godziny is not None:
+        przesuniecie = timedelta(hours=int(godziny), minutes=int(minuty or 0) * (-1 if godziny[0] == '-' else 1))
+        return datetime.fromtimestamp(ms / 1000, tz=timezone(przesuniecie))
+    if STREFA is None:
+        return datetime.fromtimestamp(ms / 1000)
+    return datetime.fromtimestamp(ms / 1000, tz=STREFA)
+
+
+def content_key(record: Dict, fields: List[str]) -> Tuple[str, ...]:
+    return tuple(_norm(record.get(field)) for field in fields)
+
+
+def server_rows(body, fields: List[str]) -> List[Dict]:
+    """Wiersze dokumentu z odpowiedzi GridGetData - słowniki zawierające pola formularza"""
+    found = []
+    stack = [decode_body(body)]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if any(field in node for field in fields):
+                found.append(node)
+                continue
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return found
+
+
+class SyncIndex:
+    """Indeks treści wierszy na serwerze (multizbiór) - wiersze CSV „zużywają” pasujące wiersze serwera
+
+    Kluczem są pola formularza obecne w danych POST (ustalane przy pierwszym porównaniu),
+    więc pola wymagane, których wysyłka nie wypełnia, nie psują dopasowania.
+    """
+
+    def __init__(self, rows: Iterable[Dict], fields: List[str]):
+        self.fields = list(fields) + [pole for pole in POLA_POZYCJI if pole not in fields]
+        self._pending = list(rows)
+        self._rows = None
+        self.total = len(self._pending)
+        self.matched = 0
+
+    def _build(self, dane_post: Dict):
+        self.fields = [field for field in self.fields if field in dane_post]
+        self._rows = defaultdict(list)
+        for row in self._pending:
+            self._rows[content_key(row, self.fields)].append(row)
+        self._pending = None
+
+    def take(self, dane_post: Dict) -> bool:
+        """True gdy identyczny wiersz jest już na serwerze (i nie został dopasowany wcześniej)"""
+        if self._rows is None:
+            self._build(dane_post)
+        if not self.fields:
+            return False
+        rows = self._rows.get(content_key(dane_post, self.fields))
+        if not rows:
+            return False
+        rows.pop()
+        self.matched += 1
+        return True
+
+    def missing(self, zadania: Iterable[Tuple[int, Dict]]) -> Iterator[Tuple[int, Dict]]:
+        """Tylko wiersze, których nie ma na serwerze"""
+        for row_num, dane_post in zadania:
+            if self.take(dane_post):
+                print(f"Wiersz {row_num}: już na serwerze - pominięty")
+                continue
+            yield row_num, dane_post
+
+    def _extra(self) -> List[Dict]:
+        if self._rows is None:
+            return list(self._pending)
+        return [row for rows in self._rows.values() for row in rows]
+
+    def extra_ids(self) -> List:
+        """ID wierszy serwera, których nie dopasowano do żadnego wiersza CSV"""
+        ids = []
+        for row in self._extra():
+            row_id = next((row[pole] for pole in POLA_ID if row.get(pole) is not None), None)
+            if row_id is not None:
+                ids.append(row_id)
+        return ids
+
+    def extra_count(self) -> int:
+        return len(self._extra())
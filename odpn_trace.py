@@ -0,0 +1,161 @@
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Domyślny katalog plików śladów (OTLP-JSON, jeden plik na przebieg)
+DOMYSLNY_KATALOG_SLADOW = Path.home() / ".odpn" / "slady"
+
+# Rodzaje spanów i statusy wg OTLP
+SPAN_WEWNETRZNY = 1
+SPAN_KLIENT = 3
+STATUS_OK = 1
+STATUS_BLAD = 2
+
+# Spany zakończone przed dopisaniem do pliku - jedna linia pliku na paczkę
+PACZKA = 512
+# Maksymalna długość treści odpowiedzi zapisywanej w atrybucie
+MAKS_TRESC = 4096
+
+
+def _wartosc(value) -> Dict:
+    """Wartość atrybutu w kodowaniu OTLP-JSON (liczby całkowite jako tekst)"""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, default=str)
+    return {'stringValue': value}
+
+
+def _atrybuty(attributes: Dict) -> List[Dict]:
+    return [{'key': k, 'value': _wartosc(v)} for k, v in attributes.items() if v is not None]
+
+
+class Span:
+    """Jeden span śladu - atrybuty i status ustawiane do chwili zakończenia"""
+
+    __slots__ = ('name', 'span_id', 'parent_id', 'kind', 'start', 'end', 'attributes', 'status', 'message')
+
+    def __init__(self, name: str, parent_id: Optional[str], kind: int, attributes: Dict):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes
+        self.status = 0
+        self.message = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def error(self, message: str):
+        self.status = STATUS_BLAD
+        self.message = message
+
+    def ok(self):
+        if self.status != STATUS_BLAD:
+            self.status = STATUS_OK
+
+    def otlp(self, trace_id: str) -> Dict:
+        span = {
+            'traceId': trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end),
+            'attributes': _atrybuty(self.attributes),
+            'status': {'code': self.status, **({'message': self.message} if self.message else {})},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class Tracer:
+    """Ślad jednego przebiegu zapisywany lokalnie w formacie OTLP-JSON (bez kolektora)
+
+    Każda linia pliku to ExportTraceServiceRequest z paczką spanów - plik można wczytać
+    odbiornikiem otlpjsonfile kolektora OpenTelemetry albo przeszukać jq.
+    """
+
+    def __init__(self, path: Path, name: str = 'przebieg', **resource):
+        self.path = Path(path)
+        self.trace_id = os.urandom(16).hex()
+        self.resource = dict(resource, **{'service.name': 'odpn'})
+        self._lock = threading.Lock()
+        self._finished: List[Span] = []
+        # Bieżący span w danym wątku (rodzic kolejnych spanów)
+        self._local = threading.local()
+        self.root = Span(name, None, SPAN_WEWNETRZNY, {})
+        self.spans = 0
+
+    @classmethod
+    def in_directory(cls, directory: Path, name: str, **resource) -> 'Tracer':
+        """Tracer z plikiem {name}-{data}.jsonl w katalogu"""
+        name = re.sub(r'[^\w.-]+', '_', name)
+        return cls(Path(directory) / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.jsonl", **resource)
+
+    def current(self) -> Span:
+        """Span bieżący w wątku - poza spanem wiersza rodzicem jest span przebiegu"""
+        return getattr(self._local, 'span', None) or self.root
+
+    @contextlib.contextmanager
+    def span(self, name: str, kind: int = SPAN_WEWNETRZNY, **attributes):
+        """Span potomny bieżącego spanu; wyjątek w bloku oznacza span jako błędny"""
+        rodzic = self.current()
+        span = Span(name, rodzic.span_id, kind, attributes)
+        self._local.span = span
+        try:
+            yield span
+        except BaseException as e:
+            span.error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            self._local.span = rodzic if rodzic is not self.root else None
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        span.end = time.time_ns()
+        with self._lock:
+            self._finished.append(span)
+            self.spans += 1
+            if len(self._finished) >= PACZKA:
+                self._flush()
+
+    def _flush(self):
+        """Dopisanie paczki zakończonych spanów do pliku (wywoływane pod blokadą)"""
+        if not self._finished:
+            return
+        paczka = {'resourceSpans': [{
+            'resource': {'attributes': _atrybuty(self.resource)},
+            'scopeSpans': [{
+                'scope': {'name': 'odpn'},
+                'spans': [span.otlp(self.trace_id) for span in self._finished],
+            }],
+        }]}
+        self._finished = []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('a', encoding='utf-8') as f:
+            f.write(json.dumps(paczka, ensure_ascii=False) + '\n')
+
+    def close(self, **attributes) -> Path:
+        """Zakończenie spanu przebiegu i zapis pozostałych spanów"""
+        if self.root.end is not None:
+            return self.path
+        self.root.set(**attributes)
+        self.root.ok()
+        self._finish(self.root)
+        with self._lock:
+            self._flush()
+        return self.path
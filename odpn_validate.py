@@ -0,0 +1,115 @@
+import csv
+import math
+import re
+from datetime import date
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from odpn_schema import SCHEMATY, category_index, columns_needed, data, kwota, kwota_lub_zero
+
+# Miesiące ODPN (kody dwucyfrowe)
+MIESIACE = {f"{n:02d}" for n in range(1, 13)}
+
+
+# Typowa kwota ("1 234,50", "-12.5") - pełne parsowanie tylko dla wartości spoza wzorca
+_KWOTA = re.compile(r'\s*-?\d[\d ]*(?:[.,]\d+)?\s*').fullmatch
+
+
+def _kwota(value: str):
+    if _KWOTA(value) is None and not math.isfinite(kwota(value)):
+        raise ValueError(value)
+
+
+def _kwota_lub_zero(value: str):
+    if value != "":
+        _kwota(value)
+
+
+def _data_iso(value: str):
+    date.fromisoformat(value.strip())
+
+
+# Parsery pól schematu, które mogą odrzucić wartość - pozostałe (tekst, stałe, słowniki) przyjmują wszystko
+WALIDATORY = {
+    kwota: ('kwota', _kwota),
+    kwota_lub_zero: ('kwota', _kwota_lub_zero),
+    data: ('data', _data_iso),
+}
+
+
+def _checks(schemat: str) -> List[Tuple[int, str, Callable[[str], object]]]:
+    """(kolumna, rodzaj, walidator) - każda kolumna sprawdzana raz, nawet gdy zasila kilka pól"""
+    checks = {}
+    for kolumna, parser in SCHEMATY[schemat]['pola']:
+        if kolumna is not None and parser in WALIDATORY and kolumna not in checks:
+            rodzaj, walidator = WALIDATORY[parser]
+            checks[kolumna] = (kolumna, rodzaj, walidator)
+    return list(checks.values())
+
+
+def _category_check(schemat: str, tabela: str) -> Callable[[str], str]:
+    """Funkcja kategoria -> opis błędu ('' gdy poprawna)"""
+    _, dopasowanie = SCHEMATY[schemat]['kategoria']
+    if dopasowanie == 'indeks':
+        indeks = category_index(schemat, tabela)
+
+        def sprawdz(value: str) -> str:
+            pasujace = indeks.match(value)
+            if not pasujace:
+                return f"Nieznana kategoria: '{value}'"
+            if len(pasujace) > 1:
+                return f"Niejednoznaczna kategoria: '{value}' ({len(pasujace)} pozycji)"
+            return ''
+        return sprawdz
+
+    klucze = set(SCHEMATY[schemat]['numery_pol'][tabela])
+    return lambda value: '' if value.strip() in klucze else f"Nieznana kategoria: '{value.strip()}'"
+
+
+def validate_file(file_path: Path, schemat: str, tabela: str = 'domyslne',
+                  encoding: str = "utf-8") -> List[Tuple[int, str]]:
+    """Sprawdzenie całego pliku CSV przed wysyłką - lista (nr wiersza, opis) wszystkich problemów
+
+    Sprawdzane są: liczba kolumn, kwoty, daty ISO, kody miesięcy i kategorie, tymi samymi
+    parserami co przy budowaniu danych POST. Minimum kolumn obejmuje każdą kolumnę czytaną przez schemat.
+    """
+    schema = SCHEMATY[schemat]
+    kolumny = max(schema['kolumny'], columns_needed(schema))
+    checks = _checks(schemat)
+    kol_kategorii = schema['kategoria'][0]
+    sprawdz_kategorie = _category_check(schemat, tabela)
+    kol_miesiaca, miesiac = schema.get('miesiac') or (None, None)
+
+    # Kody miesięcy powtarzają się w całym pliku - wynik sprawdzenia zapamiętany per wartość
+    bledy_miesiaca = {}
+    problemy = []
+    dodaj = problemy.append
+    with Path(file_path).open('r', encoding=encoding) as plik:
+        for row_num, dane in enumerate(csv.reader(plik, delimiter=';'), 1):
+            n = len(dane)
+            if n < kolumny:
+                dodaj((row_num, f"Za mało kolumn: {n} (wymagane {kolumny})"))
+                continue
+            for kolumna, rodzaj, walidator in checks:
+                if kolumna >= n:
+                    continue
+                try:
+                    walidator(dane[kolumna])
+                except ValueError:
+                    dodaj((row_num, f"Kolumna {kolumna + 1}: nieprawidłowa {rodzaj} '{dane[kolumna]}'"))
+            if miesiac is not None:
+                wartosc = dane[kol_miesiaca]
+                blad = bledy_miesiaca.get(wartosc)
+                if blad is None:
+                    try:
+                        kod = miesiac(wartosc)
+                        blad = '' if kod in MIESIACE else f"Nieprawidłowy miesiąc: '{wartosc.strip()}'"
+                    except ValueError as e:
+                        blad = str(e)
+                    bledy_miesiaca[wartosc] = blad
+                if blad:
+                    dodaj((row_num, blad))
+            blad = sprawdz_kategorie(dane[kol_kategorii])
+            if blad:
+                dodaj((row_num, blad))
+    return problemy
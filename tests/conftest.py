@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Moduły odpn_* leżą w katalogu głównym repozytorium (bez pakietu)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,48 @@
+import odpn_bench
+from odpn_bench import PhaseTimer, percentyle, run_flow
+from odpn_stub import StubServer
+
+
+def test_nearest_rank_percentiles_in_milliseconds():
+    assert percentyle([]) == {}
+    assert percentyle([0.005]) == {'p50_ms': 5.0, 'p95_ms': 5.0, 'p99_ms': 5.0, 'max_ms': 5.0}
+    czasy = [n / 1000 for n in range(100, 0, -1)]
+    assert percentyle(czasy) == {'p50_ms': 50.0, 'p95_ms': 95.0, 'p99_ms': 99.0, 'max_ms': 100.0}
+
+
+def test_nested_phases_are_not_counted_twice_in_self_time(monkeypatch):
+    zegar = iter([0.0, 1.0, 3.0, 4.0, 6.0, 10.0])
+    monkeypatch.setattr(odpn_bench.time, 'perf_counter', lambda: next(zegar))
+    timer = PhaseTimer()
+
+    class Strona:
+        def parse_file(self):
+            self.wyslij()
+            self.wyslij()
+
+        def wyslij(self):
+            pass
+
+    strona = Strona()
+    timer.wrap(strona, 'wyslij')
+    timer.wrap(strona, 'parse_file')
+    timer.wrap(strona, 'brak_metody')
+    strona.parse_file()
+
+    assert timer.wynik() == {
+        'wyslij': {'wywolania': 2, 'czas_s': 4.0, 'wlasny_s': 4.0},
+        'parse_file': {'wywolania': 1, 'czas_s': 10.0, 'wlasny_s': 6.0},
+    }
+    assert not hasattr(strona, 'brak_metody')
+
+
+def test_flow_against_stub_sends_every_row(tmp_path):
+    with StubServer() as server:
+        wynik = run_flow(server, 36, tmp_path, rate_limit={'rate': 1000, 'max_rate': 100000, 'burst': 100})
+
+    assert wynik['wyslane'] == wynik['na_serwerze'] == 36
+    assert wynik['zadania']['SubmitForm']['n'] == 36
+    assert wynik['fazy']['parse_file']['wywolania'] == 1
+    assert 'select_bills' in wynik['pominiete']
+    fazy = {s['etykiety']['faza'] for s in wynik['metryki']['liczniki']['odpn_faza_sekundy_total']}
+    assert fazy == {'login', 'parse_file'}
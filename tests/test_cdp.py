@@ -0,0 +1,108 @@
+import json
+
+from odpn_cdp import NETWORK_BUFFERS, NetworkListener, post_json
+
+GRID = 'https://odpn.test/ODPN/Szkoly/RozliczenieDotacji/Kontrolki/Taby/Dokument/Dokument.asmx/GridGetData'
+
+
+def wpis(method, webview='A', **params):
+    return {'message': json.dumps({'webview': webview, 'message': {'method': method, 'params': params}}),
+            'timestamp': 1}
+
+
+def zadanie(request_id, url, post=None, cookie=None):
+    headers = {'Cookie': cookie} if cookie else {}
+    return wpis('Network.requestWillBeSent', requestId=request_id,
+                request={'url': url, 'method': 'POST', 'postData': post, 'headers': headers})
+
+
+class Driver:
+    def __init__(self):
+        self.log = []
+        self.cdp = []
+
+    def get_log(self, name):
+        assert name == 'performance'
+        wpisy, self.log = self.log, []
+        return wpisy
+
+    def execute_cdp_cmd(self, cmd, params):
+        self.cdp.append((cmd, params))
+
+
+def test_only_matching_requests_are_decoded_and_indexed():
+    driver = Driver()
+    listener = NetworkListener(driver)
+    driver.log = [
+        wpis('Page.frameNavigated', frame={}),
+        zadanie('1', 'https://odpn.test/skrypt.js'),
+        wpis('Network.loadingFinished', requestId='1'),
+        zadanie('2', GRID, '{"data": {"miesiac": 1}}', cookie='ASP.NET_SessionId=abc'),
+        wpis('Network.responseReceived', requestId='2'),
+    ]
+    assert listener.poll() == 1
+    assert listener.entries == 5
+    assert listener.decoded == 1
+    assert list(listener.requests) == ['2']
+    assert listener.cookie_header == 'ASP.NET_SessionId=abc'
+    assert listener.requests['2']['webview'] == 'A'
+    assert post_json(listener.requests['2']) == {'data': {'miesiac': 1}}
+
+    # Zakończenie żądania dopiero w kolejnym odczycie - stare wpisy nie są czytane ponownie
+    driver.log = [wpis('Network.loadingFinished', requestId='2')]
+    assert listener.poll() == 0
+    assert listener.entries == 6
+    assert listener.requests['2']['finished']
+
+
+def test_wait_for_returns_next_request_after_mark():
+    driver = Driver()
+    listener = NetworkListener(driver)
+    driver.log = [zadanie('1', GRID, '{"data": {"miesiac": 1}}'), wpis('Network.loadingFinished', requestId='1')]
+    listener.poll()
+    mark = listener.mark
+
+    assert listener.wait_for('GridGetData', after=mark, timeout=0) is None
+    driver.log = [zadanie('2', GRID, '{"data": {"miesiac": 2}}')]
+    assert listener.wait_for('GridGetData', after=mark, finished=True, timeout=0) is None
+    driver.log = [wpis('Network.loadingFinished', requestId='2')]
+    event = listener.wait_for('GridGetData', after=mark, finished=True, timeout=0,
+                              predicate=lambda e: post_json(e)['data']['miesiac'] == 2)
+    assert event['requestId'] == '2'
+    assert driver.cdp == [('Network.enable', NETWORK_BUFFERS)]
+
+
+def test_index_is_bounded_and_cleared_on_stop():
+    driver = Driver()
+    listener = NetworkListener(driver, max_requests=3)
+    listener.start()
+    driver.log = [zadanie(str(i), GRID) for i in range(5)]
+    listener.poll()
+    assert list(listener.requests) == ['2', '3', '4']
+    assert listener.mark == 5
+
+    listener.stop()
+    listener.stop()
+    assert not listener.active
+    assert not listener.requests
+    assert driver.cdp == [('Network.enable', NETWORK_BUFFERS), ('Network.disable', {})]
+
+
+def test_asmx_scope_keeps_only_service_calls():
+    driver = Driver()
+    listener = NetworkListener(driver, url_filters=('.asmx',))
+    driver.log = [
+        zadanie('1', 'https://odpn.test/ODPN/Szkoly/RozliczenieDotacji/Default.aspx'),
+        zadanie('2', 'https://odpn.test/ext/ext-all.js'),
+        zadanie('3', GRID, '{"data": {"szkid": 1}}', cookie='a=1; b=x=y'),
+        zadanie('4', GRID, 'nie-json'),
+    ]
+    listener.poll()
+    assert list(listener.requests) == ['3', '4']
+    assert listener.cookie_header == 'a=1; b=x=y'
+
+    # Kontekst formularza tylko z żądania, którego postData to JSON z obiektem data (jak w capture_response)
+    event = listener.wait_for('Dokument.asmx/GridGetData', timeout=0,
+                              predicate=lambda e: isinstance((post_json(e) or {}).get('data'), dict))
+    assert event['requestId'] == '3'
+    assert post_json(listener.requests['4']) is None
@@ -0,0 +1,19 @@
+import json
+
+import odpn_cli
+
+WIERSZ = "opis;1.;FV/1/2025;100,00;2025-01-10;FV/1/2025;2025-01-20;100,00;50,00;0,00"
+
+
+def test_dry_run_reports_rows_that_fail_to_transform(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "wydatki.csv"
+    path.write_text(WIERSZ + "\n" + WIERSZ.rsplit(';', 3)[0] + "\n" + WIERSZ + "\n", encoding='utf-8')
+    # Wiersz, którego nie wychwyciła walidacja, nie przerywa całego polecenia
+    monkeypatch.setattr(odpn_cli, 'validate_file', lambda *args: [])
+
+    kod = odpn_cli.main(['dry-run', str(path), '--schemat', 'odpn2', '--konteksty', str(tmp_path / "brak.json")])
+
+    wyjscie = capsys.readouterr()
+    assert kod == 1
+    assert [json.loads(linia)['wiersz'] for linia in wyjscie.out.splitlines()] == [1, 3]
+    assert "Wiersz 2: Błąd przetwarzania: IndexError" in wyjscie.err
@@ -0,0 +1,69 @@
+import time
+
+import belchatow
+from odpn_context import ContextCache
+
+
+def site(tmp_path, **kwargs):
+    return belchatow.SiteWrap('odpn.test', session_dir=None, context_file=tmp_path / "konteksty.json",
+                              metrics_dir=None, journal=False, **kwargs)
+
+
+def learn(tmp_path, account, szkid, rok):
+    pierwszy = site(tmp_path)
+    pierwszy._account = account
+    pierwszy.context_data = {'szkid': szkid, 'rok': rok, 'rozdzial': '80120', 'miesiac': 1}
+    pierwszy._store_context('80120', '01')
+
+
+def test_school_and_year_learned_by_previous_run_give_cache_key(tmp_path):
+    rok = time.localtime().tm_year
+    learn(tmp_path, 'konto', 1001, rok)
+
+    nastepny = site(tmp_path)
+    nastepny._account = 'konto'
+    assert nastepny._context_key('80120', '01') == ContextCache.key('odpn.test', 1001, rok, '80120', '01')
+    assert nastepny.context_cache.get(nastepny._context_key('80120', '01'))['szkid'] == 1001
+
+    # Inne konto nie przejmuje szkoły, konfiguracja ma pierwszeństwo
+    inne = site(tmp_path)
+    inne._account = 'inne'
+    assert inne._context_key('80120', '01') is None
+    skonfigurowany = site(tmp_path, szkid=7)
+    skonfigurowany._account = 'konto'
+    assert skonfigurowany._context_key('80120', '01') == ContextCache.key('odpn.test', 7, rok, '80120', '01')
+
+
+def test_learned_year_from_another_calendar_year_is_not_reused(tmp_path):
+    learn(tmp_path, 'konto', 1001, time.localtime().tm_year - 1)
+
+    nastepny = site(tmp_path)
+    nastepny._account = 'konto'
+    assert nastepny._context_key('80120', '01') is None
+    nastepny.rok = time.localtime().tm_year - 1
+    assert nastepny._context_key('80120', '01') is not None
+
+
+def test_cached_months_are_yielded_before_navigation(tmp_path):
+    wrap = site(tmp_path, szkid=1001, rok=2025)
+    for miesiac in ('01', '03'):
+        wrap.context_cache.put(ContextCache.key('odpn.test', 1001, 2025, '80120', miesiac), {
+            'szkid': 1001, 'rok': 2025, 'rozdzial': '80120', 'miesiac': int(miesiac),
+            'IdDokumentu': int(miesiac), 'wydrukId': 1,
+        })
+    nawigacja = []
+
+    def ensure(rozdzial, miesiac, navigate):
+        navigate()
+        if miesiac == '04':
+            raise RuntimeError('brak gridu')
+
+    wrap._ensure_context = ensure
+    wyniki = []
+    for miesiac, blad in wrap._month_contexts('80120', ['02', '01', '04', '03'], nawigacja.append):
+        # Kontekst ustawiony w chwili zwrócenia miesiąca
+        wyniki.append((miesiac, wrap.ID_Dokumentu if blad is None else str(blad)))
+
+    assert nawigacja == ['02', '04']
+    assert wyniki[:2] == [('01', 1), ('03', 3)]
+    assert wyniki[3] == ('04', 'brak gridu')
@@ -0,0 +1,61 @@
+import pytest
+
+import belchatow
+from odpn_stub import StubServer
+from odpn_sync import SyncIndex
+
+SZYBKI_LIMITER = {'rate': 1000, 'max_rate': 100000, 'burst': 100}
+USUWANIE = '/ODPN/Szkoly/RozliczenieDotacji/Kontrolki/Taby/Dokument/Dokument.asmx/GridDeleteRow'
+
+
+@pytest.fixture(scope='module')
+def server():
+    with StubServer() as server:
+        yield server
+
+
+@pytest.fixture
+def site(server, tmp_path):
+    server.state.reset()
+    with belchatow.SiteWrap(server.host, session_dir=None, context_file=None, verify=str(server.cert),
+                            metrics_dir=None, journal=False, rate_limit=SZYBKI_LIMITER) as site:
+        site.login(server.state.login, server.state.haslo)
+        doc = server.state.find_document(1001, '80120', 1)
+        site._apply_context(server.state.grid_request(doc))
+        yield site, doc
+
+
+def test_batch_delete_is_all_or_nothing(server, site):
+    site, doc = site
+    url = f"https://{server.host}{USUWANIE}"
+    ids = [server.state.add_row(doc, {'NumerPola': '1', '_3': str(i)}) for i in range(3)]
+
+    assert not site._delete_rows(url, site.context_data, [ids[0], 999999])
+    assert sorted(server.state.rows[doc['IdDokumentu']]) == ids
+    assert site._delete_rows(url, site.context_data, ids[:2])
+    assert list(server.state.rows[doc['IdDokumentu']]) == [ids[2]]
+
+
+def test_extra_rows_are_deleted_in_batches(server, site):
+    site, doc = site
+    ids = [server.state.add_row(doc, {'NumerPola': '1', '_3': str(i)}) for i in range(5)]
+    indeks = SyncIndex([dict(row) for row in server.state.rows[doc['IdDokumentu']].values()], ['NumerPola', '_3'])
+    assert indeks.take({'NumerPola': '1', '_3': '2'})
+    paczki = []
+    usun = site._delete_rows
+    site._delete_rows = lambda url, posts, row_ids: paczki.append(list(row_ids)) or usun(url, posts, row_ids)
+
+    site._delete_extra(indeks, batch_size=2)
+
+    assert paczki == [[ids[0], ids[1]], [ids[3], ids[4]]]
+    assert list(server.state.rows[doc['IdDokumentu']]) == [ids[2]]
+
+
+def test_grid_document_ids_from_single_script_result(tmp_path):
+    wrap = belchatow.SiteWrap('odpn.test', session_dir=None, context_file=None, metrics_dir=None, journal=False)
+    wrap._grid_rows = lambda: [
+        {'1': 'FV/1', '2': '28677'}, {'1': 'Suma', '2': ''}, {'2': '28678'},
+        {'2': '28677'}, {'2': 'x12'}, {'3': '5'}, {'2': '28690'},
+    ]
+    assert wrap._grid_document_ids('2') == [28677, 28678, 28690]
+    assert wrap._grid_document_ids('3') == [5]
@@ -0,0 +1,32 @@
+from odpn_journal import SubmitJournal, read_entries
+
+
+def test_torn_tail_line_is_truncated_before_next_entry(tmp_path):
+    path = tmp_path / "plik.csv.dziennik.jsonl"
+    journal = SubmitJournal(path)
+    journal.record(1, 'a', True)
+    journal.record(2, 'b', True)
+    journal.close()
+    # Przerwany zapis - niedokończony ostatni wpis bez znaku nowej linii
+    with path.open('a', encoding='utf-8') as f:
+        f.write('{"ts": 1, "row": 3, "fp": "x", "o')
+
+    journal = SubmitJournal(path)
+    journal.record(3, 'c', True)
+    journal.close()
+
+    assert [e['fp'] for e in read_entries(path)] == ['a', 'b', 'c']
+    assert SubmitJournal(path).confirmed == {'a', 'b', 'c'}
+
+
+def test_torn_only_line_is_removed(tmp_path):
+    path = tmp_path / "dziennik.jsonl"
+    path.write_text('{"ts": 1, "row"', encoding='utf-8')
+
+    journal = SubmitJournal(path)
+    journal.record(1, 'a', False, "Błąd wysyłania żądania")
+    journal.close()
+
+    wpisy = list(read_entries(path))
+    assert len(wpisy) == 1 and wpisy[0]['fp'] == 'a' and not wpisy[0]['ok']
+    assert SubmitJournal(path).confirmed == set()
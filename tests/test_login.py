@@ -0,0 +1,53 @@
+import pytest
+
+from odpn_http import HttpPool
+from odpn_login import http_login, parse_login_form, session_valid
+from odpn_stub import StubServer
+
+FORMULARZ = """
+<form action="szukaj.aspx"><input name="q"><input type="submit" name="Szukaj"></form>
+<form method="post" action="./Logowanie.aspx?ReturnUrl=%2f">
+  <input type="hidden" name="__VIEWSTATE" value="vs">
+  <input type="hidden" name="__EVENTVALIDATION">
+  <input type="text" name="ctl00$Main$Login" id="Login">
+  <input type="password" name="ctl00$Main$Haslo">
+  <input type="checkbox" name="Zapamietaj">
+  <input type="checkbox" name="Regulamin" value="tak" checked>
+  <input type="submit" name="ctl00$Main$Anuluj" value="Anuluj">
+  <input type="submit" name="ctl00$Main$ButtonLogowanie" value="Zaloguj">
+</form>
+"""
+
+
+def test_login_form_fields_with_container_prefixes():
+    action, fields = parse_login_form(FORMULARZ)
+    assert action == "./Logowanie.aspx?ReturnUrl=%2f"
+    assert fields == {
+        '__VIEWSTATE': 'vs', '__EVENTVALIDATION': '', 'ctl00$Main$Login': '', 'ctl00$Main$Haslo': '',
+        'Regulamin': 'tak', 'ctl00$Main$ButtonLogowanie': 'Zaloguj',
+    }
+
+
+def test_login_link_button_posts_back_through_event_target():
+    html = '<form action=""><input name="Login"><input name="Haslo" type="password">' \
+           '<a href="javascript:__doPostBack(\'ButtonLogowanie\',\'\')">Zaloguj</a></form>'
+    _, fields = parse_login_form(html)
+    assert fields['__EVENTTARGET'] == 'ButtonLogowanie'
+
+
+def test_page_without_login_form():
+    assert parse_login_form('<form action="x"><input name="q"></form><p>Witaj</p>') is None
+
+
+@pytest.fixture(scope='module')
+def server():
+    with StubServer() as server:
+        yield server
+
+
+@pytest.mark.parametrize('haslo, zalogowany', [('test', True), ('zle', False)])
+def test_http_login_against_stub(server, haslo, zalogowany):
+    http = HttpPool(verify=str(server.cert))
+    url = f"https://{server.host}/"
+    assert http_login(http, url, 'test', haslo) is zalogowany
+    assert session_valid(http, url) is zalogowany
@@ -0,0 +1,55 @@
+import json
+
+import belchatow
+from odpn_metrics import RunMetrics
+
+
+def test_prometheus_text_format():
+    metrics = RunMetrics()
+    metrics.inc('odpn_wiersze_total', wynik='wyslany')
+    metrics.inc('odpn_wiersze_total', 2, wynik='wyslany')
+    metrics.set('odpn_limiter_tempo', 2.5)
+    metrics.observe('odpn_http_czas_sekundy', 0.02, endpoint='SubmitForm')
+    metrics.observe('odpn_http_czas_sekundy', 40, endpoint='SubmitForm')
+
+    linie = metrics.prometheus(host='a"b').splitlines()
+
+    assert '# TYPE odpn_wiersze_total counter' in linie
+    assert 'odpn_wiersze_total{host="a\\"b",wynik="wyslany"} 3' in linie
+    assert 'odpn_limiter_tempo{host="a\\"b"} 2.5' in linie
+    assert 'odpn_http_czas_sekundy_bucket{host="a\\"b",endpoint="SubmitForm",le="0.01"} 0' in linie
+    assert 'odpn_http_czas_sekundy_bucket{host="a\\"b",endpoint="SubmitForm",le="0.025"} 1' in linie
+    assert 'odpn_http_czas_sekundy_bucket{host="a\\"b",endpoint="SubmitForm",le="30"} 1' in linie
+    assert 'odpn_http_czas_sekundy_bucket{host="a\\"b",endpoint="SubmitForm",le="+Inf"} 2' in linie
+    assert 'odpn_http_czas_sekundy_sum{host="a\\"b",endpoint="SubmitForm"} 40.02' in linie
+    assert 'odpn_http_czas_sekundy_count{host="a\\"b",endpoint="SubmitForm"} 2' in linie
+
+
+def test_report_files_are_written_together(tmp_path):
+    metrics = RunMetrics()
+    metrics.inc('odpn_ponowienia_total', rodzaj='kontekst')
+    json_path, prom_path = metrics.write(tmp_path, 'odpn.test:8443', host='odpn.test')
+
+    assert json_path.name == 'odpn.test_8443.json'
+    raport = json.loads(json_path.read_text(encoding='utf-8'))
+    assert raport['etykiety'] == {'host': 'odpn.test'}
+    assert raport['liczniki']['odpn_ponowienia_total'] == [{'etykiety': {'rodzaj': 'kontekst'}, 'wartosc': 1}]
+    assert 'odpn_ponowienia_total{host="odpn.test",rodzaj="kontekst"} 1' in prom_path.read_text(encoding='utf-8')
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['odpn.test_8443.json', 'odpn.test_8443.prom']
+
+
+def test_site_phases_are_timed():
+    wrap = belchatow.SiteWrap('odpn.test', session_dir=None, context_file=None, metrics_dir=None, journal=False)
+    wrap.metrics.inc('odpn_faza_wywolania_total', 0, faza='select_bills')
+    wrap._connected = True
+    wrap._restore_session = lambda account: True
+
+    wrap.login('konto', 'haslo')
+    wrap.login('konto', 'haslo')
+
+    snapshot = wrap.metrics.snapshot()['liczniki']
+    assert {s['etykiety']['faza']: s['wartosc'] for s in snapshot['odpn_faza_wywolania_total']} == {
+        'select_bills': 0, 'login': 2}
+    assert [s['etykiety'] for s in snapshot['odpn_faza_sekundy_total']] == [{'faza': 'login'}]
+    assert 'odpn_faza_sekundy_total{faza="login"}' in wrap.metrics.prometheus()
+    assert wrap.login.__name__ == 'login'
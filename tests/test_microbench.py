@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+import odpn_microbench
+
+
+def uruchom(tmp_path, *argumenty):
+    return odpn_microbench.main(['--tylko', 'capture,kategorie_belchatow', '--powtorzenia', '1',
+                                 '--bazowe', str(tmp_path / "bazowe.json"), *argumenty])
+
+
+def test_baseline_with_another_element_count_is_not_compared(tmp_path, capsys):
+    assert uruchom(tmp_path, '--wiersze', '200', '--wpisy', '500', '--zapisz') == 0
+    assert json.loads((tmp_path / "bazowe.json").read_text(encoding='utf-8'))['wyniki']['capture']['n'] == 500
+    assert uruchom(tmp_path, '--wiersze', '200', '--wpisy', '500', '--prog', '1000') == 0
+
+    with pytest.raises(SystemExit) as blad:
+        uruchom(tmp_path, '--wiersze', '400', '--wpisy', '500')
+    assert blad.value.code == 2
+    assert 'kategorie_belchatow (bazowe n=200, teraz n=400)' in capsys.readouterr().err
+
+
+def test_relative_change_is_reported_against_baseline(capsys):
+    wyniki = {'a': {'n': 10, 'ns_na_element': 2.0, 'wzgledny': 1.5}, 'b': {'n': 10, 'ns_na_element': 1.0, 'wzgledny': 1.0}}
+    bazowe = {'a': {'n': 10, 'ns_na_element': 1.0, 'wzgledny': 1.0}, 'b': {'n': 10, 'ns_na_element': 1.0, 'wzgledny': 1.0}}
+    assert odpn_microbench.compare(wyniki, bazowe, 20.0) == ['a']
+    assert '+50.0%' in capsys.readouterr().out
+    assert odpn_microbench.mismatched(wyniki, bazowe) == []
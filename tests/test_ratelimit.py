@@ -0,0 +1,123 @@
+import time
+
+import pytest
+import requests
+
+from odpn_http import HttpPool
+from odpn_ratelimit import AdaptiveRateLimiter
+
+SUBMIT = 'https://odpn.test/ODPN/Dokument.asmx/SubmitForm'
+
+
+def test_fast_responses_raise_rate_additively_up_to_max():
+    limiter = AdaptiveRateLimiter(rate=1.0, max_rate=2.0, increase=0.5, target_latency=1.0)
+    limiter.record(0.1, 200)
+    assert limiter.rate == 1.5
+    limiter.record(0.1, 200)
+    limiter.record(0.1, 200)
+    assert limiter.rate == 2.0
+
+
+@pytest.mark.parametrize('status, error', [(500, False), (503, False), (429, False), (None, True)])
+def test_server_errors_and_timeouts_halve_rate(status, error):
+    limiter = AdaptiveRateLimiter(rate=4.0, min_rate=0.2, decrease=0.5)
+    limiter.record(0.1, status, error=error)
+    assert limiter.rate == 2.0
+    assert limiter.backoffs == 1
+
+
+def test_backoff_stops_at_min_rate_and_empties_bucket():
+    limiter = AdaptiveRateLimiter(rate=0.3, min_rate=0.2, burst=5)
+    limiter.record(0.1, 503)
+    assert limiter.rate == 0.2
+    assert limiter._tokens <= 0
+
+
+def test_slow_responses_slow_down_gently():
+    limiter = AdaptiveRateLimiter(rate=2.0, target_latency=0.5)
+    limiter.record(0.8, 200)
+    assert limiter.rate == pytest.approx(1.8)
+    assert limiter.backoffs == 0
+
+
+def test_client_errors_do_not_back_off():
+    limiter = AdaptiveRateLimiter(rate=1.0)
+    limiter.record(0.1, 400)
+    assert limiter.rate == 1.5 and limiter.backoffs == 0
+
+
+def test_acquire_uses_burst_then_waits_for_token():
+    limiter = AdaptiveRateLimiter(rate=20.0, burst=2)
+    assert limiter.acquire() == 0 and limiter.acquire() == 0
+    start = time.monotonic()
+    czekano = limiter.acquire()
+    assert czekano > 0.02
+    assert time.monotonic() - start == pytest.approx(czekano, abs=0.03)
+    assert limiter.stats()['waited'] == pytest.approx(czekano, abs=0.001)
+
+
+def test_stats_latency_percentiles():
+    limiter = AdaptiveRateLimiter()
+    for latency in (0.1, 0.2, 0.3, 0.4):
+        limiter.record(latency, 200)
+    stats = limiter.stats()
+    assert stats['requests'] == 4
+    assert stats['latency_max'] == 0.4 and stats['latency_p50'] == 0.3
+
+
+class Odpowiedz:
+    def __init__(self, status):
+        self.status_code = status
+        self.ok = status < 400
+
+
+class Sesja:
+    """Zastępstwo requests.Session - zapamiętuje argumenty, zwraca kolejne statusy albo wyjątki"""
+
+    def __init__(self, *wyniki):
+        self.wyniki = list(wyniki)
+        self.wywolania = []
+
+    def request(self, method, url, **kwargs):
+        self.wywolania.append((method, url, kwargs))
+        wynik = self.wyniki.pop(0)
+        if isinstance(wynik, Exception):
+            raise wynik
+        return Odpowiedz(wynik)
+
+
+def pool(*wyniki, **kwargs):
+    http = HttpPool(limiter=AdaptiveRateLimiter(rate=100.0, max_rate=1000.0, burst=10), **kwargs)
+    http.session = Sesja(*wyniki)
+    return http
+
+
+def test_pool_feeds_limited_endpoints_into_limiter():
+    http = pool(200, 503)
+    http.post(SUBMIT)
+    assert http.limiter.rate == 100.5
+    http.post(SUBMIT)
+    assert http.limiter.backoffs == 1 and http.limiter.requests == 2
+
+
+def test_pool_does_not_limit_other_endpoints():
+    http = pool(503)
+    http.post('https://odpn.test/ODPN/Dokument.asmx/GridGetData')
+    assert http.limiter.requests == 0
+
+
+def test_pool_timeout_is_a_backoff_and_is_reraised():
+    http = pool(requests.Timeout())
+    with pytest.raises(requests.Timeout):
+        http.post(SUBMIT)
+    assert http.limiter.backoffs == 1
+
+
+def test_pool_sets_endpoint_timeout_and_verify():
+    http = pool(200, 200, timeouts={'SubmitForm': 7}, verify='/tmp/ca.pem')
+    http.post(SUBMIT + '?x=1')
+    http.get('https://odpn.test/inne')
+    (_, _, submit), (_, _, inne) = http.session.wywolania
+    assert submit['timeout'] == 7 and submit['verify'] == '/tmp/ca.pem'
+    assert inne['timeout'] == http.default_timeout
+    assert http.last_response().status_code == 200
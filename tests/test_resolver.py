@@ -0,0 +1,91 @@
+import json
+
+from odpn_resolver import ContextResolver, decode_body, find_list_request, grid_matches, month_records
+
+LISTA = 'https://odpn.test/ODPN/Szkoly/RozliczenieDotacji/Lista.asmx/Pobierz'
+
+
+class Odpowiedz:
+    def __init__(self, body, status=200):
+        self.body = body
+        self.status_code = status
+        self.ok = status < 400
+        self.text = body if isinstance(body, str) else json.dumps(body)
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise RuntimeError(self.status_code)
+
+
+class Http:
+    def __init__(self, body):
+        self.body = body
+        self.posts = []
+
+    def post(self, url, **kwargs):
+        self.posts.append((url, kwargs))
+        return Odpowiedz(self.body)
+
+
+def test_asp_net_wrapper_is_unpacked_at_any_depth():
+    assert decode_body('{"d": "{\\"d\\": [1, 2]}"}') == [1, 2]
+    assert decode_body('<html>') is None
+    rekordy = month_records({'d': json.dumps({'rows': [{'miesiac': 1, 'IdDokumentu': 10}, {'miesiac': 2},
+                                                       {'grupa': [{'miesiac': '3', 'IdDokumentu': 30}]}]})})
+    assert sorted(r['IdDokumentu'] for r in rekordy) == [10, 30]
+
+
+def test_resolve_merges_month_ids_into_chapter_template():
+    http = Http({'d': [
+        {'miesiac': 1, 'rozdzial': '80120', 'IdDokumentu': 11, 'wydrukId': 111, 'szkid': 9},
+        {'miesiac': '2', 'rozdzial': '80120', 'IdDokumentu': 12, 'wydrukId': None},
+        {'miesiac': 1, 'rozdzial': '80101', 'IdDokumentu': 21},
+        {'miesiac': 'x', 'rozdzial': '80120', 'IdDokumentu': 99},
+    ]})
+    template = {'szkid': 1001, 'rok': 2025, 'rozdzial': '80120', 'miesiac': 5, 'IdDokumentu': 15,
+                'wydrukId': 155, 'v_store_fields': ['a']}
+    request = {'url': LISTA, 'postData': '{"data": {}}', 'contentType': 'application/json; charset=UTF-8'}
+
+    konteksty = ContextResolver(http).resolve(request, template)
+
+    assert http.posts == [(LISTA, {'data': '{"data": {}}',
+                                   'headers': {'Content-Type': 'application/json; charset=UTF-8'}})]
+    assert sorted(konteksty) == [1, 2]
+    # Z rekordu tylko ID dokumentu - szkoła z listy nie nadpisuje szablonu
+    assert konteksty[1] == dict(template, miesiac=1, IdDokumentu=11, wydrukId=111)
+    assert konteksty[2] == dict(template, miesiac='2', IdDokumentu=12)
+    assert template['IdDokumentu'] == 15
+
+
+def test_grid_response_must_belong_to_the_document():
+    data = {'IdDokumentu': 11, 'miesiac': 1, 'rozdzial': '80120', 'szkid': 1001, 'rok': 2025}
+    assert grid_matches({'d': {'rows': [], 'total': 0}}, data)
+    assert grid_matches([{'IdDokumentu': '11', 'Kwota': 5}], data)
+    assert not grid_matches([{'IdDokumentu': 12}], data)
+    assert not grid_matches({'d': {'success': False, 'rows': []}}, data)
+    assert not grid_matches({'d': {'total': 0}}, data)
+    assert not grid_matches('<html>Błąd</html>', data)
+
+
+def test_list_request_is_chosen_by_response_content():
+    zdarzenia = [
+        {'requestId': '1', 'method': 'POST', 'finished': True, 'url': 'https://x/RozliczenieDotacji/Dokument.asmx/GridGetData'},
+        {'requestId': '2', 'method': 'GET', 'finished': True, 'url': 'https://x/RozliczenieDotacji/Lista'},
+        {'requestId': '3', 'method': 'POST', 'finished': True, 'url': 'https://x/RozliczenieDotacji/Inne.asmx/Menu'},
+        {'requestId': '4', 'method': 'POST', 'finished': True, 'url': 'https://x/RozliczenieDotacji/Lista.asmx/Pobierz',
+         'postData': '{"data": {}}', 'headers': {'Content-Type': 'application/json'}},
+    ]
+    tresci = {'1': [{'miesiac': 1, 'IdDokumentu': 1}], '2': [{'miesiac': 1, 'IdDokumentu': 1}],
+              '3': {'menu': []}, '4': {'d': [{'miesiac': 1, 'IdDokumentu': 1}]}}
+
+    class Driver:
+        def execute_cdp_cmd(self, cmd, params):
+            return {'body': json.dumps(tresci[params['requestId']])}
+
+    assert find_list_request(Driver(), zdarzenia) == {
+        'url': 'https://x/RozliczenieDotacji/Lista.asmx/Pobierz', 'postData': '{"data": {}}',
+        'contentType': 'application/json',
+    }
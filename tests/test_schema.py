@@ -0,0 +1,53 @@
+import pytest
+
+from odpn_schema import SCHEMATY, CategoryIndex, category_index, normalize_label
+
+TABELA = {
+    '1. Wynagrodzenia nauczycieli': (1, 11),
+    '2. Wynagrodzenia pozostałych pracowników': (2, 12),
+    '9. Zakup pomocy dydaktycznych': (9, 19),
+    '10. Zakup materiałów': (10, 20),
+}
+
+
+@pytest.mark.parametrize('kategoria, klucze', [
+    ('1. Wynagrodzenia nauczycieli', ['1. Wynagrodzenia nauczycieli']),
+    ('  1.WYNAGRODZENIA   Nauczycieli ', ['1. Wynagrodzenia nauczycieli']),
+    ('2. wynagrodzenia pozostalych pracownikow', ['2. Wynagrodzenia pozostałych pracowników']),
+    ('9', ['9. Zakup pomocy dydaktycznych']),
+    ('10.', ['10. Zakup materiałów']),
+    ('3', []),
+    ('pomocy dydaktycznych', ['9. Zakup pomocy dydaktycznych']),
+    ('Wynagrodzenia', ['1. Wynagrodzenia nauczycieli', '2. Wynagrodzenia pozostałych pracowników']),
+    ('Zakup', ['9. Zakup pomocy dydaktycznych', '10. Zakup materiałów']),
+    ('Czynsz', []),
+    ('', []),
+])
+def test_category_matching(kategoria, klucze):
+    assert CategoryIndex(TABELA).match(kategoria) == klucze
+
+
+def test_number_does_not_match_longer_number():
+    indeks = CategoryIndex({'1. A': (1, 1), '10. B': (10, 10), '11. C': (11, 11)})
+    assert indeks.match('1') == ['1. A']
+    assert indeks.match('11.') == ['11. C']
+
+
+def test_keys_equal_after_normalization_are_reported_as_collisions():
+    indeks = CategoryIndex({'5. Usługi': (5, 1), '5.  usługi': (5, 2), '6. Inne': (6, 3)})
+    assert indeks.collisions == [('5. Usługi', '5.  usługi')]
+    assert indeks.match('5') == ['5. Usługi']
+
+
+def test_normalized_label():
+    assert normalize_label('3.Zakup   ŻYWNOŚCI ') == '3. zakup zywnosci'
+    assert normalize_label('Łączność') == 'lacznosc'
+
+
+@pytest.mark.parametrize('schemat', sorted(SCHEMATY))
+def test_shipped_tables_have_no_collisions_and_match_their_own_keys(schemat):
+    for tabela, numery_pol in SCHEMATY[schemat].get('numery_pol', {}).items():
+        indeks = category_index(schemat, tabela)
+        assert indeks.collisions == []
+        for key in numery_pol:
+            assert indeks.match(key) == [key]
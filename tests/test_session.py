@@ -0,0 +1,44 @@
+import stat
+import time
+
+import requests
+
+from odpn_session import SessionCache
+
+
+def ciasteczka(**wygasa):
+    jar = requests.cookies.RequestsCookieJar()
+    for name, expires in wygasa.items():
+        jar.set(name, 'v-' + name, domain='odpn.test', path='/', expires=expires)
+    return jar
+
+
+def test_expired_cookies_are_not_restored(tmp_path):
+    cache = SessionCache(tmp_path)
+    teraz = int(time.time())
+    cache.save('odpn.test', 'konto', ciasteczka(sesja=None, wazne=teraz + 3600, stare=teraz - 1))
+
+    jar = requests.cookies.RequestsCookieJar()
+    assert SessionCache.restore_cookies(jar, cache.load('odpn.test', 'konto')) == 2
+    assert {c.name: c.value for c in jar} == {'sesja': 'v-sesja', 'wazne': 'v-wazne'}
+
+
+def test_session_file_is_private_and_per_account(tmp_path):
+    cache = SessionCache(tmp_path)
+    # Pozostałość przerwanego zapisu z szerszymi uprawnieniami
+    tmp = cache._path('odpn.test', 'konto').with_suffix('.tmp')
+    tmp.write_text('{}')
+    tmp.chmod(0o644)
+
+    cache.save('odpn.test', 'konto', ciasteczka(sesja=None), {'local': {'a': '1'}})
+
+    path = cache._path('odpn.test', 'konto')
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    assert not tmp.exists()
+    assert 'konto' not in path.name
+    assert cache.load('odpn.test', 'konto')['storage'] == {'local': {'a': '1'}}
+    assert cache.load('odpn.test', 'inne') is None
+
+    cache.drop('odpn.test', 'konto')
+    cache.drop('odpn.test', 'konto')
+    assert cache.load('odpn.test', 'konto') is None
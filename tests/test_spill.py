@@ -0,0 +1,66 @@
+import time
+
+import pytest
+
+import belchatow
+from odpn_spill import MonthSpill, SpilledList
+
+
+def test_spilled_list_keeps_only_a_counter_in_memory(tmp_path):
+    lista = SpilledList(tmp_path / "bledy.jsonl")
+    assert not lista
+    lista.append((3, "Nieznana kategoria: 'ż'"))
+    lista.extend([(1, "Błąd wysyłania żądania"), (2, "x")])
+
+    assert len(lista) == 3
+    assert list(lista) == [(3, "Nieznana kategoria: 'ż'"), (1, "Błąd wysyłania żądania"), (2, "x")]
+    lista.close()
+    assert (tmp_path / "bledy.jsonl").read_text(encoding='utf-8').count('\n') == 3
+
+
+def test_spilled_failures_are_reported_in_stored_order(tmp_path, capsys):
+    lista = SpilledList(tmp_path / "bledy.jsonl")
+    lista.extend([(5, 'a'), (2, 'b')])
+    wrap = belchatow.SiteWrap('odpn.test', session_dir=None, context_file=None, metrics_dir=None, journal=False)
+
+    wrap._report_errors(lista)
+    wrap._report_errors([(5, 'a'), (2, 'b')])
+
+    wyjscie = capsys.readouterr().out.split('Lista błędów')
+    assert wyjscie[1].index('Wiersz 5') < wyjscie[1].index('Wiersz 2')
+    assert wyjscie[2].index('Wiersz 2') < wyjscie[2].index('Wiersz 5')
+
+
+def test_grouped_file_gives_one_chunk_per_month(tmp_path):
+    wiersze = [('01', [1, 'a']), ('01', [2, 'b']), ('02', [3, 'c'])]
+    with MonthSpill(tmp_path) as spill:
+        fragmenty = [(miesiac, list(rows)) for miesiac, rows in spill.chunks(iter(wiersze))]
+        katalog = spill.directory
+    assert fragmenty == [('01', [[1, 'a'], [2, 'b']]), ('02', [[3, 'c']])]
+    assert not katalog.exists()
+
+
+def test_month_returning_later_becomes_another_chunk(tmp_path):
+    def wiersze():
+        yield '01', [1]
+        yield '02', [2]
+        # Kolejne wiersze po odebraniu pierwszego fragmentu - styczeń wraca jako nowy fragment
+        while not odebrane:
+            time.sleep(0.01)
+        yield '01', [3]
+
+    odebrane = []
+    with MonthSpill(tmp_path) as spill:
+        for miesiac, rows in spill.chunks(wiersze()):
+            odebrane.append((miesiac, list(rows)))
+    assert odebrane == [('01', [[1]]), ('02', [[2]]), ('01', [[3]])]
+
+
+def test_reader_error_is_raised_to_the_consumer(tmp_path):
+    def wiersze():
+        yield '01', [1]
+        raise UnicodeDecodeError('utf-8', b'\xff', 0, 1, 'invalid start byte')
+
+    with MonthSpill(tmp_path) as spill:
+        with pytest.raises(UnicodeDecodeError):
+            list(spill.chunks(wiersze()))
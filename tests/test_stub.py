@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from odpn_http import HttpPool
+from odpn_stub import DOKUMENT, LISTA, ZMIANA_PLACOWKI, StubServer
+
+
+@pytest.fixture(scope='module')
+def server():
+    with StubServer(szkoly=(1001, 1002), rok=2025, rozdzialy=('80120',)) as server:
+        yield server
+
+
+def sesja(server, login='test', haslo='test'):
+    http = HttpPool(verify=str(server.cert))
+    response = http.post(f"https://{server.host}/Logowanie.aspx", data={'Login': login, 'Haslo': haslo})
+    response.raise_for_status()
+    return http
+
+
+def api(http, server, path, data):
+    return http.post(f"https://{server.host}{path}", json={'data': data})
+
+
+def test_api_needs_logged_in_session(server):
+    assert api(sesja(server, haslo='zle'), server, DOKUMENT + 'GridGetData', {}).status_code == 401
+
+
+def test_submit_read_and_delete_rows(server):
+    server.state.reset()
+    http = sesja(server)
+    doc = server.state.find_document(1001, '80120', 3)
+    grid = DOKUMENT + 'GridGetData'
+
+    miesiace = api(http, server, LISTA, {}).json()['d']['data']
+    assert {(m['miesiac'], m['szkid']) for m in miesiace} >= {(3, 1001)}
+    assert all(m['szkid'] == 1001 for m in miesiace)
+
+    assert api(http, server, DOKUMENT + 'SubmitForm', {'ID_Dokumentu': doc['IdDokumentu'], '_3': 'x'}).status_code == 500
+    row_id = api(http, server, DOKUMENT + 'SubmitForm', {
+        'ID_Dokumentu': doc['IdDokumentu'], 'NumerPola': '1', '_3': 'FV/1', '_4': '2025-03-10T00:00:00',
+    }).json()['d']['Id']
+
+    wiersze = api(http, server, grid, server.state.grid_request(doc)).json()['d']['data']
+    assert wiersze == [{'NumerPola': '1', '_3': 'FV/1', '_4': '/Date(1741561200000)/', 'Id': row_id}]
+
+    usun = DOKUMENT + 'GridDeleteRow'
+    assert api(http, server, usun, dict(server.state.grid_request(doc), jsonData=[row_id, 999999])).status_code == 500
+    assert api(http, server, usun, dict(server.state.grid_request(doc), jsonData=[row_id])).ok
+    assert server.state.rows[doc['IdDokumentu']] == {}
+
+
+def test_documents_of_another_school_need_school_change(server):
+    http = sesja(server)
+    obcy = server.state.find_document(1002, '80120', 1)
+    assert api(http, server, DOKUMENT + 'GridGetData', server.state.grid_request(obcy)).status_code == 500
+
+    assert http.post(f"https://{server.host}{ZMIANA_PLACOWKI}", data={'szk_id': '1002'}).ok
+    assert api(http, server, DOKUMENT + 'GridGetData', server.state.grid_request(obcy)).ok
+    assert http.post(f"https://{server.host}{ZMIANA_PLACOWKI}", data={'szk_id': '7'}).status_code == 400
+
+
+def test_requests_over_capacity_get_503():
+    with StubServer(opoznienie=0.3, pojemnosc=1) as server:
+        http = [sesja(server) for _ in range(3)]
+        statusy = []
+        watki = [threading.Thread(target=lambda h=h: statusy.append(api(h, server, LISTA, {}).status_code))
+                 for h in http]
+        for watek in watki:
+            watek.start()
+        for watek in watki:
+            watek.join()
+
+        assert sorted(statusy) == [200, 503, 503]
+        assert server.state.snapshot()['odrzucone'] == 2
@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from odpn_submit import BLAD_WYSYLANIA, SubmitEngine
+
+
+class Wysylka:
+    """send() z opóźnieniem zależnym od wiersza - liczy maksymalną liczbę żądań w locie"""
+
+    def __init__(self, opoznienia=None):
+        self.opoznienia = opoznienia or {}
+        self.w_locie = 0
+        self.maks = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, dane_post):
+        with self._lock:
+            self.w_locie += 1
+            self.maks = max(self.maks, self.w_locie)
+        try:
+            time.sleep(self.opoznienia.get(dane_post['row'], 0.001))
+            if dane_post.get('wyjatek'):
+                raise RuntimeError('zepsuty wiersz')
+            return not dane_post.get('odrzucony')
+        finally:
+            with self._lock:
+                self.w_locie -= 1
+
+
+def zadania(n, specjalne=None):
+    specjalne = specjalne or {}
+    return [(i, dict({'row': i}, **specjalne.get(i, {}))) for i in range(1, n + 1)]
+
+
+@pytest.mark.parametrize('in_flight', [1, 4])
+def test_results_in_file_order_with_errors(in_flight):
+    # Wcześniejsze wiersze kończą się później - wynik i tak w kolejności pliku
+    wysylka = Wysylka({i: 0.02 - i * 0.001 for i in range(1, 11)})
+    engine = SubmitEngine(wysylka, in_flight=in_flight)
+
+    wyniki = engine.run(zadania(10, {3: {'odrzucony': True}, 7: {'wyjatek': True}}))
+
+    assert [w[0] for w in wyniki] == list(range(1, 11))
+    assert wyniki[2] == (3, False, BLAD_WYSYLANIA)
+    assert wyniki[6] == (7, False, "Błąd przetwarzania: zepsuty wiersz")
+    assert all(w[1] for i, w in enumerate(wyniki, 1) if i not in (3, 7))
+
+
+def test_window_is_bounded_and_used():
+    wysylka = Wysylka({i: 0.01 for i in range(1, 21)})
+    SubmitEngine(wysylka, in_flight=3).run(zadania(20))
+    assert wysylka.maks == 3
+
+
+def test_sequential_mode_sends_one_at_a_time():
+    wysylka = Wysylka()
+    SubmitEngine(wysylka, in_flight=1).run(zadania(5))
+    assert wysylka.maks == 1
+
+
+def test_on_sent_runs_for_every_row_and_on_result_in_caller_thread():
+    wyslane, wyniki, watki = [], [], set()
+    lock = threading.Lock()
+
+    def on_sent(row_num, success, error):
+        with lock:
+            wyslane.append(row_num)
+
+    def on_result(row_num, success, error):
+        watki.add(threading.get_ident())
+        wyniki.append(row_num)
+
+    SubmitEngine(Wysylka(), in_flight=4, on_sent=on_sent).run(zadania(12), on_result)
+
+    assert sorted(wyslane) == sorted(wyniki) == list(range(1, 13))
+    assert watki == {threading.get_ident()}
+
+
+def test_lazy_input_is_not_read_ahead_of_the_window():
+    pobrane = []
+
+    def generator():
+        for row_num, dane in zadania(10):
+            pobrane.append(row_num)
+            yield row_num, dane
+
+    wysylka = Wysylka({i: 0.01 for i in range(1, 11)})
+    engine = SubmitEngine(lambda d: (len(pobrane) - d['row'] <= 2) and wysylka(d), in_flight=2)
+    assert all(w[1] for w in engine.run(generator()))
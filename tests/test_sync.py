@@ -0,0 +1,43 @@
+import pytest
+
+from odpn_sync import SyncIndex, _norm, server_rows
+
+POLA = ['_3', '_4', '_6', '_8']
+
+
+@pytest.mark.parametrize('wartosc, data', [
+    ('/Date(1736463600000)/', '2025-01-10'),        # północ 10.01 w Polsce (CET) = 9.01 23:00 UTC
+    ('/Date(1752098400000)/', '2025-07-10'),        # północ 10.07 (CEST) = 9.07 22:00 UTC
+    ('/Date(1743289200000)/', '2025-03-30'),        # dzień zmiany czasu na letni
+    ('/Date(1761429600000)/', '2025-10-26'),        # dzień zmiany czasu na zimowy
+    ('/Date(1736463600000+0100)/', '2025-01-10'),
+    ('2025-01-10T00:00:00', '2025-01-10'),
+])
+def test_dates_normalize_to_local_day(wartosc, data):
+    assert _norm(wartosc) == data
+
+
+def test_server_rows_with_asp_dates_match_csv_rows():
+    odpowiedz = {'d': {'success': True, 'total': 2, 'data': [
+        {'Id': 1, '_3': 'FV/1/2025', '_4': '/Date(1736463600000)/', '_6': '/Date(1737327600000)/', '_8': 100},
+        {'Id': 2, '_3': 'FV/2/2025', '_4': '/Date(1752098400000)/', '_6': '/Date(1752098400000)/', '_8': 50.5},
+    ]}}
+    indeks = SyncIndex(server_rows(odpowiedz, POLA), POLA)
+    csv = [
+        (1, {'_3': 'FV/1/2025', '_4': '2025-01-10T00:00:00', '_6': '2025-01-20T00:00:00', '_8': 100.0}),
+        (2, {'_3': 'FV/2/2025', '_4': '2025-07-10T00:00:00', '_6': '2025-07-10T00:00:00', '_8': 50.5}),
+        (3, {'_3': 'FV/3/2025', '_4': '2025-07-11T00:00:00', '_6': '2025-07-11T00:00:00', '_8': 1.0}),
+    ]
+
+    assert [row_num for row_num, _ in indeks.missing(csv)] == [3]
+    assert indeks.matched == 2
+    assert indeks.extra_ids() == []
+
+
+def test_same_content_in_another_form_position_is_a_different_row():
+    serwer = [{'Id': 1, 'NumerPola': 1, '_3': 'FV/1', '_8': 100}, {'Id': 2, 'NumerPola': 2, '_3': 'FV/1', '_8': 100}]
+    indeks = SyncIndex(serwer, ['_3', '_8'])
+    csv = [(1, {'NumerPola': '2', '_3': 'FV/1', '_8': 100.0}), (2, {'NumerPola': '3', '_3': 'FV/1', '_8': 100.0})]
+
+    assert [row_num for row_num, _ in indeks.missing(csv)] == [2]
+    assert indeks.extra_ids() == [1]
@@ -0,0 +1,85 @@
+import csv
+
+import pytest
+
+import belchatow
+from odpn_bench import ROK, ROZDZIAL, SZKOLA, seed_contexts
+from odpn_schema import SCHEMATY
+from odpn_stub import StubServer
+
+SZYBKI_LIMITER = {'rate': 1000, 'max_rate': 100000, 'burst': 100}
+
+
+@pytest.fixture(scope='module')
+def server():
+    with StubServer(szkoly=(SZKOLA,), rok=ROK, rozdzialy=(ROZDZIAL,)) as server:
+        yield server
+
+
+def write_csv(path, miesiace):
+    """Wiersze w formacie Bełchatowa - jeden wiersz na pozycję listy miesięcy (kolejność jak w pliku)"""
+    kategorie = list(SCHEMATY['belchatow']['numery_pol']['oswiata'])
+    with path.open('w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        for i, miesiac in enumerate(miesiace):
+            writer.writerow([kategorie[i], '', f"{ROK}-{miesiac:02d}-10", f"FV/{i + 1}/{ROK}",
+                             f"{ROK}-{miesiac:02d}-20", f"{100 + i},00", "50,00", "", "", f"{miesiac}/{ROK}"])
+    return path
+
+
+def run(server, tmp_path, csv_path, **kwargs):
+    with belchatow.SiteWrap(server.host, session_dir=None, context_file=tmp_path / "konteksty.json",
+                            szkid=SZKOLA, rok=ROK, verify=str(server.cert), metrics_dir=None, journal=False,
+                            rate_limit=SZYBKI_LIMITER, streaming=True, sync_delete=True, **kwargs) as site:
+        site.login(server.state.login, server.state.haslo)
+        site.get_headers()
+        site.parse_file(str(csv_path), SZKOLA, ROZDZIAL)
+
+
+def rows(server, miesiac):
+    doc = server.state.find_document(SZKOLA, ROZDZIAL, miesiac)
+    return server.state.rows[doc['IdDokumentu']]
+
+
+def test_unsorted_multi_chunk_file_keeps_every_row(server, tmp_path):
+    server.state.reset()
+    seed_contexts(tmp_path / "konteksty.json", server.host, server)
+    styczen = server.state.find_document(SZKOLA, ROZDZIAL, 1)
+    server.state.add_row(styczen, {'NumerPola': '1', '_3': 'nadmiarowy', '_4': f"{ROK}-01-05T00:00:00"})
+    # Styczeń, styczeń, luty, styczeń - dwa fragmenty stycznia w trybie strumieniowym
+    csv_path = write_csv(tmp_path / "wydatki.csv", [1, 1, 2, 1])
+
+    run(server, tmp_path, csv_path)
+
+    assert sorted(r['_3'] for r in rows(server, 1).values()) == [f"FV/{n}/{ROK}" for n in (1, 2, 4)]
+    assert [r['_3'] for r in rows(server, 2).values()] == [f"FV/3/{ROK}"]
+
+    # Drugi przebieg: wszystko już na serwerze (daty jako /Date(ms)/) - nic nie jest wysyłane ani kasowane
+    przed = {m: dict(rows(server, m)) for m in (1, 2)}
+    run(server, tmp_path, csv_path)
+    assert {m: dict(rows(server, m)) for m in (1, 2)} == przed
+
+
+@pytest.mark.parametrize('zepsute, kolumna, wartosc', [
+    ([1], 0, 'Pozycja spoza schematu'),     # kategoria
+    ([0, 1], 5, 'sto złotych'),             # kwota - cały miesiąc odrzucony przy transformacji
+])
+def test_rows_rejected_before_comparison_block_deletes_in_their_month(server, tmp_path, zepsute, kolumna, wartosc):
+    server.state.reset()
+    seed_contexts(tmp_path / "konteksty.json", server.host, server)
+    csv_path = write_csv(tmp_path / "wydatki.csv", [1, 1, 2])
+    run(server, tmp_path, csv_path)
+    przed = {m: dict(rows(server, m)) for m in (1, 2)}
+    luty = server.state.find_document(SZKOLA, ROZDZIAL, 2)
+    server.state.add_row(luty, {'NumerPola': '1', '_3': 'nadmiarowy', '_4': f"{ROK}-02-05T00:00:00"})
+
+    # Błędne wiersze stycznia - ich kopie na serwerze nie mogą zniknąć
+    wiersze = list(csv.reader(csv_path.open(encoding='utf-8'), delimiter=';'))
+    for i in zepsute:
+        wiersze[i][kolumna] = wartosc
+    with csv_path.open('w', encoding='utf-8', newline='') as f:
+        csv.writer(f, delimiter=';').writerows(wiersze)
+    run(server, tmp_path, csv_path, validate=False)
+
+    assert rows(server, 1) == przed[1]
+    assert [r['_3'] for r in rows(server, 2).values()] == [f"FV/3/{ROK}"]
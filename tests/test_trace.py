@@ -0,0 +1,88 @@
+import json
+import threading
+
+import odpn_trace
+from odpn_trace import SPAN_KLIENT, STATUS_BLAD, STATUS_OK, Tracer
+
+
+def spany(path):
+    wynik = []
+    for linia in path.read_text(encoding='utf-8').splitlines():
+        paczka = json.loads(linia)['resourceSpans'][0]
+        wynik.append((paczka, paczka['scopeSpans'][0]['spans']))
+    return wynik
+
+
+def test_span_tree_and_otlp_json(tmp_path):
+    tracer = Tracer(tmp_path / "slad.jsonl", wariant='belchatow')
+    with tracer.span('wiersz', **{'odpn.wiersz': 7, 'odpn.dane': {'_3': 'FV/1'}, 'puste': None}) as wiersz:
+        with tracer.span('POST SubmitForm', SPAN_KLIENT, **{'http.status_code': 200}) as http:
+            pass
+        wiersz.ok()
+    try:
+        with tracer.span('wiersz'):
+            raise ValueError('zła kwota')
+    except ValueError:
+        pass
+    path = tracer.close(wiersze=2, udany=True)
+
+    [(paczka, lista)] = spany(path)
+    atrybuty = {a['key']: a['value'] for a in paczka['resource']['attributes']}
+    assert atrybuty == {'wariant': {'stringValue': 'belchatow'}, 'service.name': {'stringValue': 'odpn'}}
+    po_id = {s['spanId']: s for s in lista}
+    assert [s['name'] for s in lista] == ['POST SubmitForm', 'wiersz', 'wiersz', 'przebieg']
+    assert {s['traceId'] for s in lista} == {tracer.trace_id}
+
+    http_span, wiersz_span, blad_span, root = lista
+    assert 'parentSpanId' not in root
+    assert po_id[http_span['parentSpanId']] is wiersz_span
+    assert wiersz_span['parentSpanId'] == blad_span['parentSpanId'] == root['spanId']
+    assert http_span['kind'] == SPAN_KLIENT
+    assert http_span['attributes'] == [{'key': 'http.status_code', 'value': {'intValue': '200'}}]
+    assert wiersz_span['attributes'] == [{'key': 'odpn.wiersz', 'value': {'intValue': '7'}},
+                                         {'key': 'odpn.dane', 'value': {'stringValue': '{"_3": "FV/1"}'}}]
+    assert wiersz_span['status'] == {'code': STATUS_OK}
+    assert blad_span['status'] == {'code': STATUS_BLAD, 'message': 'ValueError: zła kwota'}
+    assert {'key': 'udany', 'value': {'boolValue': True}} in root['attributes']
+    assert int(root['startTimeUnixNano']) <= int(http_span['startTimeUnixNano']) <= int(http_span['endTimeUnixNano'])
+
+    # Ponowne zamknięcie nie dopisuje spanu przebiegu drugi raz
+    tracer.close()
+    assert len(spany(path)) == 1
+
+
+def test_spans_are_flushed_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(odpn_trace, 'PACZKA', 3)
+    tracer = Tracer(tmp_path / "slad.jsonl")
+    for _ in range(4):
+        with tracer.span('wiersz'):
+            pass
+    assert [len(lista) for _, lista in spany(tracer.path)] == [3]
+    tracer.close()
+    assert [len(lista) for _, lista in spany(tracer.path)] == [3, 2]
+    assert tracer.spans == 5
+
+
+def test_each_thread_has_its_own_current_span(tmp_path):
+    tracer = Tracer(tmp_path / "slad.jsonl")
+    rodzice = {}
+
+    def wysylka(numer):
+        with tracer.span('wiersz') as wiersz:
+            with tracer.span('POST SubmitForm') as http:
+                rodzice[numer] = (wiersz.span_id, http.parent_id)
+
+    watki = [threading.Thread(target=wysylka, args=(n,)) for n in range(4)]
+    for watek in watki:
+        watek.start()
+    for watek in watki:
+        watek.join()
+
+    assert all(wiersz == rodzic for wiersz, rodzic in rodzice.values())
+    assert tracer.current() is tracer.root
+
+
+def test_file_name_from_host(tmp_path):
+    tracer = Tracer.in_directory(tmp_path, 'odpn.test:8443', wariant='x')
+    assert tracer.path.parent == tmp_path
+    assert tracer.path.name.startswith('odpn.test_8443-') and tracer.path.suffix == '.jsonl'
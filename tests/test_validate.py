@@ -0,0 +1,22 @@
+import pytest
+
+from odpn_validate import validate_file
+
+WIERSZ_ODPN2 = "opis;1.;FV/1/2025;100,00;2025-01-10;FV/1/2025;2025-01-20;100,00;50,00;0,00"
+
+
+def test_full_row_is_valid(tmp_path):
+    path = tmp_path / "wydatki.csv"
+    path.write_text(WIERSZ_ODPN2 + "\n", encoding='utf-8')
+    assert validate_file(path, 'odpn2') == []
+
+
+@pytest.mark.parametrize('schemat, wiersz, wymagane', [
+    ('odpn2', WIERSZ_ODPN2.rsplit(';', 1)[0], 10),                  # 9 kolumn - schemat czyta 10.
+    ('piotrkow', WIERSZ_ODPN2.rsplit(';', 2)[0], 9),                # 8 kolumn - schemat czyta 9.
+])
+def test_row_shorter_than_columns_read_by_schema(tmp_path, schemat, wiersz, wymagane):
+    path = tmp_path / "wydatki.csv"
+    path.write_text(WIERSZ_ODPN2 + "\n" + wiersz + "\n", encoding='utf-8')
+    n = wiersz.count(';') + 1
+    assert validate_file(path, schemat) == [(2, f"Za mało kolumn: {n} (wymagane {wymagane})")]